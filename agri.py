@@ -1,90 +1,48 @@
 # agri.py
+import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-from parameters import (
-    DEFAULT_AGB_BGB_SOIL_BY_REGION, 
-    REMOVAL_FACTORS_BY_REGION, 
-    RESIDUE_MULTIPLIER_BY_REGION
-)
 import shared_state
+import agri_engine
+import agri_incremental
+import agri_timeseries
+import instrumentation
+import sectors
+import validation
+# Calculation core lives in agri_calc; re-exported for existing callers
+from agri_calc import (
+    CENTRAL_AFRICA_COUNTRIES, resolve_region, get_region_params,
+    safe_get, safe_float, compute_row_ghg, params_version
+)
 
 # -----------------------------
-# 1. HELPER FUNCTIONS
+# 1. UI RENDER
 # -----------------------------
 
-CENTRAL_AFRICA_COUNTRIES = [
-    "Cameroon", "Central African Republic", "Republic of Congo", 
-    "Democratic Republic of the Congo", "Equatorial Guinea", "Gabon"
-]
-
-def resolve_region(country):
-    if country in ["Indonesia", "Brazil"]: return country
-    if country in CENTRAL_AFRICA_COUNTRIES: return "Central Africa"
-    return "Central Africa"
-
-def get_region_params(country):
-    region_key = resolve_region(country)
-    return {
-        "agb_bgb_soil": DEFAULT_AGB_BGB_SOIL_BY_REGION[region_key],
-        "removal_factors": REMOVAL_FACTORS_BY_REGION[region_key],
-        "residue_multiplier": RESIDUE_MULTIPLIER_BY_REGION[region_key]
-    }
-
-def safe_get(value):
-    if isinstance(value, list):
-        return value[0] if len(value) > 0 else None
-    return value
-
-def safe_float(value):
-    val = safe_get(value)
-    try: return float(val)
-    except: return 0.0
-
-def compute_row_ghg(row, params, soil_divisor):
-    """Calculates GHG and returns dictionary with details for results."""
-    agb_bgb_soil = params["agb_bgb_soil"]
-    removal_factors = params["removal_factors"]
-    residue_multiplier = params["residue_multiplier"]
-
-    # 1. Clean Inputs
-    crop = safe_get(row["Crop System"])
-    tillage_opt = safe_get(row["Tillage"])
-    inputs_opt = safe_get(row["Inputs"])
-    residue_opt = safe_get(row["Residue"])
-    area = safe_float(row["Area (ha)"])
-
-    # 2. Defaults
-    agb_def, bgb_def, soil_def = agb_bgb_soil.get(crop, (0,0,0))
-    
-    # 3. Local Overrides
-    agb = safe_float(row["Local AGB"]) if safe_float(row["Local AGB"]) > 0 else agb_def
-    bgb = safe_float(row["Local BGB"]) if safe_float(row["Local BGB"]) > 0 else bgb_def
-    soil = safe_float(row["Local Soil"]) if safe_float(row["Local Soil"]) > 0 else soil_def
-    
-    # 4. Factors
-    tillage_val = safe_float(row["Local Tillage Factor"]) if safe_float(row["Local Tillage Factor"]) > 0 else removal_factors["tillage"].get(tillage_opt, 0)
-    input_val = safe_float(row["Local Input Factor"]) if safe_float(row["Local Input Factor"]) > 0 else removal_factors["input"].get(inputs_opt, 0)
-    residue_val = safe_float(row["Local Residue Factor"]) if safe_float(row["Local Residue Factor"]) > 0 else removal_factors["residue"].get(residue_opt, 0)
-
-    # 5. Calculation
-    carbon_biomass = (agb * 3.664 + bgb * 3.664) * area
-    soil_term = (soil / soil_divisor) * tillage_val * input_val
-    residue_term = residue_val * residue_multiplier * 3.664
-    
-    total = round(carbon_biomass + soil_term - residue_term, 2)
-    
-    return total, {
-        "agb_used": agb, "bgb_used": bgb, "soil_used": soil,
-        "tillage_factor": tillage_val, "input_factor": input_val
-    }
-
-# -----------------------------
-# 2. UI RENDER
-# -----------------------------
+def persist_editor_state():
+    """
+    Folds each section's data-editor edits into its base frame. Call on reruns
+    that do not render this module: Streamlit drops the state of widgets that
+    are not drawn, and with it the edits. Per-row results are carried over.
+    """
+    for key in agri_engine.SECTION_NAMES:
+        editor_state = st.session_state.get(f"editor_{key}")
+        if key not in st.session_state or not editor_state:
+            continue
+        if not any(editor_state.get(part) for part in ("edited_rows", "added_rows", "deleted_rows")):
+            continue
+        tracker = st.session_state.get(f"agri_tracker_{key}")
+        if tracker is not None and tracker.base_df is st.session_state[key]:
+            st.session_state[key] = tracker.fold(editor_state)
+        else:
+            st.session_state[key] = agri_incremental.apply_editor_state(st.session_state[key], editor_state)
 
 def render_agri_module():
     st.header("3. Agriculture Emissions")
+    # Tables of a loaded project are read when this page is first shown
+    if "project_store_pending" in st.session_state: # project_store.PENDING_KEY, set when a project is loaded
+        import project_store
+        project_store.restore_pending(st.session_state, list(agri_engine.SECTION_NAMES) + [project_store.RESULTS_KEY])
     
     country = shared_state.get("gi_country")
     soil_divisor = shared_state.get("soil_divisor")
@@ -106,11 +64,18 @@ def render_agri_module():
 
     def render_data_editor(key_name):
         if key_name not in st.session_state:
-            st.session_state[key_name] = pd.DataFrame(columns=[
-                "Crop System", "Area (ha)", "Tillage", "Inputs", "Residue",
-                "Local AGB", "Local BGB", "Local Soil", 
-                "Local Tillage Factor", "Local Input Factor", "Local Residue Factor"
-            ])
+            # Option columns are categoricals over the factor index, so the
+            # frame stores small integer codes instead of repeated strings
+            import factor_index
+            index = factor_index.index_for(params)
+            st.session_state[key_name] = pd.DataFrame({
+                "Crop System": pd.Series(dtype=index.dtype("crop")),
+                "Area (ha)": pd.Series(dtype="float64"),
+                "Tillage": pd.Series(dtype=index.dtype("tillage")),
+                "Inputs": pd.Series(dtype=index.dtype("input")),
+                "Residue": pd.Series(dtype=index.dtype("residue")),
+                **{col: pd.Series(dtype="float64") for col in agri_engine.SECTION_COLUMNS[5:]}
+            })
             
         return st.data_editor(
             st.session_state[key_name],
@@ -131,50 +96,165 @@ def render_agri_module():
             use_container_width=True
         )
 
+    def render_issues(key_name):
+        # Issues of the last calculation, while the table is still the one it calculated
+        tracker = st.session_state.get(f"agri_tracker_{key_name}")
+        if tracker is None or tracker.base_df is not st.session_state.get(key_name):
+            return
+        issues = tracker.issues()
+        if len(issues):
+            st.warning(f"{len(issues):,} cell(s) with issues at the last calculation: the totals use the values described below.")
+            st.dataframe(validation.issue_counts(issues), use_container_width=True, hide_index=True)
+            st.caption("Issues by row (0 = first table row; added rows follow the others):")
+            st.dataframe(issues, use_container_width=True, hide_index=True)
+
+    def render_import(key_name):
+        with st.expander("Import rows from CSV / Parquet (large files)"):
+            st.caption("The file is read in chunks; only its totals and a preview are kept. "
+                       "Imported rows count towards this section in addition to the table above.")
+            path = st.text_input("File path on the server", key=f"import_path_{key_name}")
+            upload = st.file_uploader("...or upload a file", type=["csv", "parquet"], key=f"import_upload_{key_name}")
+            if st.button("Import", key=f"import_button_{key_name}"):
+                source = upload if upload is not None else path.strip()
+                if not source:
+                    st.warning("Choose a file first.")
+                else:
+                    status = st.empty()
+                    import ingest # Imported only when a file is imported (pyarrow for Parquet)
+                    try:
+                        with instrumentation.span("import", section=key_name):
+                            st.session_state[f"agri_import_{key_name}"] = ingest.ingest_section(
+                                source, params, soil_divisor, name=getattr(upload, "name", None),
+                                progress=lambda report: status.caption(report.summary())
+                            )
+                    except (ValueError, OSError) as e:
+                        st.error(f"Import failed: {e}")
+
+            report = st.session_state.get(f"agri_import_{key_name}")
+            if report is not None:
+                st.success(f"{report.source_name}: {report.summary()}. Total {report.total:,.2f} tCO2e.")
+                st.dataframe(report.preview, use_container_width=True)
+                if report.issue_count:
+                    st.warning(f"{report.issue_count:,} cell(s) with issues: the totals use the values described below.")
+                    st.dataframe(report.issue_counts, use_container_width=True, hide_index=True)
+                    st.caption(f"First {len(report.issues):,} issue(s), by file row (0 = first data row):")
+                    st.dataframe(report.issues, use_container_width=True, hide_index=True)
+                if st.button("Remove import", key=f"import_remove_{key_name}"):
+                    del st.session_state[f"agri_import_{key_name}"]
+                    st.rerun()
+
     with tab1:
         st.caption("Deforestation-free outgrower schemes")
-        df_3_1 = render_data_editor("df_3_1")
+        with instrumentation.span("data_editor", section="df_3_1"):
+            render_data_editor("df_3_1")
+        render_issues("df_3_1")
+        render_import("df_3_1")
     with tab2:
         st.caption("Agro-industrial plantations")
-        df_3_2 = render_data_editor("df_3_2")
+        with instrumentation.span("data_editor", section="df_3_2"):
+            render_data_editor("df_3_2")
+        render_issues("df_3_2")
+        render_import("df_3_2")
     with tab3:
         st.caption("Sustainable intensification")
-        df_3_3 = render_data_editor("df_3_3")
+        with instrumentation.span("data_editor", section="df_3_3"):
+            render_data_editor("df_3_3")
+        render_issues("df_3_3")
+        render_import("df_3_3")
 
     st.divider()
 
     if st.button("Calculate Agriculture Emissions", type="primary"):
-        chart_rows = []
-        
-        def process_section(df, section_name):
-            total = 0
-            for _, row in df.iterrows():
-                if safe_get(row["Crop System"]):
-                    val, details = compute_row_ghg(row, params, soil_divisor)
-                    total += val
-                    # Add row to results table
-                    chart_rows.append({
-                        "Section": section_name,
-                        "Crop": safe_get(row["Crop System"]),
-                        "Area": safe_float(row["Area (ha)"]),
-                        "Ref AGB": details["agb_used"], # Showing the factor used
-                        "Ref Soil": details["soil_used"],
-                        "Emission Reduction": val
-                    })
-            return total
-
-        t1 = process_section(df_3_1, "3.1 Outgrower")
-        t2 = process_section(df_3_2, "3.2 Agro-industrial")
-        t3 = process_section(df_3_3, "3.3 Intensification")
+        # Incremental: each section keeps per-row results for its base frame and
+        # only recomputes rows touched by the editor deltas. A full recompute
+        # happens when soil_divisor, the country or region parameters change.
+        totals, frames, terms, recomputed = {}, [], {}, 0
+        for key, section_name in agri_engine.SECTION_NAMES.items():
+            with instrumentation.span("process_section", section=key):
+                tracker = agri_incremental.tracker_for(st.session_state, key, st.session_state[key], params, soil_divisor)
+                tracker.apply(st.session_state.get(f"editor_{key}"))
+                recomputed += tracker.last_recomputed
+                totals[key] = tracker.total
+                results = tracker.results()
+                if len(results):
+                    frames.append(agri_engine.results_frame(results, section_name))
+                terms[key] = agri_timeseries.section_terms(results, soil_divisor, params["residue_multiplier"])
+
+                # Streamed file imports contribute their totals and per-crop aggregates
+                report = st.session_state.get(f"agri_import_{key}")
+                if report is not None:
+                    if report.fingerprint == (soil_divisor, params_version(params)):
+                        import ingest
+                        totals[key] += report.total
+                        frames.append(ingest.report_results_rows(report, section_name))
+                        terms[key] = [a + b for a, b in zip(terms[key], report.terms)]
+                    else:
+                        st.warning(f"{section_name}: the imported file was calculated with other settings. Re-import it to include it.")
+        t1, t2, t3 = totals["df_3_1"], totals["df_3_2"], totals["df_3_3"]
+        with instrumentation.span("results_frame"):
+            results_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=agri_engine.RESULT_COLUMNS + agri_engine.PRACTICE_COLUMNS)
+            results_df["Region"] = resolve_region(country)
         
         grand_total = t1 + t2 + t3
         shared_state.set("agri_grand_total", grand_total)
-        shared_state.set("agri_results_table", chart_rows) # Save detailed results for the Results Tab
+        shared_state.set("agri_3_1_total", t1)
+        shared_state.set("agri_3_2_total", t2)
+        shared_state.set("agri_3_3_total", t3)
+        # Cross-sector totals (sectors.py), read by the Start and Results pages
+        shared_state.set(sectors.TOTALS_KEY, {**(shared_state.get(sectors.TOTALS_KEY) or {}), "agriculture": dict(totals)})
+        # Save detailed results for the Results Tab, column by column (see results_view.ResultsTable)
+        import results_view
+        shared_state.set("agri_results_table", results_view.ResultsTable.from_frame(results_df))
+        # Per-section sums the Results tab turns into yearly totals (see agri_timeseries)
+        shared_state.set("agri_yearly_terms", {"soil_divisor": soil_divisor, "sections": terms})
         
         st.success("Calculations updated!")
+        st.caption(f"{recomputed} row(s) recomputed; unchanged rows were reused.")
         
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("3.1 Outgrower", f"{t1:,.2f}")
         c2.metric("3.2 Agro-ind", f"{t2:,.2f}")
         c3.metric("3.3 Intensif", f"{t3:,.2f}")
-        c4.metric("TOTAL", f"{grand_total:,.2f}")
\ No newline at end of file
+        c4.metric("TOTAL", f"{grand_total:,.2f}")
+
+    # -----------------------------
+    # Scenario sweep
+    # -----------------------------
+    with st.expander("Scenario sweep (sensitivity analysis)"):
+        trackers = {key: st.session_state.get(f"agri_tracker_{key}") for key in agri_engine.SECTION_NAMES}
+        trackers = {key: t for key, t in trackers.items() if t is not None}
+        if not trackers:
+            st.info("Click 'Calculate Agriculture Emissions' first; the sweep reuses its per-row results.")
+            return
+
+        st.caption("Samples soil period and factor scales around the last calculation and reports the spread of section totals.")
+        s1, s2, s3, s4 = st.columns(4)
+        period = s1.slider("Soil period (years)", 1, 100, (15, 30))
+        factor_spread = s2.slider("Removal factors (±%)", 0, 50, 10) / 100
+        multiplier_spread = s3.slider("Residue multiplier (±%)", 0, 50, 0) / 100
+        n_scenarios = s4.number_input("Scenarios", min_value=1, max_value=200_000, value=10_000, step=1000)
+
+        if st.button("Run scenario sweep"):
+            factor_range = (1 - factor_spread, 1 + factor_spread)
+            multiplier = params["residue_multiplier"]
+            import scenarios # Imported only when a sweep is run
+            sample = scenarios.monte_carlo(
+                params, soil_divisor, int(n_scenarios),
+                soil_divisor=period,
+                tillage_scale=factor_range, input_scale=factor_range, residue_scale=factor_range,
+                residue_multiplier=(multiplier * (1 - multiplier_spread), multiplier * (1 + multiplier_spread)),
+            )
+            with instrumentation.span("scenario_sweep"):
+                inputs = scenarios.SweepInputs({key: t.results() for key, t in trackers.items()})
+                sweep = scenarios.run_sweep(inputs, sample)
+
+            st.dataframe(scenarios.summarize(sweep).round(2), use_container_width=True)
+            with instrumentation.span("chart", chart="scenario_histogram"):
+                # Binned here so the browser gets 50 bars, not one point per scenario
+                totals = sweep["grand_total"].dropna().to_numpy()
+                counts, edges = np.histogram(totals, bins=50)
+                import plotly.express as px # Imported only when a chart is drawn
+                fig = px.bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, labels={"x": "Grand total (tCO2e)", "y": "Scenarios"},
+                             title="Grand total across scenarios (tCO2e)")
+                fig.update_traces(width=float(edges[1] - edges[0]) if len(totals) else None)
+                st.plotly_chart(fig, use_container_width=True)
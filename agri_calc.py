@@ -0,0 +1,154 @@
+# agri_calc.py
+# Pure calculation core: no Streamlit, plotly, pandas or numpy imports, so
+# services and workers that only need these functions import it cheaply.
+import hashlib
+from parameters import (
+    DEFAULT_AGB_BGB_SOIL_BY_REGION,
+    REMOVAL_FACTORS_BY_REGION,
+    RESIDUE_MULTIPLIER_BY_REGION
+)
+
+# -----------------------------
+# 1. SCHEMA & REGIONS
+# -----------------------------
+
+# Columns created by agri.render_data_editor for every 3.x section
+SECTION_COLUMNS = [
+    "Crop System", "Area (ha)", "Tillage", "Inputs", "Residue",
+    "Local AGB", "Local BGB", "Local Soil",
+    "Local Tillage Factor", "Local Input Factor", "Local Residue Factor"
+]
+
+# Session key of each section table -> label used in the results table
+SECTION_NAMES = {
+    "df_3_1": "3.1 Outgrower",
+    "df_3_2": "3.2 Agro-industrial",
+    "df_3_3": "3.3 Intensification",
+}
+
+RESULT_COLUMNS = ["Section", "Crop", "Area", "Ref AGB", "Ref Soil", "Emission Reduction"]
+# Practice labels carried next to the results, for grouping
+PRACTICE_COLUMNS = ["Tillage", "Inputs", "Residue"]
+
+CO2_PER_C = 3.664
+
+CENTRAL_AFRICA_COUNTRIES = [
+    "Cameroon", "Central African Republic", "Republic of Congo", 
+    "Democratic Republic of the Congo", "Equatorial Guinea", "Gabon"
+]
+
+def resolve_region(country):
+    if country in ["Indonesia", "Brazil"]: return country
+    if country in CENTRAL_AFRICA_COUNTRIES: return "Central Africa"
+    return "Central Africa"
+
+class ReadOnlyDict(dict):
+    """
+    dict that refuses changes. Region parameters are built once per process
+    and shared by every session and worker, so nobody may edit them in place.
+    """
+    __slots__ = ("_version",)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("parameter tables are shared and read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),)) # pickles without going through __setitem__
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return ReadOnlyDict({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def frozen_params(tables):
+    """Read-only copy of nested parameter tables, with its version precomputed."""
+    params = _freeze(tables)
+    params._version = _hash_params(params)
+    return params
+
+_region_params = {} # region -> read-only params, one object per process
+
+def get_region_params(country):
+    """
+    Parameters of the country's region. Every caller (all sessions, all
+    reruns) gets the same read-only object, with its version precomputed.
+    """
+    region_key = resolve_region(country)
+    params = _region_params.get(region_key)
+    if params is None:
+        params = frozen_params({
+            "agb_bgb_soil": DEFAULT_AGB_BGB_SOIL_BY_REGION[region_key],
+            "removal_factors": REMOVAL_FACTORS_BY_REGION[region_key],
+            "residue_multiplier": RESIDUE_MULTIPLIER_BY_REGION[region_key]
+        })
+        params = _region_params.setdefault(region_key, params) # first one wins across threads
+    return params
+
+def _hash_params(params):
+    return hashlib.sha1(repr(params).encode("utf-8")).hexdigest()[:16]
+
+def params_version(params):
+    """Short fingerprint of a region's parameter tables; changes when any value does."""
+    version = getattr(params, "_version", None)
+    return version if version is not None else _hash_params(params)
+
+# -----------------------------
+# 2. ROW CALCULATION
+# -----------------------------
+
+def safe_get(value):
+    if isinstance(value, list):
+        return value[0] if len(value) > 0 else None
+    return value
+
+def safe_float(value):
+    val = safe_get(value)
+    try: return float(val)
+    except: return 0.0
+
+def compute_row_ghg(row, params, soil_divisor):
+    """
+    Calculates GHG and returns dictionary with details for results.
+    Reference implementation: whole sections go through
+    agri_engine.compute_section_ghg, which must match this row for row.
+    """
+    agb_bgb_soil = params["agb_bgb_soil"]
+    removal_factors = params["removal_factors"]
+    residue_multiplier = params["residue_multiplier"]
+
+    # 1. Clean Inputs
+    crop = safe_get(row["Crop System"])
+    tillage_opt = safe_get(row["Tillage"])
+    inputs_opt = safe_get(row["Inputs"])
+    residue_opt = safe_get(row["Residue"])
+    area = safe_float(row["Area (ha)"])
+
+    # 2. Defaults
+    agb_def, bgb_def, soil_def = agb_bgb_soil.get(crop, (0,0,0))
+    
+    # 3. Local Overrides
+    agb = safe_float(row["Local AGB"]) if safe_float(row["Local AGB"]) > 0 else agb_def
+    bgb = safe_float(row["Local BGB"]) if safe_float(row["Local BGB"]) > 0 else bgb_def
+    soil = safe_float(row["Local Soil"]) if safe_float(row["Local Soil"]) > 0 else soil_def
+    
+    # 4. Factors
+    tillage_val = safe_float(row["Local Tillage Factor"]) if safe_float(row["Local Tillage Factor"]) > 0 else removal_factors["tillage"].get(tillage_opt, 0)
+    input_val = safe_float(row["Local Input Factor"]) if safe_float(row["Local Input Factor"]) > 0 else removal_factors["input"].get(inputs_opt, 0)
+    residue_val = safe_float(row["Local Residue Factor"]) if safe_float(row["Local Residue Factor"]) > 0 else removal_factors["residue"].get(residue_opt, 0)
+
+    # 5. Calculation
+    carbon_biomass = (agb * CO2_PER_C + bgb * CO2_PER_C) * area
+    soil_term = (soil / soil_divisor) * tillage_val * input_val
+    residue_term = residue_val * residue_multiplier * CO2_PER_C
+    
+    total = round(carbon_biomass + soil_term - residue_term, 2)
+    
+    return total, {
+        "agb_used": agb, "bgb_used": bgb, "soil_used": soil,
+        "tillage_factor": tillage_val, "input_factor": input_val
+    }
@@ -0,0 +1,193 @@
+# agri_engine.py
+import numpy as np
+import pandas as pd
+import factor_index
+# Schema and region helpers are re-exported so callers need one import
+from agri_calc import (
+    SECTION_COLUMNS, SECTION_NAMES, RESULT_COLUMNS, PRACTICE_COLUMNS, CO2_PER_C,
+    CENTRAL_AFRICA_COUNTRIES, resolve_region, get_region_params,
+    safe_get, safe_float
+)
+
+# -----------------------------
+# 1. COLUMN HELPERS
+# -----------------------------
+
+_unwrap_cells = np.frompyfunc(safe_get, 1, 1)
+_truthy_cells = np.frompyfunc(bool, 1, 1)
+
+def unwrap_column(s):
+    """Unwraps list-wrapped cells of a whole column (no-op for typed columns)."""
+    if s.dtype == object:
+        # frompyfunc keeps None as None (Series.map would turn it into NaN)
+        return pd.Series(_unwrap_cells(s.to_numpy()), index=s.index, dtype=object)
+    return s
+
+def truthy_column(s):
+    """
+    bool(value) for every cell, e.g. to find rows with a crop selected.
+    Empty cells are False in every dtype: None, and the NaN that categorical,
+    str and CSV-read columns hold instead (bool(NaN) would be True).
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # One bool() per category; code -1 is an empty cell
+        per_category = np.append(_truthy_cells(s.cat.categories.to_numpy(dtype=object)).astype(bool), False)
+        return per_category[s.cat.codes.to_numpy()]
+    return _truthy_cells(s.to_numpy(dtype=object)).astype(bool) & s.notna().to_numpy()
+
+def parse_float_column(s):
+    """
+    coerce_float_column plus the positions of the cells that are not numbers
+    (text and other values float() rejects; they count as 0.0). Empty cells
+    (None) also become 0.0 but are not reported.
+    """
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+        return s.to_numpy(dtype=np.float64, na_value=np.nan), np.empty(0, dtype=np.intp)
+
+    values = unwrap_column(s)
+    out = np.array(pd.to_numeric(values, errors="coerce"), dtype=np.float64)
+
+    # pandas turns both real NaNs and garbage into NaN; only the few cells it
+    # could not parse go through the scalar rule to tell them apart.
+    bad = np.flatnonzero(np.isnan(out))
+    if not len(bad):
+        return out, bad
+    raw = values.to_numpy(dtype=object)
+    out[bad] = [safe_float(raw[i]) for i in bad]
+    invalid = bad[[out[i] == 0.0 and raw[i] is not None and raw[i] is not pd.NA for i in bad]]
+    return out, invalid
+
+def coerce_float_column(s):
+    """Column-wide equivalent of safe_float: unparsable -> 0.0, NaN stays NaN."""
+    return parse_float_column(s)[0]
+
+def round2(values):
+    """Vectorized round(x, 2) that agrees with Python's round on every input."""
+    out = np.round(values, 2)
+    scaled = np.abs(values) * 100.0
+    # np.round scales by 100 first; near .5 ties (or beyond float precision)
+    # that can differ from Python's correctly rounded result.
+    frac = scaled - np.floor(scaled)
+    suspect = np.flatnonzero((np.abs(frac - 0.5) < 1e-6) | (scaled >= 2.0 ** 52))
+    for i in suspect:
+        out[i] = round(float(values[i]), 2)
+    return out
+
+def sequential_sum(values):
+    """Left-to-right float sum, matching `total += val` in the per-row loop."""
+    if len(values) == 0:
+        return 0
+    return float(np.cumsum(values)[-1])
+
+# -----------------------------
+# 2. SECTION ENGINE
+# -----------------------------
+
+def compute_section_ghg(df, params, soil_divisor, index=None):
+    """
+    Columnar counterpart of agri_calc.compute_row_ghg for a whole 3.x section.
+
+    Returns a DataFrame with one line per row that has a crop selected
+    (the rows process_section would visit), keeping the input index.
+    Missing "Local ..." columns are treated as empty. A single-region
+    FactorIndex passed as `index` (e.g. one attached from shared memory)
+    replaces the one built from `params`, which may then be None.
+    """
+    if index is None:
+        index = factor_index.index_for(params)
+    residue_multiplier = float(index.residue_multiplier[0])
+
+    df = df.reindex(columns=SECTION_COLUMNS)
+
+    # 1. Rows with a crop selected (same truthiness test as process_section)
+    crop = unwrap_column(df["Crop System"])
+    keep = truthy_column(crop)
+    df = df[keep]
+    crop = crop[keep]
+
+    area = coerce_float_column(df["Area (ha)"])
+
+    # 2. Defaults (integer codes -> gathers from the region's factor arrays)
+    agb_def, bgb_def, soil_def = index.crop_defaults(0, index.encode("crop", crop))
+
+    # 3. Local Overrides
+    def override(column, default):
+        local = coerce_float_column(df[column])
+        return np.where(local > 0, local, default)
+
+    agb = override("Local AGB", agb_def)
+    bgb = override("Local BGB", bgb_def)
+    soil = override("Local Soil", soil_def)
+
+    # 4. Factors
+    tillage = unwrap_column(df["Tillage"])
+    inputs = unwrap_column(df["Inputs"])
+    residue = unwrap_column(df["Residue"])
+
+    def factor(kind, labels):
+        return index.factors(kind, 0, index.encode(kind, labels))
+
+    tillage_val = override("Local Tillage Factor", factor("tillage", tillage))
+    input_val = override("Local Input Factor", factor("input", inputs))
+    residue_val = override("Local Residue Factor", factor("residue", residue))
+
+    # 5. Calculation
+    with np.errstate(invalid="ignore"):
+        carbon_biomass = (agb * CO2_PER_C + bgb * CO2_PER_C) * area
+        soil_term = (soil / soil_divisor) * tillage_val * input_val
+        residue_term = residue_val * residue_multiplier * CO2_PER_C
+        total = round2(carbon_biomass + soil_term - residue_term)
+
+    return pd.DataFrame({
+        "crop": crop.array, # stays categorical (codes) when the input was
+        "area": area,
+        "total": total,
+        "agb_used": agb, "bgb_used": bgb, "soil_used": soil,
+        "tillage_factor": tillage_val, "input_factor": input_val, "residue_factor": residue_val,
+        "tillage": tillage.array, "inputs": inputs.array, "residue": residue.array, # practice labels
+    }, index=df.index)
+
+def section_total(results):
+    """Section total from compute_section_ghg output, summed like process_section."""
+    return sequential_sum(results["total"].to_numpy())
+
+def results_frame(results, section_name):
+    """Rows of the Results tab table for one section's compute_section_ghg output."""
+    return pd.DataFrame({
+        "Section": section_name,
+        "Crop": results["crop"],
+        "Area": results["area"],
+        "Ref AGB": results["agb_used"], # Showing the factor used
+        "Ref Soil": results["soil_used"],
+        "Emission Reduction": results["total"],
+        "Tillage": results["tillage"],
+        "Inputs": results["inputs"],
+        "Residue": results["residue"],
+    }, columns=RESULT_COLUMNS + PRACTICE_COLUMNS)
+
+# -----------------------------
+# 3. PROJECT ENGINE
+# -----------------------------
+
+def compute_project(sections, country, soil_divisor):
+    """
+    Runs every section of a project.
+
+    `sections` maps session keys ("df_3_1", ...) to DataFrames; missing
+    keys count as empty sections. Returns ({key: total}, results rows).
+    """
+    params = get_region_params(country)
+    totals = {}
+    frames = []
+    for key, section_name in SECTION_NAMES.items():
+        df = sections.get(key)
+        if df is None:
+            totals[key] = 0
+            continue
+        results = compute_section_ghg(df, params, soil_divisor)
+        totals[key] = section_total(results)
+        if len(results):
+            frames.append(results_frame(results, section_name))
+
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS + PRACTICE_COLUMNS)
+    return totals, rows
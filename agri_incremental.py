@@ -0,0 +1,311 @@
+# agri_incremental.py
+# Incremental recalculation of the 3.x sections from st.data_editor deltas.
+# No Streamlit import: the editor state is passed in as the plain dict
+# Streamlit keeps under "editor_<key>" ({"edited_rows", "added_rows", "deleted_rows"}).
+# Rows go through the validation stage before the engine, as in batch mode.
+import sys
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import factor_index
+import result_cache
+import validation
+from agri_calc import SECTION_COLUMNS, params_version
+
+def _cents(total):
+    # Row totals are rounded to 2 dp, so running sums in integer cents are exact
+    # and never drift however many edits are added and removed.
+    return 0 if np.isnan(total) else int(round(total * 100))
+
+class _Contribution:
+    """What one edited or added row currently adds to the section total (and to the results table)."""
+    __slots__ = ("cents", "is_nan", "record", "issues")
+
+    def __init__(self, record=None, issues=None):
+        self.record = record # None when no crop is selected
+        self.issues = issues # the row's validation issues, None when there are none
+        total = np.nan if record is None else record["total"]
+        self.is_nan = record is not None and bool(np.isnan(total))
+        self.cents = 0 if record is None else _cents(total)
+
+    @classmethod
+    def of_base(cls, cents, is_nan):
+        """Totals-only view of an untouched base row (its result stays in the base frame)."""
+        contrib = cls.__new__(cls)
+        contrib.record, contrib.cents, contrib.is_nan, contrib.issues = None, int(cents), bool(is_nan), None
+        return contrib
+
+_EMPTY = _Contribution()
+
+def _cents_array(totals):
+    """Vectorized _cents: NaN -> 0, otherwise round(total * 100) as int64."""
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(totals), 0, np.round(totals * 100)).astype(np.int64)
+
+class SectionTracker:
+    """
+    Per-row results and a running total for one section.
+
+    The base frame (the DataFrame handed to st.data_editor) is computed once;
+    after that `apply(editor_state)` only recomputes rows whose edits changed
+    since the previous call, so an update costs time proportional to the edit,
+    not to the table. Build a new tracker when the base frame or any global
+    input (soil_divisor, country / region parameters) changes.
+    """
+
+    def __init__(self, base_df, params, soil_divisor, results=None):
+        """
+        `results` may be compute_section_ghg output for `base_df` (indexed by
+        base position) kept from earlier, e.g. by the project store; the
+        base is then not recomputed. Otherwise it comes from the result cache
+        when the same table was calculated before with the same settings.
+        """
+        self.base_df = base_df
+        self.fingerprint = (soil_divisor, params_version(params))
+        self._params = params
+        self._soil_divisor = soil_divisor
+        self._index = factor_index.index_for(params)
+
+        self._base = base_df.reset_index(drop=True).reindex(columns=SECTION_COLUMNS)
+        clean, self._base_issues = validation.validate_section(self._base, index=self._index)
+        if results is None:
+            results, hit = result_cache.cached_section_ghg(clean, params, soil_divisor)
+            self.last_recomputed = 0 if hit else len(self._base)
+        else:
+            self.last_recomputed = 0
+        self._set_base_results(results)
+
+        self._edited = {}   # base position -> (edit dict, contribution)
+        self._deleted = set()
+        self._added = []    # [(row dict, contribution)]
+
+    # -- bookkeeping --
+
+    def _set_base_results(self, results):
+        """
+        Base rows are kept columnar: the engine's result frame (indexed by base
+        position) plus per-position cents and NaN flags. Only edited and added
+        rows get a per-row record.
+        """
+        totals = np.full(len(self._base), np.nan)
+        totals[results.index.to_numpy()] = results["total"].to_numpy(dtype=np.float64)
+        self._base_results = results
+        self._base_cents = _cents_array(totals)
+        self._base_nan = np.zeros(len(self._base), dtype=bool)
+        self._base_nan[results.index.to_numpy()] = np.isnan(results["total"].to_numpy(dtype=np.float64))
+        self._cents = int(self._base_cents.sum())
+        self._nan_rows = int(self._base_nan.sum())
+
+    def _add(self, contrib, sign):
+        self._cents += sign * contrib.cents
+        self._nan_rows += sign * contrib.is_nan
+
+    def _current(self, pos):
+        if pos in self._deleted:
+            return _EMPTY
+        if pos in self._edited:
+            return self._edited[pos][1]
+        if pos < len(self._base_cents):
+            return _Contribution.of_base(self._base_cents[pos], self._base_nan[pos])
+        return _EMPTY
+
+    def _compute(self, rows):
+        """Contributions for a batch of row dicts in one vectorized call."""
+        if not rows:
+            return []
+        frame = pd.DataFrame(rows, columns=SECTION_COLUMNS, dtype=object) # keep None as "no value"
+        clean, issues = validation.validate_section(self._as_base_dtypes(frame), index=self._index)
+        results = agri_engine.compute_section_ghg(clean, self._params, self._soil_divisor, index=self._index)
+        by_pos = dict(zip(results.index, results.to_dict("records")))
+        issues_by_pos = dict(tuple(issues.groupby("row", sort=False))) if len(issues) else {}
+        return [_Contribution(by_pos.get(i), issues_by_pos.get(i)) for i in range(len(rows))]
+
+    def _as_base_dtypes(self, frame):
+        """
+        Row dicts as the editor's frame holds them (see apply_editor_state): a
+        cleared cell is NaN in a float column, not None, so a row gives the
+        same result incrementally as in a full recompute.
+        """
+        dtypes = {}
+        for col, dtype in self._base.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                # Unseen labels are added as categories there; here they stay labels, with None as NaN
+                frame[col] = frame[col].where(frame[col].notna(), np.nan)
+            elif not pd.api.types.is_string_dtype(dtype):
+                dtypes[col] = dtype
+        return frame.astype(dtypes)
+
+    # -- public API --
+
+    def apply(self, editor_state):
+        """Brings the tracker in line with the editor's cumulative deltas."""
+        editor_state = editor_state or {}
+        edited = {int(k): v for k, v in (editor_state.get("edited_rows") or {}).items()}
+        deleted = {int(p) for p in editor_state.get("deleted_rows") or []}
+        added = list(editor_state.get("added_rows") or [])
+
+        # 1. Base rows whose edits or deleted flag changed
+        touched = {p for p, e in edited.items() if p not in self._edited or self._edited[p][0] != e}
+        touched |= set(self._edited) - set(edited)
+        touched |= deleted ^ self._deleted
+        for pos in touched:
+            self._add(self._current(pos), -1)
+            self._edited.pop(pos, None)
+        self._deleted = deleted
+
+        recompute = sorted(p for p in touched if p in edited)
+        rows = []
+        for pos in recompute:
+            row = self._base.iloc[pos].to_dict() if pos < len(self._base) else {}
+            row.update(edited[pos])
+            rows.append(row)
+        for pos, contrib in zip(recompute, self._compute(rows)):
+            self._edited[pos] = (dict(edited[pos]), contrib)
+        for pos in touched:
+            self._add(self._current(pos), +1)
+
+        # 2. Added rows, compared position by position
+        changed = [i for i, row in enumerate(added) if i >= len(self._added) or self._added[i][0] != row]
+        for _, contrib in self._added[len(added):]:
+            self._add(contrib, -1)
+        self._added = self._added[:len(added)]
+        new_contribs = self._compute([added[i] for i in changed])
+        for i, contrib in zip(changed, new_contribs):
+            if i < len(self._added):
+                self._add(self._added[i][1], -1)
+                self._added[i] = (dict(added[i]), contrib)
+            else:
+                self._added.append((dict(added[i]), contrib))
+            self._add(contrib, +1)
+
+        self.last_recomputed = len(recompute) + len(changed)
+        return self
+
+    def snapshot(self, editor_state):
+        """
+        (frame, results): the frame the editor shows with `editor_state`
+        applied, and its per-row results indexed by position in that frame
+        (what a tracker built on that frame would hold). The base is kept.
+        """
+        self.apply(editor_state)
+        frame = apply_editor_state(self.base_df, editor_state)
+
+        # Old base position -> new position (deleted rows drop out, added rows go last)
+        kept = np.setdiff1d(np.arange(len(self._base)), np.fromiter(self._deleted, dtype=np.int64))
+        new_pos = np.full(len(self._base), -1, dtype=np.int64)
+        new_pos[kept] = np.arange(len(kept))
+        added_pos = [len(kept) + i for i, (_, c) in enumerate(self._added) if c.record is not None]
+
+        rows = self._current_rows()
+        rows.index = np.concatenate([new_pos[rows.index[:len(rows) - len(added_pos)]], added_pos]).astype(np.int64)
+        return frame, rows
+
+    def fold(self, editor_state):
+        """
+        Applies `editor_state` and makes the result the new base frame, keeping
+        every per-row result (nothing is recomputed). Used when the editor
+        widget is about to lose its delta state. Returns the new base frame.
+        """
+        new_base, rows = self.snapshot(editor_state)
+        self.base_df = new_base
+        self._base = new_base.reindex(columns=SECTION_COLUMNS)
+        self._base_issues = validation.validate_section(self._base, index=self._index)[1]
+        self._edited, self._deleted, self._added = {}, set(), []
+        self._set_base_results(rows) # same rows, so the running totals are unchanged
+        return new_base
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the tracker's own results (the base frame is counted by its owner)."""
+        edits = sum(sys.getsizeof(c.record) for _, c in list(self._edited.values()) + self._added if c.record)
+        return int(self._base_results.memory_usage(deep=True).sum()) + self._base_cents.nbytes + self._base_nan.nbytes + edits
+
+    @property
+    def total(self):
+        """Section total of the current rows (NaN if any row has a NaN result)."""
+        return float("nan") if self._nan_rows else self._cents / 100
+
+    def _current_rows(self):
+        """Current results: base rows by base position (edits applied), then added rows."""
+        columns = self._base_results.columns
+        replaced = list(self._deleted | set(self._edited))
+        parts = [self._base_results[~self._base_results.index.isin(replaced)]]
+
+        edits = [(p, c.record) for p, (_, c) in self._edited.items()
+                 if c.record is not None and p not in self._deleted]
+        if edits:
+            parts.append(pd.DataFrame.from_records([r for _, r in edits], index=[p for p, _ in edits], columns=columns))
+            parts = [pd.concat(parts).sort_index()]
+
+        added = [c.record for _, c in self._added if c.record is not None]
+        if added: # an empty from_records frame would turn every column into object
+            parts.append(pd.DataFrame.from_records(added, columns=columns))
+        return pd.concat(parts) if len(parts) > 1 else parts[0].copy()
+
+    def results(self):
+        """Current per-row results in editor order, shaped like compute_section_ghg output."""
+        return self._current_rows().reset_index(drop=True)
+
+    def issues(self):
+        """
+        Validation issues of the current rows (validation.ISSUE_COLUMNS), in
+        row order. "row" is the position in the base frame; added rows are
+        numbered after it.
+        """
+        replaced = list(self._deleted | set(self._edited))
+        parts = [self._base_issues[~self._base_issues["row"].isin(replaced)]]
+        parts += [c.issues.assign(row=pos) for pos, (_, c) in self._edited.items()
+                  if c.issues is not None and pos not in self._deleted]
+        parts += [c.issues.assign(row=len(self._base) + i) for i, (_, c) in enumerate(self._added) if c.issues is not None]
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return pd.DataFrame(columns=validation.ISSUE_COLUMNS)
+        return pd.concat(parts, ignore_index=True).sort_values("row", kind="stable").reset_index(drop=True)
+
+def _with_categories(s, values):
+    """`s` with any unseen labels in `values` added to its categories."""
+    new = [v for v in dict.fromkeys(values) if v is not None and v == v and v not in s.cat.categories]
+    return s.cat.add_categories(new) if new else s
+
+def apply_editor_state(base_df, editor_state):
+    """
+    The frame the data editor currently shows: `base_df` with the editor's
+    cumulative deltas applied. Column dtypes (categoricals included) are kept.
+    """
+    editor_state = editor_state or {}
+    edited = {int(k): v for k, v in (editor_state.get("edited_rows") or {}).items()}
+    deleted = {int(p) for p in editor_state.get("deleted_rows") or []}
+    added = list(editor_state.get("added_rows") or [])
+
+    df = base_df.reset_index(drop=True).copy()
+    added_df = pd.DataFrame(added, columns=df.columns, dtype=object)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _with_categories(df[col], [e[col] for e in edited.values() if col in e] + list(added_df[col]))
+        elif pd.api.types.is_string_dtype(df[col].dtype) and df[col].dtype != object:
+            df[col] = df[col].astype(object) # the str dtype would turn None into NaN
+
+    for pos, edit in edited.items():
+        for col, value in edit.items():
+            if col in df.columns:
+                df.at[pos, col] = value
+    df = df.drop(index=[p for p in deleted if p < len(df)])
+    if len(added_df):
+        df = pd.concat([df, added_df.astype(df.dtypes.to_dict())], ignore_index=True)
+    return df.reset_index(drop=True)
+
+def tracker_for(store, key, base_df, params, soil_divisor):
+    """
+    Returns the SectionTracker kept in `store` (e.g. st.session_state) under
+    "agri_tracker_<key>", rebuilding it (full recompute) only when the base
+    frame or a global input changed.
+    """
+    slot = f"agri_tracker_{key}"
+    tracker = store.get(slot)
+    if (tracker is None or tracker.base_df is not base_df
+            or tracker.fingerprint != (soil_divisor, params_version(params))):
+        tracker = SectionTracker(base_df, params, soil_divisor)
+        store[slot] = tracker
+    return tracker
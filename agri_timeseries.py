@@ -0,0 +1,140 @@
+# agri_timeseries.py
+# Year-resolved emissions for the agriculture sections.
+#
+# The static engine gives each row one annual figure at full implementation,
+#     round(B + S - R, 2)
+# with B the biomass removals ((AGB + BGB) * 3.664 * area), S the soil term
+# (soil / soil_divisor * tillage * input) and R the residue emissions. Over
+# the project duration (implementation + capitalization years) each year's
+# value is
+#     (B - R) * adopted[t] + S * soil_active[t]
+# where adopted[t] is the share of the row's area in place in year t (ramped
+# up in equal steps over the implementation phase, then 1) and soil_active[t]
+# the share whose soil is still changing (each year's newly adopted area
+# changes soil for soil_divisor years). Both profiles are built with
+# cumulative sums over yearly increments, so a rows x years matrix is two
+# outer products, and yearly totals only need the per-section sums of B - R
+# and S.
+import numpy as np
+import pandas as pd
+
+from agri_calc import CO2_PER_C, SECTION_NAMES
+
+IMPLEMENTATION = "Implementation"
+CAPITALIZATION = "Capitalization"
+
+# Largest rows x years block computed at once (cells), as in scenarios.run_sweep
+CHUNK_CELLS = 4_000_000
+
+# -----------------------------
+# 1. PHASE PROFILES
+# -----------------------------
+
+class Timeline:
+    """
+    Project years 1..impl_years + cap_years with the adopted and
+    soil-active area shares of each year.
+    """
+
+    def __init__(self, impl_years, cap_years, soil_divisor):
+        self.impl_years = max(int(impl_years or 0), 0)
+        self.cap_years = max(int(cap_years or 0), 0)
+        self.soil_divisor = max(int(soil_divisor or 1), 1)
+        n = self.impl_years + self.cap_years
+
+        self.years = np.arange(1, n + 1)
+        self.phase = np.where(self.years <= self.impl_years, IMPLEMENTATION, CAPITALIZATION)
+
+        # Newly adopted share per year: equal steps over implementation (all in year 1 without one)
+        added = np.zeros(n)
+        if self.impl_years:
+            added[:self.impl_years] = 1.0 / self.impl_years
+        elif n:
+            added[0] = 1.0
+        # Area adopted in year k changes soil in years k .. k + soil_divisor - 1
+        settled = np.zeros(n)
+        settled[self.soil_divisor:] = added[:max(n - self.soil_divisor, 0)]
+
+        self.adopted = np.minimum(np.cumsum(added), 1.0)
+        self.soil_active = np.maximum(self.adopted - np.cumsum(settled), 0.0)
+
+    def __len__(self):
+        return len(self.years)
+
+    @property
+    def key(self):
+        return (self.impl_years, self.cap_years, self.soil_divisor)
+
+# -----------------------------
+# 2. ROW TERMS
+# -----------------------------
+
+def row_terms(results, soil_divisor, residue_multiplier):
+    """
+    (B - R, S) per row of compute_section_ghg output, as float64 arrays.
+    B - R + S is the row's "total" before rounding.
+    """
+    col = lambda name: results[name].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        area_term = ((col("agb_used") * CO2_PER_C + col("bgb_used") * CO2_PER_C) * col("area")
+                     - col("residue_factor") * residue_multiplier * CO2_PER_C)
+        soil_term = (col("soil_used") / soil_divisor) * col("tillage_factor") * col("input_factor")
+    return area_term, soil_term
+
+def section_terms(results, soil_divisor, residue_multiplier):
+    """[sum of B - R, sum of S] over a section's rows: all yearly_totals needs."""
+    area_term, soil_term = row_terms(results, soil_divisor, residue_multiplier)
+    return [float(area_term.sum()), float(soil_term.sum())]
+
+# -----------------------------
+# 3. ROWS x YEARS
+# -----------------------------
+
+def yearly_matrix(results, timeline, residue_multiplier, dtype=np.float64, cumulative=False, chunk_cells=CHUNK_CELLS):
+    """
+    rows x years array of each row's emission reduction per project year
+    (running totals with cumulative=True). dtype=np.float32 halves the
+    memory of large projects; the arithmetic then runs in float32 too.
+    """
+    area_term, soil_term = row_terms(results, timeline.soil_divisor, residue_multiplier)
+    n, years = len(area_term), len(timeline)
+    out = np.empty((n, years), dtype=dtype)
+    adopted = timeline.adopted.astype(dtype)
+    soil_active = timeline.soil_active.astype(dtype)
+
+    chunk = max(1, chunk_cells // max(years, 1))
+    scratch = np.empty((min(chunk, n), years), dtype=dtype)
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        m = out[start:stop]
+        tmp = scratch[:stop - start]
+        np.multiply(area_term[start:stop, None].astype(dtype), adopted[None, :], out=m)
+        np.multiply(soil_term[start:stop, None].astype(dtype), soil_active[None, :], out=tmp)
+        m += tmp
+        if cumulative:
+            np.cumsum(m, axis=1, out=m)
+    return out
+
+# -----------------------------
+# 4. YEARLY TOTALS
+# -----------------------------
+
+def yearly_totals(terms, timeline):
+    """
+    Per-year reductions of every section plus the total and its running sum.
+    `terms` is {section key: [sum of B - R, sum of S]} (section_terms).
+    """
+    out = pd.DataFrame({
+        "Year": timeline.years,
+        "Phase": timeline.phase,
+        "Area adopted (%)": np.round(timeline.adopted * 100, 1),
+    })
+    total = np.zeros(len(timeline))
+    for key, label in SECTION_NAMES.items():
+        area_sum, soil_sum = terms.get(key, (0.0, 0.0))
+        values = area_sum * timeline.adopted + soil_sum * timeline.soil_active
+        out[label] = values
+        total += values
+    out["Total"] = total
+    out["Cumulative"] = np.cumsum(total)
+    return out
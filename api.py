@@ -0,0 +1,494 @@
+# api.py
+"""
+HTTP/JSON calculation service: agriculture emissions without the Streamlit UI.
+
+    python api.py                       # http://127.0.0.1:8080
+    python api.py --host 0.0.0.0 --port 9000 --max-batch 512 --max-wait-ms 5
+
+Endpoints
+  POST /calculate   one project (JSON) -> section totals and per-row results
+  POST /bulk        NDJSON, one project per line -> NDJSON, one result per
+                    line, in input order, streamed as results are ready
+  GET  /health      liveness
+  GET  /stats       requests, batches and mean batch size since start
+
+A project uses the batch.py JSON schema: the general-info keys of
+shared_state ("gi_project_name", "gi_country", ...), an optional
+"soil_divisor" and the section rows under "df_3_1", "df_3_2", "df_3_3"
+(lists of row objects with the data editor's column names). Add
+"rows": false to get the totals only. Rows are validated first
+(validation.py): "issues" counts the problem cells and, with rows,
+"issue_rows" lists them (section, row number in that section, column,
+value, issue, severity). An infinite number (1e999, "inf") makes the
+project invalid (400, or an error line in /bulk); finite numbers so large
+that the calculation overflows get a 422 naming the section and row, as
+does a soil_divisor of 0 or less.
+
+Concurrent requests are micro-batched: projects arriving while a batch is
+being calculated (or within --max-wait-ms) are evaluated together, one
+vectorized compute_section_ghg call per section and (region, soil period),
+and split back per project. Totals are summed per project exactly as the
+Agriculture page sums them. Built on asyncio streams, no extra dependency.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import batch
+import validation
+
+MAX_BODY_BYTES = 64 * 1024 * 1024 # /calculate bodies and single /bulk lines
+BULK_IN_FLIGHT = 2048 # projects of one /bulk request submitted but not yet written
+READ_BLOCK = 64 * 1024
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    500: "Internal Server Error",
+}
+
+# -----------------------------
+# 1. PROJECT EVALUATION
+# -----------------------------
+
+class UnprocessableProject(ValueError):
+    """A well-formed project that cannot be calculated as given (422, not 400)."""
+
+def parse_project(data):
+    """
+    Validated project from a decoded JSON payload; raises ValueError
+    (UnprocessableProject for a soil_divisor of 0 or less). Section rows
+    stay lists of dicts: frames are built per batch, not per project.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("a project must be a JSON object")
+    sections = {}
+    for key in agri_engine.SECTION_NAMES:
+        rows = data.get(key) or []
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError(f"{key} must be a list of row objects")
+        _check_finite(key, rows)
+        sections[key] = rows
+    info = {k: v for k, v in data.items() if k not in agri_engine.SECTION_NAMES}
+    soil_divisor = info.get("soil_divisor")
+    if soil_divisor is None: # only a missing value takes the default; an explicit 0 is an error
+        soil_divisor = batch.DEFAULT_SOIL_DIVISOR
+    if isinstance(soil_divisor, bool) or not isinstance(soil_divisor, (int, float)) or not math.isfinite(soil_divisor):
+        raise ValueError("soil_divisor must be a finite number")
+    if soil_divisor <= 0:
+        raise UnprocessableProject(f"soil_divisor must be a positive number, not {soil_divisor!r}")
+    return {
+        "info": info,
+        "country": info.get("gi_country") or batch.DEFAULT_COUNTRY,
+        "soil_divisor": soil_divisor,
+        "sections": sections,
+        "with_rows": info.get("rows", True) is not False,
+    }
+
+def _check_finite(key, rows):
+    """
+    Raises ValueError for an infinite number cell (1e999, "inf", ...): the
+    calculation would carry it into totals that JSON cannot represent.
+    """
+    for n, row in enumerate(rows):
+        for col in validation.NUMBER_COLUMNS:
+            value = row.get(col)
+            if isinstance(value, list) and value: # list cells count by their first item
+                value = value[0]
+            if isinstance(value, str):
+                try:
+                    value = float(value)
+                except ValueError:
+                    continue # reported by validation as not a number
+            if isinstance(value, float) and math.isinf(value):
+                raise ValueError(f"{key} row {n}: '{col}' is not a finite number")
+
+def _number(x):
+    return None if isinstance(x, float) and math.isnan(x) else x
+
+def _records(frame):
+    """Rows as JSON-ready dicts (missing values as null)."""
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict("records")
+
+def _project_result(project, totals, frames, issues):
+    t1, t2, t3 = totals["df_3_1"], totals["df_3_2"], totals["df_3_3"]
+    result = {
+        "project": project["info"].get("gi_project_name"),
+        "country": project["country"],
+        "region": agri_engine.resolve_region(project["country"]),
+        "soil_divisor": project["soil_divisor"],
+        "agri_3_1_total": _number(t1),
+        "agri_3_2_total": _number(t2),
+        "agri_3_3_total": _number(t3),
+        "agri_grand_total": _number(t1 + t2 + t3),
+        "issues": sum(len(part) for part in issues),
+    }
+    if project["with_rows"]:
+        rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=agri_engine.RESULT_COLUMNS + agri_engine.PRACTICE_COLUMNS)
+        result["rows"] = _records(rows)
+        result["issue_rows"] = _records(pd.concat(issues, ignore_index=True)) if issues else []
+    return result
+
+def _evaluate_group(projects, params, soil_divisor):
+    """
+    Results for projects sharing region parameters and soil period. A
+    project whose results overflow gets {"error": "overflow: ..."}.
+    """
+    totals = [{} for _ in projects]
+    frames = [[] for _ in projects]
+    issues = [[] for _ in projects]
+    errors = [None] * len(projects)
+    for key, section_name in agri_engine.SECTION_NAMES.items():
+        sections = [p["sections"][key] for p in projects]
+        sizes = [len(rows) for rows in sections]
+        owner = np.repeat(np.arange(len(projects)), sizes)
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        # object dtype keeps JSON nulls as None, whatever else is in the batch (as batch.py does)
+        frame = pd.DataFrame([row for rows in sections for row in rows], columns=agri_engine.SECTION_COLUMNS, dtype=object)
+        clean, found = validation.validate_section(frame, params)
+        results = agri_engine.compute_section_ghg(clean, params, soil_divisor)
+        total = results["total"].to_numpy()
+        # Finite inputs can still overflow (area 1e308 times a factor): JSON has no inf or NaN
+        overflow = ~np.isfinite(results.select_dtypes("number").to_numpy(dtype=np.float64)).all(axis=1)
+
+        if len(found):
+            # Issue rows are positions in the batch; renumber them within each project's section
+            position = found["row"].to_numpy(dtype=np.intp)
+            found["row"] = position - offsets[owner[position]]
+            found.insert(0, "section", key)
+            for i, part in found.groupby(owner[position], sort=False):
+                issues[i].append(part)
+
+        # Rows keep their position in the concatenation, so each project is one slice
+        bounds = np.searchsorted(owner[results.index.to_numpy()], np.arange(len(projects) + 1))
+        for i, project in enumerate(projects):
+            start, stop = bounds[i], bounds[i + 1]
+            totals[i][key] = agri_engine.sequential_sum(total[start:stop])
+            bad = np.flatnonzero(overflow[start:stop])
+            if errors[i] is not None:
+                continue
+            if len(bad):
+                errors[i] = f"{key} row {results.index[start + bad[0]] - offsets[i]}: the result is not a finite number"
+            elif not math.isfinite(totals[i][key]):
+                errors[i] = f"{key}: the section total is not a finite number"
+            if project["with_rows"] and stop > start:
+                frames[i].append(agri_engine.results_frame(results.iloc[start:stop], section_name))
+    for i, t in enumerate(totals):
+        if errors[i] is None and not math.isfinite(sum(t.values())):
+            errors[i] = "the grand total is not a finite number"
+    return [{"error": f"overflow: {e}"} if e else _project_result(p, t, f, i)
+            for p, t, f, i, e in zip(projects, totals, frames, issues, errors)]
+
+def evaluate_batch(projects):
+    """
+    Results for a list of parsed projects, in order. A project that fails
+    gets {"error": ...} without failing the others.
+    """
+    groups = collections.defaultdict(list)
+    for i, project in enumerate(projects):
+        groups[(agri_engine.resolve_region(project["country"]), project["soil_divisor"])].append(i)
+
+    out = [None] * len(projects)
+    for (_region, soil_divisor), members in groups.items():
+        params = agri_engine.get_region_params(projects[members[0]]["country"])
+        try:
+            results = _evaluate_group([projects[i] for i in members], params, soil_divisor)
+        except Exception:
+            # Find the culprit(s): evaluate the group's projects one by one
+            results = []
+            for i in members:
+                try:
+                    results.extend(_evaluate_group([projects[i]], params, soil_divisor))
+                except Exception as e:
+                    results.append({"error": f"{type(e).__name__}: {e}"})
+        for i, result in zip(members, results):
+            out[i] = result
+    return out
+
+# -----------------------------
+# 2. MICRO-BATCHING
+# -----------------------------
+
+class MicroBatcher:
+    """
+    Queues projects from all connections and evaluates them in batches of
+    up to `max_batch` in a worker thread, so the event loop keeps accepting
+    requests meanwhile. Whatever queued up during one batch forms the next;
+    `max_wait` (seconds) additionally holds a lone request back to gather more.
+    """
+
+    def __init__(self, max_batch=256, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.projects = 0
+        self.largest = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def submit(self, project):
+        """Future resolving to the project's result dict."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((project, future))
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            if self.max_wait > 0 and self._queue.qsize() + 1 < self.max_batch:
+                await asyncio.sleep(self.max_wait)
+            while len(items) < self.max_batch and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+
+            try:
+                results = await loop.run_in_executor(None, evaluate_batch, [p for p, _ in items])
+            except Exception as e:
+                results = [{"error": f"{type(e).__name__}: {e}"}] * len(items)
+            self.batches += 1
+            self.projects += len(items)
+            self.largest = max(self.largest, len(items))
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+# -----------------------------
+# 3. HTTP
+# -----------------------------
+
+class HTTPError(Exception):
+    """Protocol-level failure; answered, then the connection is closed."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _head(status, content_type, keep_alive, length=None):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}", f"Content-Type: {content_type}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+def _json_bytes(obj):
+    return json.dumps(obj, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+async def _send_json(writer, status, obj, keep_alive):
+    body = _json_bytes(obj)
+    writer.write(_head(status, "application/json", keep_alive, len(body)) + body)
+    await writer.drain()
+
+async def _read_request(reader):
+    """(method, path, headers) of the next request, or None when the client is done."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method.upper(), target.split("?", 1)[0], headers
+
+def _content_length(headers):
+    if "transfer-encoding" in headers:
+        raise HTTPError(411, "chunked request bodies are not supported, send Content-Length")
+    try:
+        length = int(headers["content-length"])
+    except (KeyError, ValueError):
+        raise HTTPError(411, "Content-Length required")
+    if length < 0:
+        raise HTTPError(400, "invalid Content-Length")
+    return length
+
+class CalculationServer:
+    """Request handling for asyncio.start_server; one coroutine per connection."""
+
+    ROUTES = {"/calculate": "POST", "/bulk": "POST", "/health": "GET", "/stats": "GET"}
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.requests = 0
+        self.started = time.time()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.requests += 1
+                await self._dispatch(method, path, headers, reader, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            # The request body may be unread, so the connection cannot be reused
+            await _send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # Last resort: answer instead of dropping the connection (/bulk ends its own stream, see _bulk)
+            try:
+                await _send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"}, keep_alive=False)
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, headers, reader, writer, keep_alive):
+        if path not in self.ROUTES:
+            raise HTTPError(404, f"no such endpoint: {path}")
+        if method != self.ROUTES[path]:
+            raise HTTPError(405, f"{path} accepts {self.ROUTES[path]}")
+
+        if path == "/health":
+            await _send_json(writer, 200, {"status": "ok"}, keep_alive)
+        elif path == "/stats":
+            await _send_json(writer, 200, self.stats(), keep_alive)
+        elif path == "/calculate":
+            await self._calculate(reader, writer, _content_length(headers), keep_alive)
+        else:
+            await self._bulk(reader, writer, _content_length(headers), keep_alive)
+
+    def stats(self):
+        b = self.batcher
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "projects": b.projects,
+            "batches": b.batches,
+            "mean_batch": round(b.projects / b.batches, 2) if b.batches else 0,
+            "largest_batch": b.largest,
+        }
+
+    def _submit(self, body):
+        """Future for one JSON project; invalid input resolves at once to an error."""
+        try:
+            project = parse_project(json.loads(body))
+        except UnprocessableProject as e:
+            error = str(e)
+        except (ValueError, TypeError) as e: # ValueError includes json.JSONDecodeError
+            error = f"invalid project: {e}"
+        else:
+            return self.batcher.submit(project)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result({"error": error})
+        return future
+
+    async def _calculate(self, reader, writer, length, keep_alive):
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"body larger than {MAX_BODY_BYTES} bytes, use /bulk")
+        result = await self._submit(await reader.readexactly(length))
+        status = 200
+        if "error" in result:
+            status = 400 if result["error"].startswith("invalid project") else 422
+        await _send_json(writer, status, result, keep_alive)
+
+    async def _bulk(self, reader, writer, length, keep_alive):
+        """Streams results back while the body is still being read; order is kept."""
+        writer.write(_head(200, "application/x-ndjson", keep_alive))
+        in_flight = collections.deque()
+
+        async def flush(limit):
+            while len(in_flight) > limit:
+                line_no, future = in_flight.popleft()
+                result = await future
+                try:
+                    data = _json_bytes({"line": line_no, **result}) + b"\n"
+                except (TypeError, ValueError) as e: # only this line is lost
+                    data = _json_bytes({"line": line_no, "error": f"unserializable result: {e}"}) + b"\n"
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+
+        remaining, buffer, line_no = length, b"", 0
+        try:
+            while remaining or buffer:
+                if remaining:
+                    block = await reader.read(min(READ_BLOCK, remaining))
+                    if not block:
+                        raise ConnectionError("client closed during /bulk body")
+                    remaining -= len(block)
+                    *lines, buffer = (buffer + block).split(b"\n")
+                    if len(buffer) > MAX_BODY_BYTES:
+                        raise ConnectionError("/bulk line too long") # headers are sent, so just drop the connection
+                else:
+                    lines, buffer = [buffer], b""
+                for line in lines:
+                    line_no += 1
+                    if line.strip():
+                        in_flight.append((line_no, self._submit(line)))
+                await flush(BULK_IN_FLIGHT)
+            await flush(0)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            # The 200 head is sent: end the stream with an error line, then close (the body may be unread)
+            data = _json_bytes({"line": line_no, "error": f"{type(e).__name__}: {e}"}) + b"\n"
+            writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(data), data))
+            raise ConnectionError("/bulk stream aborted") from e
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+# -----------------------------
+# 4. SERVER
+# -----------------------------
+
+async def start_server(host="127.0.0.1", port=8080, max_batch=256, max_wait=0.002):
+    """Starts listening; returns (asyncio server, CalculationServer)."""
+    batcher = MicroBatcher(max_batch, max_wait)
+    batcher.start()
+    app = CalculationServer(batcher)
+    server = await asyncio.start_server(app.handle, host, port, limit=MAX_BODY_BYTES)
+    return server, app
+
+async def serve(host, port, max_batch, max_wait):
+    server, app = await start_server(host, port, max_batch, max_wait)
+    print(f"... Serving on http://{host}:{port} (batches of up to {max_batch}, wait {max_wait * 1000:g} ms) ...", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await app.batcher.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the agriculture calculation.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=256, help="Most projects evaluated together (1 disables batching)")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="How long a lone request waits for company")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch, args.max_wait_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,94 +4,221 @@ import pandas as pd
 import shared_state
 import general_info
 import agri
+import instrumentation
+import results_view
+import agri_timeseries
+import project_store
+import sectors
+import sector_page
+import excel_export
 
 # 1. Page Config
 st.set_page_config(page_title="CAFI Mitigation Tool", layout="wide")
+instrumentation.begin_run() # timing spans for this rerun, see the end of the script
 
 # 2. Initialize Shared State
 shared_state.init_state()
 
-# 3. Create Top Navigation Tabs
-tabs = st.tabs([
-    "0 Start", 
-    "1 Energy", 
-    "2 Afforestation & Reforestation", 
-    "3 Agriculture", 
-    "4 Forestry & Conservation", 
-    "Results"
-])
-
-# --- TAB 0: Start / Landing Page ---
-with tabs[0]:
+# 3. Sidebar Settings (outside the pages, so they exist whichever page is shown)
+st.sidebar.title("Settings")
+# Soil Input
+soil_years = st.sidebar.number_input(
+    "Soil Calculation Period (Years)",
+    min_value=1,
+    value=int(shared_state.get("soil_divisor") or 20),
+    step=1,
+    help="The time period over which soil carbon changes are calculated (default 20 years)."
+)
+shared_state.set("soil_divisor", soil_years)
+
+lazy_navigation = st.sidebar.toggle(
+    "Only run the active page",
+    key="nav_lazy",
+    help="Each interaction re-runs only the page on screen instead of all six. Turn off to use tabs."
+)
+project_store.render_project_panel() # save / load projects
+
+# 4. Pages
+# --- PAGE 0: Start / Landing Page ---
+def render_start():
     general_info.render_general_info()
-    
-    st.sidebar.title("Settings")
-    # Soil Input
-    soil_years = st.sidebar.number_input(
-        "Soil Calculation Period (Years)", 
-        min_value=1, 
-        value=int(shared_state.get("soil_divisor") or 20), 
-        step=1,
-        help="The time period over which soil carbon changes are calculated (default 20 years)."
-    )
-    shared_state.set("soil_divisor", soil_years)
-
-# --- TAB 1: Energy ---
-with tabs[1]:
-    st.header("1. Energy")
-    st.info("Energy module coming soon...")
-
-# --- TAB 2: ARR ---
-with tabs[2]:
+
+# --- PAGE 1: Energy ---
+def render_energy():
+    sector_page.render_sector_page(sectors.get_sector("energy"))
+
+# --- PAGE 2: ARR ---
+def render_arr():
     st.header("2. Afforestation & Reforestation")
     st.info("ARR module coming soon...")
 
-# --- TAB 3: Agriculture ---
-with tabs[3]:
+# --- PAGE 3: Agriculture ---
+def render_agriculture():
     agri.render_agri_module()
 
-# --- TAB 4: Forestry ---
-with tabs[4]:
+# --- PAGE 4: Forestry ---
+def render_forestry():
     st.header("4. Forestry & Conservation")
     st.info("Forestry module coming soon...")
 
-# --- TAB 5: Results ---
-with tabs[5]:
+# --- PAGE 5: Results ---
+def render_results():
     st.header("Results Summary")
-    
-    # Retrieve data safely. If it returns None, default to 0.0
-    grand_total = shared_state.get("agri_grand_total") or 0.0
-    results_data = shared_state.get("agri_results_table") or []
-    
-    # Display Metric
+
+    project_store.restore_pending(st.session_state, [project_store.RESULTS_KEY]) # results of a loaded project
+    results = shared_state.get("agri_results_table")
+
+    # Sectors with a generic page are recalculated together here; Agriculture on its own page
+    runnable = [s for s in sectors.all_sectors() if not s.own_page and s.enabled(st.session_state)]
+    if runnable and st.button("Recalculate " + ", ".join(s.name for s in runnable), key="results_run_sectors"):
+        for sector in runnable:
+            project_store.restore_pending(st.session_state, list(sector.tables))
+        tables = {k: v for s in runnable for k, v in sector_page.current_tables(s, st.session_state).items()}
+        with instrumentation.span("sector_run", sector="all"):
+            run = sectors.run_sectors(st.session_state, tables, sectors.session_settings(st.session_state), sectors=runnable)
+        sector_page.store_results(st.session_state, run)
+        for result in run.values():
+            for key, error in result.errors.items():
+                st.error(f"{result.sector.tables[key]}: {error}")
+
+    # Totals of every ticked sector (see sectors.py)
+    totals = sectors.session_totals(st.session_state)
+    grand_total = sectors.grand_total(totals, st.session_state)
     col_metric, col_dummy = st.columns([1,3])
     col_metric.metric("Grand Total (tCO2e)", f"{grand_total:,.2f}")
+    by_sector = sectors.totals_frame(totals, st.session_state)
+    if len(by_sector["Sector"].unique()) > 1:
+        st.dataframe(by_sector, column_config={"Emission Reduction": st.column_config.NumberColumn(format="%.2f")},
+                     hide_index=True, use_container_width=True)
+    # The project in the CAFI workbook layout, built on click from this rerun's state (see excel_export.py)
+    st.download_button("Download report (CMT v1.1 workbook)", data=excel_export.session_report_data(st.session_state),
+                       file_name=excel_export.report_name(st.session_state.get("gi_project_name")),
+                       mime=excel_export.MIME_TYPE, on_click="ignore")
+
+    if results is not None and len(results):
+        # The Agriculture module stores a ResultsTable; older sessions hold a list of records
+        with instrumentation.span("results_table"):
+            if isinstance(results, results_view.ResultsTable):
+                df_res = results.to_frame()
+                st.caption(f"{len(results):,} result rows held in {results.nbytes / 1e6:,.2f} MB "
+                           f"({results.nbytes / len(results):,.0f} bytes per row) in this session.")
+            else:
+                df_res = pd.DataFrame(results)
+
+        st.subheader("Breakdown by Section and Crop")
+        group_options = [c for c in results_view.GROUP_OPTIONS if c in df_res.columns]
+        extra_groups = st.multiselect("Also group by", group_options, key="results_group_by")
 
-    if results_data:
-        st.subheader("Detailed Breakdown per Activity")
-        df_res = pd.DataFrame(results_data)
-        
-        # Display Table
-        st.dataframe(
-            df_res, 
-            column_config={
-                "Emission Reduction": st.column_config.NumberColumn(format="%.2f"),
-                "Ref AGB": st.column_config.NumberColumn(format="%.2f"),
-                "Ref Soil": st.column_config.NumberColumn(format="%.2f"),
-            },
-            use_container_width=True
-        )
-        
-        # Stacked Chart
-        import plotly.express as px
-        if "Section" in df_res.columns and "Emission Reduction" in df_res.columns:
-            fig = px.bar(
-                df_res, 
-                x="Section", 
-                y="Emission Reduction", 
-                color="Crop", 
-                title="Reductions by Crop System"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        # Aggregates (and the figure) are rebuilt only when the results or the grouping change
+        cache = shared_state.get("results_view_cache")
+        if cache is None or cache["results"] is not results:
+            cache = {"results": results}
+            shared_state.set("results_view_cache", cache)
+        groups = tuple(extra_groups)
+        if groups not in cache:
+            with instrumentation.span("results_aggregate"):
+                agg = results_view.aggregate(df_res, groups)
+            with instrumentation.span("chart", chart="results_bar"):
+                import plotly.express as px # Imported only when a chart is drawn
+                fig = px.bar(
+                    agg,
+                    x="Section",
+                    y="Emission Reduction",
+                    color="Crop",
+                    hover_data=["Area", "Rows"] + list(groups),
+                    title="Reductions by Crop System"
+                )
+            cache[groups] = (agg, fig)
+        agg, fig = cache[groups]
+
+        number_formats = {
+            "Emission Reduction": st.column_config.NumberColumn(format="%.2f"),
+            "Area": st.column_config.NumberColumn(format="%.2f"),
+            "Ref AGB": st.column_config.NumberColumn(format="%.2f"),
+            "Ref Soil": st.column_config.NumberColumn(format="%.2f"),
+        }
+        st.dataframe(agg, column_config=number_formats, hide_index=True, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Yearly reductions over the project phases (from per-section sums, so no per-row work here)
+        terms = shared_state.get("agri_yearly_terms")
+        if terms:
+            st.subheader("Yearly reductions")
+            timeline = agri_timeseries.Timeline(shared_state.get("gi_impl_phase"), shared_state.get("gi_cap_phase"), terms["soil_divisor"])
+            if not len(timeline):
+                st.info("Set the implementation and capitalization phases on the Start page to see yearly reductions.")
+            else:
+                yearly_key = ("yearly",) + timeline.key
+                if yearly_key not in cache:
+                    with instrumentation.span("results_yearly"):
+                        yearly = agri_timeseries.yearly_totals(terms["sections"], timeline)
+                        by_section = yearly.melt(id_vars=["Year", "Phase"], value_vars=list(agri_timeseries.SECTION_NAMES.values()),
+                                                 var_name="Section", value_name="Emission Reduction")
+                    with instrumentation.span("chart", chart="results_yearly"):
+                        import plotly.express as px # Imported only when a chart is drawn
+                        yearly_fig = px.bar(by_section, x="Year", y="Emission Reduction", color="Section",
+                                            hover_data=["Phase"], title="Reductions per project year")
+                        yearly_fig.add_scatter(x=yearly["Year"], y=yearly["Cumulative"], name="Cumulative", yaxis="y2")
+                        yearly_fig.update_layout(yaxis2={"overlaying": "y", "side": "right", "title": "Cumulative (tCO2e)"})
+                    cache[yearly_key] = (yearly, yearly_fig)
+                yearly, yearly_fig = cache[yearly_key]
+
+                ramp = (f"{timeline.impl_years} implementation year(s) with the area phased in evenly" if timeline.impl_years
+                        else "All area in place from year 1")
+                st.caption(f"{ramp}, then {timeline.cap_years} capitalization year(s); soil carbon changes over "
+                           f"{timeline.soil_divisor} years from adoption. Total over {len(timeline)} years: "
+                           f"{yearly['Cumulative'].iloc[-1]:,.2f} tCO2e.")
+                st.plotly_chart(yearly_fig, use_container_width=True)
+                yearly_formats = {c: st.column_config.NumberColumn(format="%.2f") for c in yearly.columns[3:]}
+                st.dataframe(yearly, column_config=yearly_formats, hide_index=True, use_container_width=True)
+                st.download_button("Download yearly totals (CSV)", data=lambda: results_view.to_csv_bytes(yearly),
+                                   file_name="cmt_yearly.csv", mime="text/csv", on_click="ignore")
+
+        # Detail rows: one page at a time in the browser, everything as a download
+        with st.expander(f"Detailed rows ({len(df_res):,})"):
+            c_size, c_page = st.columns(2)
+            page_size = c_size.selectbox("Rows per page", results_view.PAGE_SIZES, key="results_page_size")
+            pages = results_view.page_count(len(df_res), page_size)
+            if st.session_state.get("results_page", 1) > pages:
+                st.session_state["results_page"] = pages
+            number = c_page.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key="results_page")
+            st.dataframe(results_view.page(df_res, number, page_size), column_config=number_formats, use_container_width=True)
+
+            d1, d2 = st.columns(2)
+            # Files are generated on click, not on every rerun
+            d1.download_button("Download all rows (CSV)", data=lambda: results_view.to_csv_bytes(df_res),
+                               file_name="cmt_results.csv", mime="text/csv", on_click="ignore")
+            d2.download_button("Download all rows (Parquet)", data=lambda: results_view.to_parquet_bytes(df_res),
+                               file_name="cmt_results.parquet", mime="application/octet-stream", on_click="ignore")
     else:
-        st.info("No calculations performed yet. Go to the Agriculture tab and click 'Calculate Agriculture Emissions' to see results here.")
\ No newline at end of file
+        st.info("No calculations performed yet. Go to the Agriculture tab and click 'Calculate Agriculture Emissions' to see results here.")
+
+PAGES = {
+    "0 Start": render_start,
+    "1 Energy": render_energy,
+    "2 Afforestation & Reforestation": render_arr,
+    "3 Agriculture": render_agriculture,
+    "4 Forestry & Conservation": render_forestry,
+    "Results": render_results,
+}
+
+# 5. Navigation
+if lazy_navigation:
+    # Only the selected page runs; state of the others is kept in session state
+    shared_state.keep_widget_state()
+    page = st.radio("Page", list(PAGES), horizontal=True, key="nav_page", label_visibility="collapsed")
+    if page != "3 Agriculture":
+        agri.persist_editor_state()
+    if page != "1 Energy":
+        sector_page.persist_editor_state(sectors.get_sector("energy"))
+    with instrumentation.span("tab", tab=page):
+        PAGES[page]()
+else:
+    for tab, (label, render) in zip(st.tabs(list(PAGES)), PAGES.items()):
+        with tab, instrumentation.span("tab", tab=label):
+            render()
+
+# --- Rerun timings ---
+run = instrumentation.end_run()
+if st.sidebar.checkbox("Show rerun timings", key="debug_timings", help="Per-tab and per-section timings of this rerun"):
+    instrumentation.render_debug_panel(run, st.session_state.setdefault("debug_timing_history", []), st.session_state)
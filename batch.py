@@ -0,0 +1,259 @@
+# batch.py
+"""
+Headless batch runner: scores many project files without the Streamlit UI.
+
+    python batch.py projects/ --out results/ --workers 8
+    python batch.py "pipeline/**/*.json" --out results/
+
+A project file is either
+  * JSON with the general-info keys of shared_state ("gi_project_name",
+    "gi_country", ...), an optional "soil_divisor" and the section tables
+    under "df_3_1", "df_3_2", "df_3_3" (lists of row objects), or
+  * a CSV/Parquet table in the agri row schema plus a "Section" column
+    ("3.1", "3.2", "3.3"); general-info values may be given as extra
+    columns (e.g. "gi_country") and are read from the first filled cell.
+
+Rows go through the validation stage (validation.py) before calculation.
+Results are streamed to <out>/projects.csv (one line per project),
+<out>/rows.csv (one line per calculated row) and <out>/issues.csv (one line
+per problem cell) as projects finish.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+import agri_engine
+import validation
+
+PROJECT_FILE_TYPES = (".json", ".csv", ".parquet")
+
+DEFAULT_COUNTRY = "Cameroon"
+DEFAULT_SOIL_DIVISOR = 20
+
+PROJECT_COLUMNS = [
+    "project", "file", "country", "region", "soil_divisor", "rows", "issues",
+    "agri_3_1_total", "agri_3_2_total", "agri_3_3_total", "agri_grand_total", "error"
+]
+
+# "Section" values accepted in CSV/Parquet inputs -> session key
+SECTION_ALIASES = {
+    "3.1": "df_3_1", "df_3_1": "df_3_1",
+    "3.2": "df_3_2", "df_3_2": "df_3_2",
+    "3.3": "df_3_3", "df_3_3": "df_3_3",
+}
+SECTION_ALIASES.update({name: key for key, name in agri_engine.SECTION_NAMES.items()})
+
+# -----------------------------
+# 1. INPUT DISCOVERY & LOADING
+# -----------------------------
+
+def find_project_files(inputs):
+    """Expands directories and glob patterns into a sorted list of project files."""
+    files = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        files.update(f for f in candidates if os.path.isfile(f) and f.lower().endswith(PROJECT_FILE_TYPES))
+    return sorted(files)
+
+def _load_json_project(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    # object dtype keeps JSON nulls as None (a str column would turn an empty crop into NaN, which counts as a crop)
+    sections = {key: pd.DataFrame(data.get(key) or [], columns=agri_engine.SECTION_COLUMNS, dtype=object) for key in agri_engine.SECTION_NAMES}
+    info = {k: v for k, v in data.items() if k not in agri_engine.SECTION_NAMES}
+    return info, sections
+
+def _load_table_project(path):
+    if path.lower().endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    if "Section" not in df.columns:
+        raise ValueError("table has no 'Section' column")
+
+    info = {}
+    for col in df.columns:
+        if col.startswith("gi_") or col == "soil_divisor":
+            filled = df[col].dropna()
+            if len(filled):
+                value = filled.iloc[0]
+                info[col] = value.item() if hasattr(value, "item") else value # numpy -> Python scalar
+
+    keys = df["Section"].astype(str).str.strip().map(SECTION_ALIASES)
+    unknown = df.loc[keys.isna(), "Section"].unique()
+    if len(unknown):
+        raise ValueError(f"unknown Section values: {list(unknown)}")
+    sections = {key: df.loc[keys == key] for key in agri_engine.SECTION_NAMES}
+    return info, sections
+
+def load_project(path):
+    """Returns (general info dict, {section key: DataFrame}) for a project file."""
+    if path.lower().endswith(".json"):
+        return _load_json_project(path)
+    return _load_table_project(path)
+
+# -----------------------------
+# 2. PROJECT RUN
+# -----------------------------
+
+def new_summary(path):
+    """PROJECT_COLUMNS dict for a project file, named after the file until its info is read."""
+    summary = dict.fromkeys(PROJECT_COLUMNS, None)
+    summary["file"] = path
+    summary["project"] = os.path.splitext(os.path.basename(path))[0]
+    return summary
+
+def project_settings(info):
+    """
+    (country, soil_divisor) of a project's general info, with the batch
+    defaults for missing values. Raises ValueError for a soil_divisor that
+    is not a positive number.
+    """
+    soil_divisor = info.get("soil_divisor")
+    if soil_divisor is None:
+        soil_divisor = DEFAULT_SOIL_DIVISOR
+    elif isinstance(soil_divisor, bool) or not isinstance(soil_divisor, (int, float)) or not 0 < soil_divisor < math.inf:
+        raise ValueError(f"soil_divisor must be a positive number, not {soil_divisor!r}")
+    return info.get("gi_country") or DEFAULT_COUNTRY, soil_divisor
+
+def run_project(path):
+    """
+    Validates and calculates one project file; returns (summary, rows,
+    issues). Never raises: failures land in 'error'.
+    """
+    summary = new_summary(path)
+    try:
+        info, sections = load_project(path)
+        country, soil_divisor = project_settings(info)
+        sections, issues = validation.validate_project(sections, agri_engine.get_region_params(country))
+        totals, rows = agri_engine.compute_project(sections, country, soil_divisor)
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+        return summary, None, None
+
+    summary.update({
+        "project": info.get("gi_project_name") or summary["project"],
+        "country": country,
+        "region": agri_engine.resolve_region(country),
+        "soil_divisor": soil_divisor,
+        "rows": len(rows),
+        "issues": len(issues),
+        "agri_3_1_total": totals["df_3_1"],
+        "agri_3_2_total": totals["df_3_2"],
+        "agri_3_3_total": totals["df_3_3"],
+        "agri_grand_total": totals["df_3_1"] + totals["df_3_2"] + totals["df_3_3"],
+    })
+    for frame in (rows, issues):
+        frame.insert(0, "project", summary["project"])
+        frame.insert(1, "file", path)
+    return summary, rows, issues
+
+# -----------------------------
+# 3. STREAMING OUTPUT
+# -----------------------------
+
+class ResultWriter:
+    """Appends project summaries, row results and issues to CSV files as they arrive."""
+
+    def __init__(self, out_dir, write_rows=True):
+        os.makedirs(out_dir, exist_ok=True)
+        self.projects_path = os.path.join(out_dir, "projects.csv")
+        self.rows_path = os.path.join(out_dir, "rows.csv") if write_rows else None
+        self.issues_path = os.path.join(out_dir, "issues.csv")
+        self._projects = open(self.projects_path, "w", encoding="utf-8", newline="")
+        self._rows = open(self.rows_path, "w", encoding="utf-8", newline="") if write_rows else None
+        self._issues = open(self.issues_path, "w", encoding="utf-8", newline="")
+        pd.DataFrame(columns=PROJECT_COLUMNS).to_csv(self._projects, index=False)
+        if self._rows:
+            pd.DataFrame(columns=["project", "file"] + agri_engine.RESULT_COLUMNS + agri_engine.PRACTICE_COLUMNS).to_csv(self._rows, index=False)
+        pd.DataFrame(columns=["project", "file", "section"] + validation.ISSUE_COLUMNS).to_csv(self._issues, index=False)
+        self.done = 0
+        self.failed = 0
+
+    def write(self, summary, rows, issues=None):
+        pd.DataFrame([summary], columns=PROJECT_COLUMNS).to_csv(self._projects, index=False, header=False)
+        self._projects.flush()
+        if self._rows and rows is not None and len(rows):
+            rows.to_csv(self._rows, index=False, header=False)
+            self._rows.flush()
+        if issues is not None and len(issues):
+            issues.to_csv(self._issues, index=False, header=False)
+            self._issues.flush()
+        self.done += 1
+        self.failed += summary["error"] is not None
+
+    def close(self):
+        self._projects.close()
+        self._issues.close()
+        if self._rows:
+            self._rows.close()
+
+def run_batch(files, writer, workers=1, progress=None):
+    """
+    Runs every file and hands each result to `writer` as soon as it is ready.
+    With workers > 1 a process pool is used; at most 2 * workers projects
+    are in flight so memory stays flat however many files there are.
+    """
+    if workers <= 1:
+        for path in files:
+            writer.write(*run_project(path))
+            if progress: progress(writer)
+        return
+
+    pending = set()
+    files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            for path in files:
+                pending.add(pool.submit(run_project, path))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                writer.write(*future.result())
+                if progress: progress(writer)
+
+# -----------------------------
+# 4. CLI
+# -----------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the agriculture calculation over many project files.")
+    parser.add_argument("inputs", nargs="+", help="Project files, directories or glob patterns")
+    parser.add_argument("--out", default="batch_results", help="Output directory (default: batch_results)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-rows", action="store_true", help="Only write projects.csv, skip per-row results")
+    args = parser.parse_args(argv)
+
+    files = find_project_files(args.inputs)
+    if not files:
+        print("No project files found.", file=sys.stderr)
+        return 1
+    print(f"... Scoring {len(files)} projects with {args.workers} worker(s) ...")
+
+    def progress(writer):
+        if writer.done % 100 == 0 or writer.done == len(files):
+            print(f"{writer.done}/{len(files)} done, {writer.failed} failed")
+
+    writer = ResultWriter(args.out, write_rows=not args.no_rows)
+    try:
+        run_batch(files, writer, workers=args.workers, progress=progress)
+    finally:
+        writer.close()
+
+    print(f"SUCCESS! Wrote '{writer.projects_path}', '{writer.issues_path}'" + (f" and '{writer.rows_path}'." if writer.rows_path else "."))
+    return 0 if writer.failed == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
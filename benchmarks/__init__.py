@@ -0,0 +1,2 @@
+# Benchmarks, run from the repo root as modules, e.g.
+#   python -m benchmarks.import_time
@@ -0,0 +1,214 @@
+# benchmarks/api_load.py
+"""
+Load generator for the HTTP API (api.py).
+
+    python -m benchmarks.api_load
+    python -m benchmarks.api_load --clients 128 --requests 5000 --rows 10 --compare-unbatched
+    python -m benchmarks.api_load --url http://127.0.0.1:8080 --bulk 20000 --json api.json
+
+Without --url a server is started in a subprocess on a free port (so the
+generator does not share its GIL). Each client keeps one connection open and
+sends small synthetic /calculate projects back to back; the bulk phase sends
+--bulk projects as one NDJSON /bulk request. Reported: requests per second,
+p50/p95/p99 latency and the server's mean batch size. --compare-unbatched
+repeats the run against a server started with --max-batch 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from agri_calc import SECTION_NAMES
+from benchmarks import synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_payloads(count, rows, seed=0):
+    """`count` distinct project bodies with `rows` rows in each 3.x section."""
+    bodies = []
+    for i in range(count):
+        project = {"gi_project_name": f"load-{i}", "gi_country": synthetic.DEFAULT_COUNTRY, "rows": False}
+        for j, key in enumerate(SECTION_NAMES):
+            df = synthetic.section_frame(rows, seed=seed + 3 * i + j, typed=False).astype(object)
+            project[key] = df.where(df.notna(), None).to_dict("records")
+        bodies.append(json.dumps(project).encode("utf-8"))
+    return bodies
+
+# -----------------------------
+# 1. MINIMAL HTTP/1.1 CLIENT
+# -----------------------------
+
+async def _read_response(reader):
+    """(status, body) of one response; handles Content-Length and chunked bodies."""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        return status, await reader.readexactly(int(headers["content-length"]))
+    chunks = []
+    while True:
+        size = int((await reader.readline()).strip(), 16)
+        data = await reader.readexactly(size + 2)
+        if size == 0:
+            return status, b"".join(chunks)
+        chunks.append(data[:-2])
+
+def _request(method, path, host, body=b"", content_type="application/json"):
+    return (f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(_request("GET", path, host))
+    _, body = await _read_response(reader)
+    writer.close()
+    return json.loads(body)
+
+# -----------------------------
+# 2. LOAD PHASES
+# -----------------------------
+
+async def calculate_load(host, port, payloads, clients, total):
+    """`clients` keep-alive connections sharing `total` /calculate requests."""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        for i in counter:
+            start = time.perf_counter()
+            writer.write(_request("POST", "/calculate", host, payloads[i % len(payloads)]))
+            status, _ = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+        writer.close()
+
+    before = await get_json(host, port, "/stats")
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    seconds = time.perf_counter() - start
+    after = await get_json(host, port, "/stats")
+
+    ms = np.asarray(latencies) * 1000
+    batches = after["batches"] - before["batches"]
+    return {
+        "requests": total, "clients": clients, "errors": errors, "seconds": round(seconds, 3),
+        "requests_per_s": round(total / seconds, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "mean_batch": round((after["projects"] - before["projects"]) / batches, 1) if batches else 0,
+    }
+
+async def bulk_load(host, port, payloads, count):
+    """One /bulk request of `count` projects; time to the last result line."""
+    body = b"\n".join(payloads[i % len(payloads)] for i in range(count))
+    reader, writer = await asyncio.open_connection(host, port)
+    start = time.perf_counter()
+    writer.write(_request("POST", "/bulk", host, body, "application/x-ndjson"))
+    status, data = await _read_response(reader)
+    seconds = time.perf_counter() - start
+    writer.close()
+    lines = data.splitlines()
+    return {
+        "projects": count, "status": status, "results": len(lines),
+        "errors": sum(b'"error"' in line for line in lines),
+        "seconds": round(seconds, 3), "projects_per_s": round(count / seconds, 1),
+        "mb_sent": round(len(body) / 1e6, 2),
+    }
+
+# -----------------------------
+# 3. LOCAL SERVER
+# -----------------------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_local_server(max_batch, max_wait_ms):
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "api.py"), "--port", str(port),
+         "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms)],
+        cwd=ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, port
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("api.py did not start")
+
+async def run_phases(host, port, payloads, args):
+    result = {"calculate": await calculate_load(host, port, payloads, args.clients, args.requests)}
+    if args.bulk:
+        result["bulk"] = await bulk_load(host, port, payloads, args.bulk)
+    return result
+
+def run_against(args, payloads, max_batch):
+    if args.url:
+        parts = urlsplit(args.url)
+        return asyncio.run(run_phases(parts.hostname, parts.port or 80, payloads, args))
+    proc, port = start_local_server(max_batch, args.max_wait_ms)
+    try:
+        return asyncio.run(run_phases("127.0.0.1", port, payloads, args))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput and latency of the HTTP API.")
+    parser.add_argument("--url", help="Existing server (default: start api.py locally)")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=2000, help="/calculate requests in total")
+    parser.add_argument("--rows", type=int, default=5, help="Rows per section in each project")
+    parser.add_argument("--bulk", type=int, default=5000, help="Projects in the /bulk request (0 to skip)")
+    parser.add_argument("--max-batch", type=int, default=256, help="Passed to the local server")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Passed to the local server")
+    parser.add_argument("--compare-unbatched", action="store_true", help="Also run against a --max-batch 1 server")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    payloads = make_payloads(200, args.rows)
+    runs = {"batched": run_against(args, payloads, args.max_batch)}
+    if args.compare_unbatched and not args.url:
+        runs["unbatched"] = run_against(args, payloads, 1)
+
+    print(f"{args.requests:,} /calculate requests from {args.clients} clients, {args.rows} rows per section")
+    print(f"{'server':<11}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'batch':>7}{'errors':>8}")
+    for label, r in runs.items():
+        c = r["calculate"]
+        print(f"{label:<11}{c['requests_per_s']:>9,.0f}{c['p50_ms']:>9.1f}{c['p95_ms']:>9.1f}{c['p99_ms']:>9.1f}"
+              f"{c['mean_batch']:>7.1f}{c['errors']:>8}")
+    for label, r in runs.items():
+        if "bulk" in r:
+            b = r["bulk"]
+            print(f"{label:<11}/bulk {b['projects']:,} projects ({b['mb_sent']} MB): {b['seconds']:.2f} s, "
+                  f"{b['projects_per_s']:,.0f} projects/s, {b['errors']} errors")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
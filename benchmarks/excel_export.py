@@ -0,0 +1,151 @@
+# benchmarks/excel_export.py
+"""
+Export of projects to the CMT v1.1 workbook (excel_export.py): one project
+at growing sizes, streaming against openpyxl, then the batch mode across
+worker counts.
+
+    python -m benchmarks.excel_export
+    python -m benchmarks.excel_export --rows 1000 10000 100000 --projects 16 --workers 1 2 4 --json export.json
+
+The single-project part exports a synthetic project of --rows rows (spread
+over the three sections, results calculated beforehand) with each approach.
+openpyxl loads the template, writes every row cell by cell into one added
+sheet per section and saves; it is run up to --openpyxl-max rows only.
+Reported: best wall time of --repeat runs, peak Python heap (tracemalloc),
+file size and whether every part of the file inflates. The batch part writes
+--projects JSON project files of --batch-rows rows and exports them with
+each worker count.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import zipfile
+
+import agri_engine
+import excel_export
+from benchmarks import synthetic
+from param_loader import WORKBOOK_PATH
+
+COUNTRY = "Cameroon"
+INFO = {"gi_project_name": "Benchmark", "gi_country": COUNTRY, "gi_executing_agency": "CAFI"}
+
+# -----------------------------
+# 1. APPROACHES
+# -----------------------------
+
+def streaming_export(sections, results, path):
+    return excel_export.export_project(INFO, sections, path, results=results)["rows"]
+
+def openpyxl_export(sections, results, path):
+    """The straightforward approach: openpyxl load, cell-by-cell writes into one added sheet per section, save."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(WORKBOOK_PATH, keep_vba=True)
+    for key, cell in excel_export.START_CELLS.items():
+        wb["Start"][cell] = INFO.get(key)
+    rows = 0
+    for key, (_, first_row, _) in excel_export.AGRI_BLOCKS.items():
+        columns = excel_export.section_columns(sections[key], results[key], agri_engine.get_region_params(COUNTRY))
+        ws = wb.create_sheet(excel_export.SECTION_NAMES[key])
+        for i in range(len(results[key])):
+            for letter, values in columns.items():
+                value = values[i]
+                if value is not None and value == value: # not empty or NaN
+                    ws[f"{letter}{first_row + i}"] = value
+        rows += len(results[key])
+    wb.save(path)
+    return rows
+
+APPROACHES = {"streaming": streaming_export, "openpyxl": openpyxl_export}
+
+# -----------------------------
+# 2. MEASUREMENT
+# -----------------------------
+
+def _readable(path, rows):
+    """The file opens as a zip, every part inflates and rows were written."""
+    with zipfile.ZipFile(path) as zf:
+        return zf.testzip() is None and rows > 0
+
+def measure(fn, sections, results, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn(sections, results, path)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(sections, results, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 3), "peak_mb": round(peak / 1e6, 1),
+            "file_mb": round(os.path.getsize(path) / 1e6, 1), "correct": _readable(path, rows)}
+
+def write_projects(root, n_projects, rows):
+    """n JSON project files (batch.py format) of `rows` rows each."""
+    files = []
+    for i in range(n_projects):
+        sections = synthetic.project_sections(rows, COUNTRY, seed=i, typed=False)
+        data = {**INFO, "gi_project_name": f"project-{i}"}
+        data.update({key: df.astype(object).where(df.notna(), None).to_dict("records") for key, df in sections.items()})
+        path = os.path.join(root, f"project-{i}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        files.append(path)
+    return files
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workbook export: streaming vs. openpyxl, and the batch mode.")
+    parser.add_argument("--rows", nargs="+", type=int, default=[1_000, 10_000, 100_000], help="Rows per exported project")
+    parser.add_argument("--openpyxl-max", type=int, default=10_000, help="Largest project exported with openpyxl")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per approach (best is reported)")
+    parser.add_argument("--projects", type=int, default=8, help="Projects in the batch part (0: skip it)")
+    parser.add_argument("--batch-rows", type=int, default=10_000, help="Rows per batch project")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, os.cpu_count() or 1], help="Worker counts of the batch part")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore") # openpyxl: unsupported workbook extensions
+    params = agri_engine.get_region_params(COUNTRY)
+    root = tempfile.mkdtemp(prefix="cmt-export-bench-")
+    results, batches = [], []
+    try:
+        print(f"{'rows':>9}{'approach':>11}{'seconds':>10}{'peak MB':>9}{'file MB':>9}{'correct':>9}")
+        for rows in args.rows:
+            sections = synthetic.project_sections(rows, COUNTRY)
+            computed = {key: agri_engine.compute_section_ghg(df, params, 20) for key, df in sections.items()}
+            for name, fn in APPROACHES.items():
+                if name == "openpyxl" and rows > args.openpyxl_max:
+                    continue
+                r = {"rows": rows, "approach": name,
+                     **measure(fn, sections, computed, os.path.join(root, f"{name}.xlsm"), args.repeat)}
+                results.append(r)
+                print(f"{rows:>9,}{name:>11}{r['seconds']:>10.3f}{r['peak_mb']:>9.1f}{r['file_mb']:>9.1f}{str(r['correct']):>9}")
+
+        if args.projects:
+            files = write_projects(root, args.projects, args.batch_rows)
+            print(f"\nbatch: {args.projects} projects of {args.batch_rows:,} rows")
+            print(f"{'workers':>8}{'seconds':>10}{'projects/s':>12}{'failed':>8}")
+            for workers in dict.fromkeys(args.workers):
+                start = time.perf_counter()
+                summaries = list(excel_export.export_batch(files, os.path.join(root, f"reports-{workers}"), workers))
+                seconds = time.perf_counter() - start
+                b = {"workers": workers, "seconds": round(seconds, 3), "projects_per_s": round(len(files) / seconds, 2),
+                     "failed": sum(s["error"] is not None for s in summaries)}
+                batches.append(b)
+                print(f"{workers:>8}{b['seconds']:>10.3f}{b['projects_per_s']:>12.2f}{b['failed']:>8}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "batch": batches}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# benchmarks/excel_extract.py
+"""
+Parameter extraction from the workbook: the streaming pass of sync_excel
+against the previous pandas/openpyxl approach.
+
+    python -m benchmarks.excel_extract
+    python -m benchmarks.excel_extract --scales 1 10 100 --repeat 3 --json extract.json
+
+Each scale is a copy of CMT_v1.1.xlsm whose worksheets are repeated `scale`
+times below the original rows (values only, so the copy stays a valid
+workbook with the original validations and formulas at the top). Scale 1 is
+the real file. Reported per approach: best wall time of --repeat runs, peak
+Python heap (tracemalloc) and whether the extracted lists are right.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import zipfile
+
+import sync_excel
+from param_loader import WORKBOOK_PATH
+
+# -----------------------------
+# 1. PREVIOUS APPROACH
+# -----------------------------
+
+def pandas_extract(path):
+    """sync_excel.extract_parameters as it was: pd.read_excel per sheet and guessed lists."""
+    import pandas as pd
+
+    xls = pd.ExcelFile(path)
+    start_sheet = next((s for s in xls.sheet_names if "Start" in s or "General" in s), None)
+    soil_types, climates, moistures = [], [], []
+    if start_sheet:
+        df_start = pd.read_excel(xls, sheet_name=start_sheet)
+        for col in df_start.columns:
+            unique_vals = df_start[col].dropna().astype(str).unique()
+            if any("Spodic" in v or "Sandy" in v for v in unique_vals):
+                soil_types = [v for v in unique_vals if len(v) < 50]
+            if any("Tropical" in v or "Montane" in v for v in unique_vals):
+                climates = [v for v in unique_vals if len(v) < 50]
+            if any("Wet" in v or "Moist" in v for v in unique_vals):
+                moistures = [v for v in unique_vals if len(v) < 50]
+
+    agri_sheet = next((s for s in xls.sheet_names if "Agri" in s), None)
+    agri_data = {}
+    if agri_sheet:
+        df_raw = pd.read_excel(xls, sheet_name=agri_sheet, header=None)
+        header_row_idx = None
+        for idx, row in df_raw.head(50).iterrows():
+            row_str = [str(x).lower() for x in row.values]
+            if any("crop" in x for x in row_str) and any("agb" in x for x in row_str):
+                header_row_idx = idx
+                break
+        if header_row_idx is not None:
+            df_agri = df_raw.iloc[header_row_idx + 1:]
+            df_agri.columns = [sync_excel.normalize_header(c) for c in df_raw.iloc[header_row_idx]]
+            if "Crop System" in df_agri.columns and "AGB" in df_agri.columns:
+                for _, row in df_agri.iterrows():
+                    crop = row["Crop System"]
+                    if pd.notna(crop) and isinstance(crop, str) and "Select" not in crop:
+                        agri_data[crop] = (row["AGB"], row.get("BGB"), row.get("Soil"))
+    return {"SOIL_TYPES": soil_types, "CLIMATES": climates, "MOISTURES": moistures, "AGRI_CROP_DATA": agri_data}
+
+APPROACHES = {"pandas": pandas_extract, "streaming": sync_excel.extract_parameters}
+
+# -----------------------------
+# 2. SYNTHETIC WORKBOOKS
+# -----------------------------
+
+_ROW_OR_CELL = re.compile(r'(<row r="|<c r="[A-Z]+)(\d+)(")')
+_FORMULA = re.compile(r"<f\b[^>]*/>|<f\b[^>]*>.*?</f>", re.S)
+_DIMENSION = re.compile(r"<dimension [^>]*/>")
+
+def _scale_sheet(xml, scale):
+    """The sheet with its rows repeated `scale` times (copies below the original, values only)."""
+    start = xml.find("<sheetData>")
+    end = xml.find("</sheetData>")
+    if start < 0 or end < 0 or scale <= 1:
+        return xml
+    rows = xml[start + len("<sheetData>"):end]
+    numbers = [int(m.group(2)) for m in _ROW_OR_CELL.finditer(rows) if m.group(1) == '<row r="']
+    if not numbers:
+        return xml
+    step = max(numbers)
+    values = _FORMULA.sub("", rows)
+    copies = [rows]
+    for k in range(1, scale):
+        offset = k * step
+        copies.append(_ROW_OR_CELL.sub(lambda m: f"{m.group(1)}{int(m.group(2)) + offset}{m.group(3)}", values))
+    xml = xml[:start + len("<sheetData>")] + "".join(copies) + xml[end:]
+    return _DIMENSION.sub("", xml, count=1)
+
+def scaled_workbook(src, dst, scale):
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename.startswith("xl/worksheets/sheet") and item.filename.endswith(".xml"):
+                data = _scale_sheet(data.decode("utf-8"), scale).encode("utf-8")
+            zout.writestr(item, data)
+    return dst
+
+# -----------------------------
+# 3. MEASUREMENT
+# -----------------------------
+
+def _correct(params, expected):
+    return all(params.get(k) == expected[k] for k in ("SOIL_TYPES", "CLIMATES", "MOISTURES")) \
+        and list(params.get("AGRI_CROP_DATA", {})) == list(expected["AGRI_CROP_DATA"])
+
+def measure(fn, path, repeat, expected):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        params = fn(path)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 3), "peak_mb": round(peak / 1e6, 1), "correct": _correct(params, expected)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workbook parameter extraction: streaming vs. pandas.")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 100], help="Workbook size multiples")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per approach (best is reported)")
+    parser.add_argument("--approaches", nargs="+", choices=list(APPROACHES), default=list(APPROACHES))
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore") # openpyxl: unsupported workbook extensions
+    expected = sync_excel.extract_parameters(WORKBOOK_PATH)
+    root = tempfile.mkdtemp(prefix="cmt-extract-bench-")
+    results = []
+    try:
+        print(f"{'scale':>6}{'file MB':>9}{'approach':>11}{'seconds':>10}{'peak MB':>9}{'correct':>9}")
+        for scale in args.scales:
+            path = WORKBOOK_PATH if scale == 1 else scaled_workbook(WORKBOOK_PATH, os.path.join(root, f"x{scale}.xlsm"), scale)
+            size = os.path.getsize(path) / 1e6
+            for name in args.approaches:
+                r = {"scale": scale, "file_mb": round(size, 1), "approach": name,
+                     **measure(APPROACHES[name], path, args.repeat, expected)}
+                results.append(r)
+                print(f"{scale:>6}{r['file_mb']:>9.1f}{name:>11}{r['seconds']:>10.3f}{r['peak_mb']:>9.1f}{str(r['correct']):>9}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+# benchmarks/hot_paths.py
+"""
+Benchmarks for the calculation and Results-tab hot paths.
+
+    python -m benchmarks.hot_paths                          # all cases, 100 / 10k / 1M rows
+    python -m benchmarks.hot_paths --sizes 100 10k --json bench.json
+    python -m benchmarks.hot_paths --compare old.json       # ratios against an earlier run
+
+Cases:
+  row_engine          the original per-row loop (iterrows + compute_row_ghg per row)
+  section_engine      agri_engine.compute_section_ghg + section_total on one section
+  validated_engine    the same on untyped (file-like) input: validation.validate_section,
+                      then the engine on the clean frame
+  project_aggregation all three sections through compute_project, the results kept
+                      as one DataFrame the way the Calculate button does
+  excel_sync          sync_excel.extract_parameters on CMT_v1.1.xlsm (size-independent)
+  param_cache_load    param_loader.load_parameters from the on-disk cache (size-independent)
+  results_table       pd.DataFrame(records), for results held as a list of records
+  results_chart       the Results tab's Section x Crop aggregation and plotly bar figure
+  yearly_matrix       agri_timeseries.yearly_matrix, rows x 14 project years, cumulative
+  yearly_matrix_f32   the same stored as float32
+
+Each case is timed (best and median of --repeat runs; a single run from 100k rows)
+and then run once more under tracemalloc for its peak memory. Setup (data
+generation) is never timed. The per-row engine is skipped above
+--row-engine-max rows unless raised, since it takes minutes at 1M.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import validation
+from agri_calc import compute_row_ghg, get_region_params, safe_get, safe_float
+from benchmarks import synthetic
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOIL_DIVISOR = 20
+LARGE_ROWS = 100_000 # at and above this, each case runs once
+DEFAULT_ROW_ENGINE_MAX = 100_000
+
+# -----------------------------
+# 1. CASES
+# -----------------------------
+# Each setup function receives the row count (None for size-independent
+# cases) and returns the zero-argument callable that is timed.
+
+def _results_records(n):
+    totals, rows = agri_engine.compute_project(synthetic.project_sections(n), synthetic.DEFAULT_COUNTRY, SOIL_DIVISOR)
+    return rows.to_dict("records")
+
+def setup_row_engine(n):
+    df = synthetic.section_frame(n, typed=False)
+    params = get_region_params(synthetic.DEFAULT_COUNTRY)
+
+    def run():
+        total = 0
+        chart_rows = []
+        for _, row in df.iterrows():
+            if safe_get(row["Crop System"]):
+                val, details = compute_row_ghg(row, params, SOIL_DIVISOR)
+                total += val
+                chart_rows.append({
+                    "Section": "3.1 Outgrower",
+                    "Crop": safe_get(row["Crop System"]),
+                    "Area": safe_float(row["Area (ha)"]),
+                    "Ref AGB": details["agb_used"],
+                    "Ref Soil": details["soil_used"],
+                    "Emission Reduction": val
+                })
+        return total
+    return run
+
+def setup_section_engine(n):
+    df = synthetic.section_frame(n)
+    params = get_region_params(synthetic.DEFAULT_COUNTRY)
+    return lambda: agri_engine.section_total(agri_engine.compute_section_ghg(df, params, SOIL_DIVISOR))
+
+def setup_validated_engine(n):
+    df = synthetic.section_frame(n, typed=False)
+    params = get_region_params(synthetic.DEFAULT_COUNTRY)
+
+    def run():
+        clean, issues = validation.validate_section(df, params)
+        return agri_engine.section_total(agri_engine.compute_section_ghg(clean, params, SOIL_DIVISOR)), len(issues)
+    return run
+
+def setup_project_aggregation(n):
+    sections = synthetic.project_sections(n)
+
+    def run():
+        totals, rows = agri_engine.compute_project(sections, synthetic.DEFAULT_COUNTRY, SOIL_DIVISOR)
+        return sum(totals.values()), rows
+    return run
+
+def setup_excel_sync(n):
+    from param_loader import WORKBOOK_PATH
+    from sync_excel import extract_parameters
+
+    def run():
+        return extract_parameters(WORKBOOK_PATH)
+    return run
+
+def setup_param_cache_load(n):
+    import param_loader
+    param_loader.load_parameters() # make sure the cache file exists
+
+    def run():
+        param_loader._loaded.clear() # skip the in-process memo, read the cache file
+        return param_loader.load_parameters()
+    return run
+
+def setup_results_table(n):
+    records = _results_records(n)
+    return lambda: pd.DataFrame(records)
+
+def setup_results_chart(n):
+    import plotly.express as px
+    import results_view
+    df_res = pd.DataFrame(_results_records(n))
+
+    def run():
+        agg = results_view.aggregate(df_res)
+        return px.bar(agg, x="Section", y="Emission Reduction", color="Crop",
+                      hover_data=["Area", "Rows"], title="Reductions by Crop System")
+    return run
+
+def _setup_yearly_matrix(n, dtype):
+    import agri_timeseries
+    params = get_region_params(synthetic.DEFAULT_COUNTRY)
+    results = agri_engine.compute_section_ghg(synthetic.section_frame(n), params, SOIL_DIVISOR)
+    timeline = agri_timeseries.Timeline(4, 10, SOIL_DIVISOR)
+    return lambda: agri_timeseries.yearly_matrix(results, timeline, params["residue_multiplier"], dtype=dtype, cumulative=True)
+
+def setup_yearly_matrix(n):
+    return _setup_yearly_matrix(n, np.float64)
+
+def setup_yearly_matrix_f32(n):
+    return _setup_yearly_matrix(n, np.float32)
+
+# name -> (setup, scales with row count)
+CASES = {
+    "row_engine": (setup_row_engine, True),
+    "section_engine": (setup_section_engine, True),
+    "validated_engine": (setup_validated_engine, True),
+    "project_aggregation": (setup_project_aggregation, True),
+    "excel_sync": (setup_excel_sync, False),
+    "param_cache_load": (setup_param_cache_load, False),
+    "results_table": (setup_results_table, True),
+    "results_chart": (setup_results_chart, True),
+    "yearly_matrix": (setup_yearly_matrix, True),
+    "yearly_matrix_f32": (setup_yearly_matrix_f32, True),
+}
+
+# -----------------------------
+# 2. MEASUREMENT
+# -----------------------------
+
+def time_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def peak_memory_mb(fn):
+    """Peak of Python and NumPy allocations made during one call, in MB."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        return (tracemalloc.get_traced_memory()[1] - base) / 1e6
+    finally:
+        tracemalloc.stop()
+
+def run_case(name, rows, repeat):
+    setup, _ = CASES[name]
+    fn = setup(rows)
+    large = rows is not None and rows >= LARGE_ROWS
+    if not large:
+        fn() # warm-up: first-call imports and caches
+    timings = time_call(fn, 1 if large else repeat)
+    return {
+        "case": name,
+        "rows": rows,
+        "best_s": round(min(timings), 6),
+        "median_s": round(sorted(timings)[len(timings) // 2], 6),
+        "runs": len(timings),
+        "rows_per_s": round(rows / min(timings)) if rows and min(timings) > 0 else None,
+        "peak_mb": round(peak_memory_mb(fn), 2),
+    }
+
+def run(cases, sizes, repeat=5, row_engine_max=DEFAULT_ROW_ENGINE_MAX, progress=None):
+    results = []
+    for name in cases:
+        _, scales = CASES[name]
+        for label in (sizes if scales else [None]):
+            rows = synthetic.SIZES[label] if label else None
+            if name == "row_engine" and rows > row_engine_max:
+                result = {"case": name, "rows": rows, "skipped": f"above --row-engine-max {row_engine_max}"}
+            else:
+                result = run_case(name, rows, repeat)
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# -----------------------------
+# 3. CLI
+# -----------------------------
+
+def _format(result):
+    rows = "-" if result["rows"] is None else f"{result['rows']:,}"
+    if "skipped" in result:
+        return f"{result['case']:<22}{rows:>11}  skipped ({result['skipped']})"
+    return (f"{result['case']:<22}{rows:>11}{result['best_s'] * 1000:>12.2f}{result['median_s'] * 1000:>12.2f}"
+            f"{result['peak_mb']:>11.1f}")
+
+def compare(results, baseline_path):
+    """Prints best-time ratios (this run / baseline) for cases present in both."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["rows"]): r for r in json.load(f)["results"] if "best_s" in r}
+    print(f"\nvs. {baseline_path}")
+    for r in results:
+        old = baseline.get((r["case"], r["rows"]))
+        if old and "best_s" in r and old["best_s"] > 0:
+            rows = "-" if r["rows"] is None else f"{r['rows']:,}"
+            print(f"{r['case']:<22}{rows:>11}  time x{r['best_s'] / old['best_s']:.2f}  memory x{r['peak_mb'] / old['peak_mb'] if old['peak_mb'] else float('nan'):.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the calculation and Results-tab hot paths.")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", choices=list(synthetic.SIZES), default=list(synthetic.SIZES))
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case below 100k rows (default: 5)")
+    parser.add_argument("--row-engine-max", type=int, default=DEFAULT_ROW_ENGINE_MAX,
+                        help=f"Largest size for the per-row engine (default: {DEFAULT_ROW_ENGINE_MAX:,})")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<22}{'rows':>11}{'best ms':>12}{'median ms':>12}{'peak MB':>11}")
+    results = run(args.cases, args.sizes, args.repeat, args.row_engine_max, progress=lambda r: print(_format(r), flush=True))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "results": results,
+            }, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/import_time.py
+"""
+Import-time benchmark for the calculation core and the UI layer.
+
+    python -m benchmarks.import_time            # table + budget check
+    python -m benchmarks.import_time --json out.json
+
+Each module is imported in a fresh interpreter with `python -X importtime`
+(best of --repeat runs). The run fails (exit 1) when a module exceeds its
+budget or pulls in a dependency it must not import, so regressions in the
+"pure core has no UI dependencies" split are caught.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UI_MODULES = ["streamlit", "plotly"]
+ARRAY_MODULES = ["pandas", "numpy"]
+
+# module -> (budget in ms, modules it must never import). Streamlit itself
+# imports the base plotly package, so the UI layer is only held to not
+# loading plotly.express (the charting part) at import time.
+CASES = {
+    "agri_calc": (50, UI_MODULES + ARRAY_MODULES),
+    "agri_engine": (1500, UI_MODULES),
+    "batch": (1500, UI_MODULES),
+    "agri": (None, ["plotly.express"]),
+}
+
+def measure(module):
+    """Returns (cumulative import time in ms, set of modules imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr}")
+
+    cumulative_us = None
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue # header line
+        modules.add(name.strip())
+        if name.strip() == module and name.startswith(" " + module):
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000.0, modules
+
+def _imports(modules, name):
+    return any(m == name or m.startswith(name + ".") for m in modules)
+
+def run(repeat=5):
+    results = []
+    for module, (budget_ms, forbidden) in CASES.items():
+        timings = []
+        for _ in range(repeat):
+            ms, modules = measure(module)
+            timings.append(ms)
+        leaked = [name for name in forbidden if _imports(modules, name)]
+        results.append({
+            "module": module,
+            "best_ms": round(min(timings), 2),
+            "median_ms": round(sorted(timings)[len(timings) // 2], 2),
+            "budget_ms": budget_ms,
+            "forbidden_imports": leaked,
+            "ok": not leaked and (budget_ms is None or min(timings) <= budget_ms),
+        })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure module import time with python -X importtime.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (default: 5)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    print(f"{'module':<14}{'best ms':>10}{'median ms':>12}{'budget':>10}  status")
+    for r in results:
+        budget = "-" if r["budget_ms"] is None else r["budget_ms"]
+        status = "ok" if r["ok"] else "FAIL " + (f"imports {', '.join(r['forbidden_imports'])}" if r["forbidden_imports"] else "over budget")
+        print(f"{r['module']:<14}{r['best_ms']:>10.1f}{r['median_ms']:>12.1f}{budget:>10}  {status}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+    return 0 if all(r["ok"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# benchmarks/load_test.py
+"""
+Load test: N live Streamlit sessions of app.py in one process.
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --sessions 50 --rows 2000 --processes 4 --json load.json
+
+Each session goes through a short user journey (open the app, type a project
+name, open Agriculture with a synthetic section, Calculate, open Results and
+group by Tillage, go back to Start and type again), driven with Streamlit's
+AppTest. All sessions are kept alive until the end, so the process memory
+growth divided by N is the memory one more session costs.
+
+AppTest runs one script at a time per process (it swaps a global runtime in
+and out), so the sessions are interleaved step by step, as a server process
+serialises reruns on the GIL. --processes runs several such loops side by
+side to add CPU contention; memory is reported per process.
+
+Reported: rerun latency p50/p95/max per step and overall, process RSS growth
+per session, the deep size of one session's state, and whether the region
+parameters (agri_calc.get_region_params) are one shared object.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+STEPS = ["open", "type_name", "open_agriculture", "calculate", "open_results", "group_by", "back_to_start", "type_again"]
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def _step(at, name):
+    """Applies the user action of step `name` to session `at` (before its rerun)."""
+    from benchmarks import synthetic
+
+    if name == "type_name":
+        at.text_input(key="gi_project_name").input("Load test")
+    elif name == "open_agriculture":
+        at.session_state["df_3_1"] = synthetic.section_frame(at.session_state["load_rows"], seed=at.session_state["load_seed"])
+        at.radio(key="nav_page").set_value("3 Agriculture")
+    elif name == "calculate":
+        next(b for b in at.button if b.label == "Calculate Agriculture Emissions").click()
+    elif name == "open_results":
+        at.radio(key="nav_page").set_value("Results")
+    elif name == "group_by":
+        at.multiselect(key="results_group_by").set_value(["Tillage"])
+    elif name == "back_to_start":
+        at.radio(key="nav_page").set_value("0 Start")
+    elif name == "type_again":
+        at.text_input(key="gi_project_name").input("Load test 2")
+
+def run_sessions(n_sessions, rows, seed=0):
+    """Runs the journey for `n_sessions` interleaved sessions; returns latencies and memory."""
+    import instrumentation
+    import streamlit.logger
+    from streamlit.testing.v1 import AppTest
+
+    def new_session(i):
+        at = AppTest.from_file(APP, default_timeout=600)
+        at.session_state["load_rows"] = rows
+        at.session_state["load_seed"] = seed + i
+        return at
+
+    # One discarded journey first, so module imports are not counted per session
+    warmup = new_session(n_sessions)
+    for step in STEPS:
+        _step(warmup, step)
+        warmup.run()
+    del warmup
+    streamlit.logger.set_log_level("error") # now that all loggers exist: no notices on every rerun
+
+    rss_before = rss_bytes()
+    sessions = [new_session(i) for i in range(n_sessions)]
+    latencies = {step: [] for step in STEPS}
+    for step in STEPS:
+        for at in sessions:
+            _step(at, step)
+            start = time.perf_counter()
+            at.run()
+            latencies[step].append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(f"step {step!r}: {at.exception[0].message}")
+
+    rss_after = rss_bytes()
+    states = [dict(at.session_state.items()) for at in sessions]
+    trackers = [s[k] for s in states for k in s if k.startswith("agri_tracker_")]
+    return {
+        "sessions": n_sessions,
+        "latencies": latencies,
+        "rss_growth_bytes": rss_after - rss_before,
+        "state_bytes": [sum(r["bytes"] for r in instrumentation.session_memory(s)) for s in states],
+        "trackers": len(trackers),
+        "params_objects": len({id(t._params) for t in trackers}),
+    }
+
+def _stats(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {"n": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(ms, 95)), 1), "max_ms": round(float(ms.max()), 1)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit app.")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions per process")
+    parser.add_argument("--rows", type=int, default=500, help="Synthetic rows in section 3.1 of each session")
+    parser.add_argument("--processes", type=int, default=1, help="Processes running sessions side by side")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.processes > 1:
+        with ProcessPoolExecutor(args.processes) as pool:
+            futures = [pool.submit(run_sessions, args.sessions, args.rows, p * args.sessions) for p in range(args.processes)]
+            runs = [f.result() for f in futures]
+    else:
+        runs = [run_sessions(args.sessions, args.rows)]
+    wall = time.perf_counter() - start
+
+    steps = {step: _stats([s for r in runs for s in r["latencies"][step]]) for step in STEPS}
+    overall = _stats([s for r in runs for step in STEPS for s in r["latencies"][step]])
+    rss_per_session = [r["rss_growth_bytes"] / r["sessions"] for r in runs]
+    state_bytes = [b for r in runs for b in r["state_bytes"]]
+    summary = {
+        "sessions": args.sessions * args.processes,
+        "processes": args.processes,
+        "rows_per_session": args.rows,
+        "wall_s": round(wall, 2),
+        "rerun_latency": overall,
+        "steps": steps,
+        "rss_per_session_mb": round(float(np.mean(rss_per_session)) / 1e6, 2),
+        "state_per_session_mb": round(float(np.mean(state_bytes)) / 1e6, 2),
+        "params_objects_per_process": [r["params_objects"] for r in runs],
+    }
+
+    print(f"{summary['sessions']} sessions in {args.processes} process(es), {args.rows:,} rows each, {wall:,.1f} s")
+    print(f"{'step':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for step, s in list(steps.items()) + [("all reruns", overall)]:
+        print(f"{step:<18}{s['n']:>6}{s['p50_ms']:>10,.1f}{s['p95_ms']:>10,.1f}{s['max_ms']:>10,.1f}")
+    print(f"memory per session: {summary['rss_per_session_mb']:,.2f} MB RSS growth, "
+          f"{summary['state_per_session_mb']:,.2f} MB session state")
+    print(f"region parameter objects per process: {summary['params_objects_per_process']} "
+          f"(1 = shared across all sessions)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
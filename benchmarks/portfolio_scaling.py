@@ -0,0 +1,94 @@
+# benchmarks/portfolio_scaling.py
+"""
+Throughput of the portfolio evaluator (portfolio.py) across worker counts.
+
+    python -m benchmarks.portfolio_scaling
+    python -m benchmarks.portfolio_scaling --projects 600 --rows 5000 --workers 1 2 4 8 --json portfolio.json
+
+A synthetic portfolio (projects spread over the three regions, rows as read
+from project files) is scored with each worker count; 1 is the in-process
+run the speedups are relative to. Reported per count: best wall time of
+--repeat runs, rows/s, speedup, parallel efficiency and whether the project
+totals equal the in-process ones. Worker counts above the machine's core
+count are still run, but flagged: they cannot scale.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import agri_engine
+import batch
+import portfolio
+from benchmarks import synthetic
+
+# One country per region, and one more that falls back to Central Africa
+COUNTRIES = ["Cameroon", "Indonesia", "Brazil", "Gabon"]
+
+def synthetic_portfolio(n_projects, rows):
+    """load_portfolio()-shaped (summary, sections) pairs of `rows` rows each."""
+    projects = []
+    for i in range(n_projects):
+        country = COUNTRIES[i % len(COUNTRIES)]
+        region = agri_engine.resolve_region(country)
+        summary = dict.fromkeys(batch.PROJECT_COLUMNS, None)
+        summary.update({"project": f"project-{i}", "country": country, "region": region,
+                        "soil_divisor": 20 if i % 3 else 10})
+        sections = synthetic.project_sections(rows, region if region != "Central Africa" else country, seed=i, typed=False)
+        projects.append((summary, sections))
+    return projects
+
+def measure(projects, workers, repeat, rows_per_task):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = portfolio.evaluate_portfolio(projects, workers, rows_per_task)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Portfolio throughput across worker counts.")
+    parser.add_argument("--projects", type=int, default=240, help="Projects in the portfolio")
+    parser.add_argument("--rows", type=int, default=2500, help="Rows per project")
+    parser.add_argument("--workers", nargs="+", type=int, default=list(range(1, cores + 1)), help="Worker counts (default: 1..cores)")
+    parser.add_argument("--rows-per-task", type=int, default=portfolio.ROWS_PER_TASK)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per worker count (best is reported)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    projects = synthetic_portfolio(args.projects, args.rows)
+    n_rows = args.projects * args.rows
+    print(f"{args.projects} projects, {n_rows:,} rows, {cores} core(s) available")
+
+    baseline_s, (baseline, _, _) = measure(projects, 1, args.repeat, args.rows_per_task)
+    results = []
+    print(f"{'workers':>8}{'seconds':>10}{'rows/s':>12}{'speedup':>9}{'efficiency':>12}{'same':>6}")
+    for workers in sorted(set(args.workers)):
+        if workers == 1:
+            seconds, frame = baseline_s, baseline
+        else:
+            seconds, (frame, _, _) = measure(projects, workers, args.repeat, args.rows_per_task)
+        speedup = baseline_s / seconds
+        r = {
+            "workers": workers,
+            "seconds": round(seconds, 3),
+            "rows_per_s": round(n_rows / seconds),
+            "speedup": round(speedup, 2),
+            "efficiency": round(speedup / workers, 2),
+            "same_totals": bool(frame.equals(baseline)),
+            "oversubscribed": workers > cores,
+        }
+        results.append(r)
+        flag = "  (more workers than cores)" if r["oversubscribed"] else ""
+        print(f"{workers:>8}{r['seconds']:>10.3f}{r['rows_per_s']:>12,}{r['speedup']:>9.2f}"
+              f"{r['efficiency']:>12.2f}{str(r['same_totals']):>6}{flag}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cores": cores, "projects": args.projects, "rows": n_rows, "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# benchmarks/result_cache.py
+"""
+Cost of a section calculation with and without the result cache (result_cache.py).
+
+    python -m benchmarks.result_cache
+    python -m benchmarks.result_cache --sizes 10000 1000000 --json cache.json
+
+Reported per table size and input form (typed as the editor holds it,
+untyped as read from files): the key (content hash) alone, a cold miss
+(hash + calculation + store in memory), a memory hit and a disk hit, best of
+--repeat runs, with the speedup of each hit over the uncached engine.
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+import agri_engine
+import result_cache
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+SOIL_DIVISOR = 20
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measure(n, typed, repeat, disk_dir):
+    df = synthetic.section_frame(n, COUNTRY, typed=typed)
+    params = agri_engine.get_region_params(agri_engine.resolve_region(COUNTRY))
+    engine = best_of(lambda: agri_engine.compute_section_ghg(df, params, SOIL_DIVISOR), repeat)
+    key = best_of(lambda: result_cache.cache_key(df, params, SOIL_DIVISOR), repeat)
+
+    # A fresh memory-only cache each time: hash, calculation and store
+    miss_s = best_of(lambda: result_cache.cached_section_ghg(df, params, SOIL_DIVISOR, result_cache.ResultCache()), repeat)
+
+    memory = result_cache.ResultCache(disk_dir=disk_dir)
+    result_cache.cached_section_ghg(df, params, SOIL_DIVISOR, memory) # also fills the disk tier
+    memory_s = best_of(lambda: result_cache.cached_section_ghg(df, params, SOIL_DIVISOR, memory), repeat)
+
+    # A fresh memory tier each time, so every lookup is served from disk
+    disk_s = best_of(lambda: result_cache.cached_section_ghg(
+        df, params, SOIL_DIVISOR, result_cache.ResultCache(memory_bytes=0, disk_dir=disk_dir)), repeat)
+    return {
+        "rows": n,
+        "input": "typed" if typed else "untyped",
+        "engine_s": round(engine, 4),
+        "key_s": round(key, 4),
+        "miss_s": round(miss_s, 4),
+        "memory_hit_s": round(memory_s, 4),
+        "disk_hit_s": round(disk_s, 4),
+        "memory_speedup": round(engine / memory_s, 1),
+        "disk_speedup": round(engine / disk_s, 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Section calculation cost with and without the result cache.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 1_000_000], help="Rows per section")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best is reported)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'rows':>10}{'input':>9}{'engine':>9}{'key':>9}{'miss':>9}{'memory':>9}{'disk':>9}{'mem x':>8}{'disk x':>8}")
+    with tempfile.TemporaryDirectory() as disk_dir:
+        for n in args.sizes:
+            for typed in (True, False):
+                r = measure(n, typed, args.repeat, disk_dir)
+                results.append(r)
+                print(f"{n:>10,}{r['input']:>9}{r['engine_s']:>9.4f}{r['key_s']:>9.4f}{r['miss_s']:>9.4f}"
+                      f"{r['memory_hit_s']:>9.4f}{r['disk_hit_s']:>9.4f}{r['memory_speedup']:>8.1f}{r['disk_speedup']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
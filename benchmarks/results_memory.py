@@ -0,0 +1,77 @@
+# benchmarks/results_memory.py
+"""
+Bytes per session held by the agriculture results, by storage form.
+
+    python -m benchmarks.results_memory
+    python -m benchmarks.results_memory --sizes 10k 1M --json memory.json
+
+For a synthetic project of each size it reports the results as a list of
+row dicts (the original agri_results_table), as a DataFrame, and as the
+columnar results_view.ResultsTable, plus the section trackers kept for
+incremental recalculation. Sizes are deep: labels and dict keys included.
+"""
+import argparse
+import json
+import sys
+import time
+
+import pandas as pd
+
+import agri_engine
+import agri_incremental
+import instrumentation
+import results_view
+from agri_calc import SECTION_NAMES, get_region_params, resolve_region
+from benchmarks import synthetic
+
+SOIL_DIVISOR = 20
+
+def measure(n):
+    params = get_region_params(synthetic.DEFAULT_COUNTRY)
+    sections = synthetic.project_sections(n)
+    trackers = {key: agri_incremental.SectionTracker(df, params, SOIL_DIVISOR) for key, df in sections.items()}
+
+    frames = [agri_engine.results_frame(t.results(), SECTION_NAMES[key]) for key, t in trackers.items()]
+    frame = pd.concat(frames, ignore_index=True)
+    frame["Region"] = resolve_region(synthetic.DEFAULT_COUNTRY)
+
+    start = time.perf_counter()
+    table = results_view.ResultsTable.from_frame(frame)
+    build_s = time.perf_counter() - start
+
+    rows = max(len(frame), 1)
+    forms = {
+        "records": instrumentation.estimate_bytes(frame.to_dict("records")),
+        "dataframe": int(frame.memory_usage(deep=True).sum()),
+        "results_table": table.nbytes,
+        "trackers": sum(t.nbytes for t in trackers.values()),
+    }
+    return {
+        "rows": len(frame),
+        "bytes": forms,
+        "bytes_per_row": {form: round(b / rows, 1) for form, b in forms.items()},
+        "results_table_build_s": round(build_s, 4),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory held per session by the results, by storage form.")
+    parser.add_argument("--sizes", nargs="+", choices=list(synthetic.SIZES), default=["10k", "1M"])
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'rows':>11}{'records':>12}{'dataframe':>12}{'table':>12}{'trackers':>12}   bytes per row")
+    for label in args.sizes:
+        r = measure(synthetic.SIZES[label])
+        results.append(r)
+        per_row = r["bytes_per_row"]
+        print(f"{r['rows']:>11,}{per_row['records']:>12,.0f}{per_row['dataframe']:>12,.0f}"
+              f"{per_row['results_table']:>12,.1f}{per_row['trackers']:>12,.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
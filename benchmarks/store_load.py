@@ -0,0 +1,104 @@
+# benchmarks/store_load.py
+"""
+Save / load times of the project store (project_store.py).
+
+    python -m benchmarks.store_load
+    python -m benchmarks.store_load --sizes 10k 1M --json store.json
+
+For a synthetic project of each size (typed sections as the data editor
+holds them, calculated, with the Results table) it reports the save time,
+the time to load the project (manifest only), to open the Results page and
+the Agriculture page (their tables read from the memory-mapped files), and
+for comparison the full recalculation the restored results replace.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+
+import pandas as pd
+
+import agri_engine
+import agri_incremental
+import project_store
+import results_view
+from agri_calc import SECTION_NAMES, get_region_params
+from benchmarks import synthetic
+
+SOIL_DIVISOR = 20
+
+def _session(n):
+    params = get_region_params(synthetic.DEFAULT_COUNTRY)
+    state = {"gi_country": synthetic.DEFAULT_COUNTRY, "gi_project_name": f"bench-{n}",
+             "gi_date": date.today(), "soil_divisor": SOIL_DIVISOR}
+    frames = []
+    for key, df in synthetic.project_sections(n).items():
+        state[key] = df
+        tracker = agri_incremental.tracker_for(state, key, df, params, SOIL_DIVISOR)
+        frames.append(agri_engine.results_frame(tracker.results(), SECTION_NAMES[key]))
+    results = pd.concat(frames, ignore_index=True)
+    results["Region"] = synthetic.DEFAULT_COUNTRY
+    state[project_store.RESULTS_KEY] = results_view.ResultsTable.from_frame(results)
+    return state
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+def measure(n, root):
+    state = _session(n)
+    name = f"bench-{n}"
+    manifest, save_s = _timed(lambda: project_store.save_project(name, state, root))
+
+    restored = {}
+    _, load_s = _timed(lambda: project_store.restore(restored, project_store.load_project(name, root)))
+    _, results_s = _timed(lambda: project_store.restore_pending(restored, [project_store.RESULTS_KEY]))
+    _, sections_s = _timed(lambda: project_store.restore_pending(restored, list(SECTION_NAMES)))
+    assert all(restored[f"agri_tracker_{key}"].last_recomputed == 0 for key in SECTION_NAMES)
+
+    params = get_region_params(synthetic.DEFAULT_COUNTRY)
+    _, recompute_s = _timed(lambda: [agri_incremental.SectionTracker(restored[key], params, SOIL_DIVISOR) for key in SECTION_NAMES])
+
+    path = os.path.join(root, project_store._slug(name))
+    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return {
+        "rows": n,
+        "save_s": round(save_s, 3),
+        "load_ms": round(load_s * 1000, 2),
+        "open_results_ms": round(results_s * 1000, 1),
+        "open_sections_ms": round(sections_s * 1000, 1),
+        "recompute_ms": round(recompute_s * 1000, 1),
+        "disk_mb": round(size / 1e6, 1),
+        "files": sorted(os.listdir(path)),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project store save/load times.")
+    parser.add_argument("--sizes", nargs="+", choices=list(synthetic.SIZES), default=["10k", "1M"])
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix="cmt-store-bench-")
+    results = []
+    try:
+        print(f"{'rows':>11}{'save s':>9}{'load ms':>9}{'results ms':>12}{'sections ms':>13}{'recompute ms':>14}{'disk MB':>9}")
+        for label in args.sizes:
+            r = measure(synthetic.SIZES[label], root)
+            results.append(r)
+            print(f"{r['rows']:>11,}{r['save_s']:>9.2f}{r['load_ms']:>9.2f}{r['open_results_ms']:>12.1f}"
+                  f"{r['open_sections_ms']:>13.1f}{r['recompute_ms']:>14.1f}{r['disk_mb']:>9.1f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
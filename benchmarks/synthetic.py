@@ -0,0 +1,63 @@
+# benchmarks/synthetic.py
+"""
+Synthetic project generators shared by the benchmarks.
+
+Rows look like data-editor input: crops and practice options drawn from the
+region's parameter tables, a share of empty rows, and occasional "Local ..."
+overrides. Generation is seeded, so every run times the same data.
+"""
+import numpy as np
+import pandas as pd
+
+from agri_calc import SECTION_COLUMNS, SECTION_NAMES, get_region_params
+
+SIZES = {"100": 100, "10k": 10_000, "1M": 1_000_000}
+
+DEFAULT_COUNTRY = "Cameroon"
+
+def _pick(rng, options, n, empty_share):
+    """Random labels from `options` with `empty_share` of the cells left as None."""
+    values = np.asarray(list(options), dtype=object)[rng.integers(0, len(options), n)]
+    values[rng.random(n) < empty_share] = None
+    return values
+
+def _overrides(rng, n, share, low, high):
+    values = np.full(n, np.nan)
+    mask = rng.random(n) < share
+    values[mask] = rng.uniform(low, high, mask.sum())
+    return values
+
+def section_frame(n, country=DEFAULT_COUNTRY, seed=0, typed=True):
+    """
+    One 3.x section of `n` rows. With typed=True the option columns are
+    categoricals like the data editor's; otherwise plain object columns.
+    """
+    params = get_region_params(country)
+    factors = params["removal_factors"]
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame({
+        "Crop System": _pick(rng, params["agb_bgb_soil"], n, 0.05),
+        "Area (ha)": np.round(rng.uniform(0.5, 500.0, n), 1),
+        "Tillage": _pick(rng, factors["tillage"], n, 0.1),
+        "Inputs": _pick(rng, factors["input"], n, 0.1),
+        "Residue": _pick(rng, factors["residue"], n, 0.1),
+        "Local AGB": _overrides(rng, n, 0.02, 1.0, 150.0),
+        "Local BGB": _overrides(rng, n, 0.02, 0.5, 40.0),
+        "Local Soil": _overrides(rng, n, 0.02, 10.0, 120.0),
+        "Local Tillage Factor": _overrides(rng, n, 0.01, 0.8, 1.2),
+        "Local Input Factor": _overrides(rng, n, 0.01, 0.8, 1.2),
+        "Local Residue Factor": _overrides(rng, n, 0.01, 0.0, 2.0),
+    }, columns=SECTION_COLUMNS)
+
+    if typed:
+        for col, table in (("Crop System", params["agb_bgb_soil"]), ("Tillage", factors["tillage"]),
+                           ("Inputs", factors["input"]), ("Residue", factors["residue"])):
+            df[col] = df[col].astype(pd.CategoricalDtype(list(table)))
+    return df
+
+def project_sections(n, country=DEFAULT_COUNTRY, seed=0, typed=True):
+    """{section key: frame} with `n` rows split across the three 3.x sections."""
+    keys = list(SECTION_NAMES)
+    sizes = [n // len(keys) + (i < n % len(keys)) for i in range(len(keys))]
+    return {key: section_frame(size, country, seed + i, typed) for i, (key, size) in enumerate(zip(keys, sizes))}
@@ -0,0 +1,186 @@
+# energy.py
+# Energy sector, sheet '1.Energy' of CMT_v1.1.xlsm: 1.1 improved cookstoves,
+# 1.2 charcoal transformation efficiency, 1.3 wood fuel substitution and
+# 1.4 cogeneration. Each table is calculated over whole columns with the
+# formulas of the first row of the workbook's table; a "Local" column
+# replaces the default factor when it holds a positive number, as in the
+# workbook. No Streamlit imports: the page is sector_page.py.
+import numpy as np
+import pandas as pd
+
+import parameters
+import sectors
+from agri_calc import frozen_params
+from sectors import Column, local_or_default, lookup, number, selected
+
+# Session key of each table -> label used in the totals
+TABLE_NAMES = {
+    "df_1_1": "1.1 Cookstoves",
+    "df_1_2": "1.2 Transformation",
+    "df_1_3": "1.3 Fuel substitution",
+    "df_1_4": "1.4 Cogeneration",
+}
+
+COOKSTOVE_GASES = ("CO2", "CH4", "NMVOC", "CO")
+SUBSTITUTION_GASES = ("CO2", "CH4", "N2O")
+
+SCHEMA = {
+    "df_1_1": [
+        Column("Cookstove", "option", "cookstove", "Type of cookstove"),
+        Column("Fuel", "option", "fuel", "Type of fuel"),
+        Column("Cookstoves per year", help="Number of cookstoves distributed per year"),
+        Column("Local Fuel Reduction", label="Local fuel reduction (0-1)", help="Share of fuel saved with the improved cookstove (default 0.35)"),
+        Column("Local Adoption Rate", label="Local adoption rate (0-1)", help="Share of days/hours the household uses it (default 0.7)"),
+        *[Column(f"Local {gas} EF", label=f"Local {gas} EF (g/kg)", help="Emission factor of the traditional cookstove")
+          for gas in COOKSTOVE_GASES],
+    ],
+    "df_1_2": [
+        Column("Activity", "option", "transformation_activity", "Transformation activity"),
+        Column("System", "option", "transformation_system", "Transformation system"),
+        Column("Charcoal (t/yr)", label="Charcoal production (t/yr)"),
+        Column("Local CO2 EF", label="Local CO2 EF (g/kg)"),
+        Column("Local CH4 EF", label="Local CH4 EF (g/kg)"),
+    ],
+    "df_1_3": [
+        Column("Category", "option", "fuel_category", "Fuel category"),
+        Column("Fuel", "option", "substitution_fuel", "Fuel type"),
+        Column("Energy (MWh)", label="Sustainable energy deployed (MWh)"),
+        Column("Local CO2 EF", label="Local CO2 EF (kg/MWh)"),
+        Column("Local CH4 EF", label="Local CH4 EF (g/MWh)"),
+        Column("Local N2O EF", label="Local N2O EF (g/MWh)"),
+    ],
+    "df_1_4": [
+        Column("CHP Facility", "option", "chp_facility", "CHP facility"),
+        Column("Electricity (MWh)", label="Electricity produced (MWh)"),
+        Column("Heat (MWh)", label="Heat produced (MWh)"),
+        Column("Local Electricity EF", label="Local electricity EF (kgCO2e/MWh)", help="Default 37.79"),
+        Column("Local Heat EF", label="Local heat EF (kgCO2e/MWh)", help="Default 10.08"),
+    ],
+}
+
+ROW_KEY = {"df_1_1": "Fuel", "df_1_2": "Activity", "df_1_3": "Fuel", "df_1_4": "CHP Facility"}
+
+# -----------------------------
+# 1. PARAMETERS
+# -----------------------------
+
+_params = {} # grid intensity -> read-only params (the only country-dependent value)
+
+def energy_params(country):
+    """Energy parameter tables for `country`; one shared read-only object per distinct value set."""
+    grid = parameters.GRID_INTENSITY_BY_COUNTRY.get(country, 0.0)
+    params = _params.get(grid)
+    if params is None:
+        lists = dict(parameters.ENERGY_LISTS)
+        lists["substitution_fuel"] = list(dict.fromkeys(lists["modern_fuel"] + lists["renewable_fuel"]))
+        substitution = dict(parameters.SUBSTITUTION_FUEL_EF)
+        substitution[parameters.ELECTRIC_FUEL] = {"CO2": grid, "CH4": 0.0, "N2O": 0.0}
+        params = frozen_params({
+            "lists": lists,
+            "gwp": parameters.GWP,
+            "cookstove_ef": parameters.TRADITIONAL_COOKSTOVE_EF,
+            "stove_fuel_use": parameters.STOVE_FUEL_USE,
+            "fuel_reduction": parameters.DEFAULT_FUEL_REDUCTION,
+            "adoption_rate": parameters.DEFAULT_ADOPTION_RATE,
+            "baseline_charcoal_ef": parameters.BASELINE_CHARCOAL_EF,
+            "transformation_ef": parameters.TRANSFORMATION_SYSTEM_EF,
+            "no_emission_activity": parameters.NO_EMISSION_ACTIVITY,
+            "wood_co2_ef": parameters.TRADITIONAL_COOKSTOVE_EF["Wood"]["CO2"],
+            "wood_energy": parameters.WOOD_ENERGY_MWH_PER_KG,
+            "substitution_ef": substitution,
+            "chp_electricity_ef": parameters.CHP_ELECTRICITY_EF,
+            "chp_heat_ef": parameters.CHP_HEAT_EF,
+        })
+        params = _params.setdefault(grid, params)
+    return params
+
+def _per_gas(table, gas):
+    return {label: factors[gas] for label, factors in table.items()}
+
+# -----------------------------
+# 2. TABLE CALCULATIONS
+# -----------------------------
+
+def cookstoves(df, params):
+    """1.1: fuel use x stoves x factor (g/kg -> t/t) x fuel reduction x adoption, per gas."""
+    fuel = df["Fuel"]
+    stoves = number(df["Cookstoves per year"])
+    fuel_use = lookup(fuel, params["stove_fuel_use"])
+    saved = local_or_default(df["Local Fuel Reduction"], params["fuel_reduction"]) * \
+        local_or_default(df["Local Adoption Rate"], params["adoption_rate"])
+    gwp = params["gwp"]
+    out, total = {}, np.zeros(len(df))
+    for gas in COOKSTOVE_GASES:
+        factor = local_or_default(df[f"Local {gas} EF"], lookup(fuel, _per_gas(params["cookstove_ef"], gas)))
+        out[f"{gas} (t)"] = fuel_use * stoves * (factor / 1000) * saved
+        total = total + out[f"{gas} (t)"] * gwp[gas]
+    out["total"] = total
+    return out
+
+def transformation(df, params):
+    """1.2: (baseline - system factor) x charcoal production, CO2 and CH4; 0 without a known system."""
+    activity, system = df["Activity"], df["System"]
+    charcoal = number(df["Charcoal (t/yr)"])
+    clean = lookup(activity, {params["no_emission_activity"]: 1.0}) > 0
+    known = selected(activity) & selected(system) & ~clean
+    out = {}
+    for gas in ("CO2", "CH4"):
+        default = np.where(known, lookup(system, _per_gas(params["transformation_ef"], gas)), 0.0)
+        factor = local_or_default(df[f"Local {gas} EF"], default)
+        reduced = (params["baseline_charcoal_ef"][gas] * charcoal * 1000 - factor * charcoal * 1000) / 1_000_000
+        out[f"{gas} (t)"] = np.where(~clean & (default == 0), 0.0, reduced)
+    out["total"] = out["CO2 (t)"] + out["CH4 (t)"] * params["gwp"]["CH4"]
+    return out
+
+def substitution(df, params):
+    """
+    1.3: wood-equivalent emissions of the energy deployed minus the substitute
+    fuel's. As in the workbook, the CH4 and N2O terms also start from the
+    wood CO2 intensity.
+    """
+    fuel = df["Fuel"]
+    energy = number(df["Energy (MWh)"])
+    chosen = selected(df["Category"]) & selected(fuel)
+    wood_intensity = (params["wood_co2_ef"] / 1000) / params["wood_energy"]
+    gwp = params["gwp"]
+    out, total = {}, np.zeros(len(df))
+    for gas, scale in zip(SUBSTITUTION_GASES, (1000, 1_000_000, 1_000_000)):
+        factor = local_or_default(df[f"Local {gas} EF"], lookup(fuel, _per_gas(params["substitution_ef"], gas)))
+        out[f"{gas} (t)"] = np.where(chosen, (wood_intensity * energy - energy * factor) / scale, 0.0)
+        total = total + out[f"{gas} (t)"] * gwp[gas]
+    out["total"] = total
+    return out
+
+def cogeneration(df, params):
+    """1.4: wood-equivalent emissions of the electricity minus the CHP output's (kgCO2e/MWh)."""
+    electricity, heat = number(df["Electricity (MWh)"]), number(df["Heat (MWh)"])
+    wood_intensity = (params["wood_co2_ef"] / 1_000_000) / params["wood_energy"]
+    electricity_ef = local_or_default(df["Local Electricity EF"], params["chp_electricity_ef"])
+    heat_ef = local_or_default(df["Local Heat EF"], params["chp_heat_ef"])
+    total = wood_intensity * electricity - (electricity * (electricity_ef / 1000) + heat * (heat_ef / 1000))
+    return {"total": np.where(selected(df["CHP Facility"]), total, 0.0)}
+
+CALCULATIONS = {"df_1_1": cookstoves, "df_1_2": transformation, "df_1_3": substitution, "df_1_4": cogeneration}
+
+# -----------------------------
+# 3. SECTOR
+# -----------------------------
+
+class EnergySector(sectors.Sector):
+    key = "energy"
+    name = "Energy"
+    title = "1. Energy"
+    flags = ("check_energy",)
+    tables = TABLE_NAMES
+    schema = SCHEMA
+    row_key = ROW_KEY
+
+    def parameters(self, settings):
+        return energy_params(settings.get("country"))
+
+    def calculate(self, table, df, params):
+        df = self.counted(table, df)
+        labels = {col.name: df[col.name].to_numpy(dtype=object) for col in self.schema[table] if col.kind == "option"}
+        return pd.DataFrame({**labels, **CALCULATIONS[table](df, params)}, index=df.index)
+
+sectors.register(EnergySector())
@@ -0,0 +1,675 @@
+# excel_export.py
+"""
+Exports projects into a copy of CMT_v1.1.xlsm, the layout reports go back to
+CAFI in.
+
+    python excel_export.py projects/ --out reports/ --workers 8
+
+Project files are those of batch.py (JSON, or CSV/Parquet with a "Section"
+column); one <out>/<file name>.xlsm is written per project, plus
+<out>/exports.csv listing them. In the app, the Results page offers the same
+report for the session (session_report).
+
+What is written:
+  * Start: the general info, the duration and the Activities reported boxes;
+  * 3.Agriculture: the rows of each ticked 3.x section, with the app's
+    results (default factors, total) as values; the six input rows of a
+    section in the template hold its first six rows and the rest continue on
+    an added sheet ("3.1 Outgrower (cont.)") with the same headers, so the
+    section total sums both, plus the total of the section's file import on
+    the Agriculture page (a figure in the formula: imported rows are not in
+    the report);
+  * 1.Energy: the section totals of the session's Energy results;
+  * Results: the cached values of its cells, so readers that do not
+    recalculate (pandas, previews) see the report's figures.
+Excel recalculates the workbook on open; the formulas left in it give the
+same figures.
+
+The template is copied part by part at the zip level and only the sheets
+above are edited, as text; the VBA project, drawings and styles are copied
+unchanged. Added sheets are streamed into the archive a block of rows at a
+time, so the memory used does not grow with the number of rows.
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import batch
+import sectors
+import validation
+from agri_calc import params_version
+from agri_engine import SECTION_COLUMNS, SECTION_NAMES
+from param_loader import WORKBOOK_PATH
+from sync_excel import cell_position, column_index
+
+# Rows per block written to an added sheet
+CHUNK_ROWS = 10_000
+
+DEFAULT_COMPRESSLEVEL = 1 # deflate level; added sheets dominate the time spent compressing
+
+MIME_TYPE = "application/vnd.ms-excel.sheet.macroEnabled.12"
+
+# -----------------------------
+# 1. TEMPLATE LAYOUT
+# -----------------------------
+
+START_SHEET = "Start"
+ENERGY_SHEET = "1.Energy"
+AGRI_SHEET = "3.Agriculture"
+RESULTS_SHEET = "Results"
+
+# General-info key -> input cell of the Start sheet
+START_CELLS = {
+    "gi_user_name": "G17", "gi_date": "G18", "gi_project_name": "G19", "gi_project_cost": "G21",
+    "gi_funding_agency": "G22", "gi_executing_agency": "G23",
+    "gi_country": "T17", "gi_climate": "T18", "gi_moisture": "T19", "gi_soil": "T20",
+    "gi_impl_phase": "W21", "gi_cap_phase": "W22",
+}
+DURATION_CELL = "W23"
+
+# Cell linked to each Activities reported box -> check_* flag
+FLAG_CELLS = {
+    "M32": "check_energy", "M33": "check_energy", "M34": "check_energy", "M35": "check_energy",
+    "M38": "check_arr", "M39": "check_arr", "M40": "check_arr",
+    "M43": "check_agri_3_1", "M44": "check_agri_3_2", "M45": "check_agri_3_3",
+    "M48": "check_forest", "M49": "check_forest", "M50": "check_forest",
+}
+
+# App country name -> entry of the workbook's country list
+WORKBOOK_COUNTRIES = {
+    "Cameroon": "Cameroon",
+    "Central African Republic": "CAR",
+    "Republic of Congo": "Congo",
+    "Democratic Republic of the Congo": "DRC",
+    "Equatorial Guinea": "Eq. Guinea",
+    "Gabon": "Gabon",
+}
+
+# Section key -> (first row of its title and headers, first input row, total cell) on 3.Agriculture
+AGRI_BLOCKS = {
+    "df_3_1": (11, 16, "AD22"),
+    "df_3_2": (29, 34, "AD40"),
+    "df_3_3": (47, 52, "AD58"),
+}
+BLOCK_ROWS = 6 # input rows per section in the template
+
+# Column of 3.Agriculture -> table column shown there
+INPUT_CELLS = {
+    "D": "Crop System", "H": "Area (ha)", "L": "Tillage", "N": "Inputs", "P": "Residue",
+    "AI": "Local AGB", "AK": "Local BGB", "AM": "Local Soil",
+    "AO": "Local Tillage Factor", "AQ": "Local Input Factor", "AS": "Local Residue Factor",
+}
+LABEL_CELLS = ("D", "L", "N", "P")
+# Calculated columns: the default factors the workbook looks up, then the row total
+RESULT_CELLS = ("S", "U", "W", "Y", "AA", "AC", "AD")
+
+# Energy table key -> its section total cell on 1.Energy
+ENERGY_TOTAL_CELLS = {"df_1_1": "AC22", "df_1_2": "Z40", "df_1_3": "AB58", "df_1_4": "U76"}
+
+# Results cells (formulas over Start and the section totals) whose cached value is set
+RESULTS_CELLS = {
+    "N7": "gi_project_name", "N9": "gi_executing_agency", "N11": "gi_funding_agency",
+    "N13": "gi_country", "N15": "gi_project_cost", "N17": "duration", "L28": "grand_total",
+    "K43": "generated_by", "K44": "gi_date",
+}
+
+# -----------------------------
+# 2. CELL XML
+# -----------------------------
+
+class _Formula:
+    """A formula cell and its cached value; text None keeps the cell's formula."""
+
+    def __init__(self, text, value):
+        self.text = text
+        self.value = value
+
+_EXCEL_EPOCH = date(1899, 12, 30)
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+def _xml_text(value):
+    text = _ILLEGAL_XML.sub("", str(value))
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def excel_date(value):
+    """Serial number of a date (or ISO date text) in Excel's 1900 date system."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return (value - datetime(1899, 12, 30)).total_seconds() / 86400
+    return (value - _EXCEL_EPOCH).days
+
+def _value_xml(value):
+    """(type attribute, inner XML) of a cell value; None for an empty cell."""
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return "", None
+    if isinstance(value, (bool, np.bool_)):
+        return ' t="b"', f"<v>{int(value)}</v>"
+    if isinstance(value, (int, np.integer)):
+        return "", f"<v>{int(value)}</v>"
+    if isinstance(value, (float, np.floating)):
+        return "", f"<v>{float(value)!r}</v>"
+    if isinstance(value, (date, datetime)):
+        return "", f"<v>{excel_date(value)!r}</v>"
+    return ' t="inlineStr"', f'<is><t xml:space="preserve">{_xml_text(value)}</t></is>'
+
+def _cell_xml(ref, style, value, formula=None):
+    """One <c> element; `style` is the s="..." attribute text (or "")."""
+    if isinstance(value, _Formula):
+        formula = f"<f>{_xml_text(value.text)}</f>" if value.text is not None else (formula or "")
+        kind, inner = _value_xml(value.value)
+        if kind == ' t="inlineStr"': # a formula's cached text
+            kind, inner = ' t="str"', f"<v>{_xml_text(value.value)}</v>"
+        return f'<c r="{ref}"{style}{kind}>{formula}{inner or ""}</c>'
+    kind, inner = _value_xml(value)
+    if inner is None:
+        return f'<c r="{ref}"{style}/>'
+    return f'<c r="{ref}"{style}{kind}>{inner}</c>'
+
+# -----------------------------
+# 3. SHEET EDITING
+# -----------------------------
+
+_CELL_TAG = re.compile(r'<c r="([A-Z]{1,3}[0-9]+)"((?:\s+[\w:]+="[^"]*")*)\s*(?:/>|>(.*?)</c>)', re.S)
+_STYLE = re.compile(r'\ss="[0-9]+"')
+_FORMULA_TAG = re.compile(r"<f\b[^>]*?(?:/>|>.*?</f>)", re.S)
+_ROW_TAG = re.compile(r'<row r="([0-9]+)"[^>]*?(/?)>')
+
+def set_cells(xml, cells):
+    """
+    The sheet XML with `cells` ({ref: value or _Formula}) written. Existing
+    cells keep their style; cells the sheet does not have yet are added.
+    """
+    remaining = dict(cells)
+
+    def replace(m):
+        ref = m.group(1)
+        if ref not in remaining:
+            return m.group(0)
+        style = _STYLE.search(m.group(2) or "")
+        formula = _FORMULA_TAG.search(m.group(3) or "")
+        return _cell_xml(ref, style.group(0) if style else "", remaining.pop(ref), formula.group(0) if formula else None)
+
+    xml = _CELL_TAG.sub(replace, xml)
+    for ref, value in sorted(remaining.items(), key=lambda item: cell_position(item[0])):
+        xml = _insert_cell(xml, ref, _cell_xml(ref, "", value))
+    return xml
+
+def _insert_cell(xml, ref, cell):
+    row, col = cell_position(ref)
+    rows = list(_ROW_TAG.finditer(xml))
+    match = next((m for m in rows if int(m.group(1)) == row), None)
+    if match is None:
+        # A new row, before the first row below it
+        after = next((m.start() for m in rows if int(m.group(1)) > row), xml.rfind("</sheetData>"))
+        return xml[:after] + f'<row r="{row}">{cell}</row>' + xml[after:]
+    if match.group(2): # <row .../>
+        return xml[:match.start()] + match.group(0)[:-2] + f">{cell}</row>" + xml[match.end():]
+    end = xml.index("</row>", match.end())
+    at = next((m.start() for m in _CELL_TAG.finditer(xml, match.end(), end)
+               if cell_position(m.group(1))[1] > col), end)
+    return xml[:at] + cell + xml[at:]
+
+def _rows_between(xml, first, last):
+    """The <row> elements of rows first..last, as they are in the sheet."""
+    out = []
+    for m in re.finditer(r'<row r="([0-9]+)"[^>]*?(?:/>|>.*?</row>)', xml, re.S):
+        if first <= int(m.group(1)) <= last:
+            out.append(m.group(0))
+    return "".join(out)
+
+def _merges_between(xml, first, last):
+    refs = []
+    for ref in re.findall(r'<mergeCell ref="([A-Z]+[0-9]+:[A-Z]+[0-9]+)"/>', xml):
+        top, bottom = (cell_position(part)[0] for part in ref.split(":"))
+        if first <= top and bottom <= last:
+            refs.append(f'<mergeCell ref="{ref}"/>')
+    return f'<mergeCells count="{len(refs)}">{"".join(refs)}</mergeCells>' if refs else ""
+
+def _row_styles(xml, row):
+    """Column letters -> s="..." attribute of the cells of `row`."""
+    m = re.search(rf'<row r="{row}"[^>]*?>(.*?)</row>', xml, re.S)
+    styles = {}
+    for cell in _CELL_TAG.finditer(m.group(1) if m else ""):
+        style = _STYLE.search(cell.group(2) or "")
+        if style:
+            styles[re.match(r"[A-Z]+", cell.group(1)).group(0)] = style.group(0)
+    return styles
+
+# -----------------------------
+# 4. SECTION ROWS
+# -----------------------------
+
+def section_columns(df, results, params):
+    """
+    {column letter: values} of a section's rows as 3.Agriculture shows them,
+    for the rows the engine calculated (`results`, compute_section_ghg
+    output). Labels are the engine's label arrays; numbers are float64 with
+    NaN for empty cells.
+    """
+    rows = df.reindex(columns=SECTION_COLUMNS).loc[results.index]
+    crop_defaults = params["agb_bgb_soil"]
+    factors = params["removal_factors"]
+    columns = {
+        "D": results["crop"].array, "H": results["area"].to_numpy(dtype=np.float64),
+        "L": results["tillage"].array, "N": results["inputs"].array, "P": results["residue"].array,
+        "S": sectors.lookup(results["crop"], {crop: v[0] for crop, v in crop_defaults.items()}),
+        "U": sectors.lookup(results["crop"], {crop: v[1] for crop, v in crop_defaults.items()}),
+        "W": sectors.lookup(results["crop"], {crop: v[2] for crop, v in crop_defaults.items()}),
+        "Y": sectors.lookup(results["tillage"], factors["tillage"]),
+        "AA": sectors.lookup(results["inputs"], factors["input"]),
+        "AC": sectors.lookup(results["residue"], factors["residue"]),
+        "AD": results["total"].to_numpy(dtype=np.float64),
+    }
+    for letter, name in INPUT_CELLS.items():
+        if name.startswith("Local"):
+            local = agri_engine.coerce_float_column(rows[name])
+            columns[letter] = np.where(local > 0, local, np.nan) # blank unless it overrides, as in the workbook
+    return {letter: columns[letter] for letter in sorted(columns, key=column_index)}
+
+def _block_cells(columns, first_row, count):
+    """{ref: value} of the first `count` rows, for the template's input rows."""
+    cells = {}
+    for letter, values in columns.items():
+        if letter in LABEL_CELLS:
+            codes, labels = pd.factorize(values[:count], use_na_sentinel=True)
+            column = [str(labels[c]) if c >= 0 else None for c in codes]
+        else:
+            column = [float(v) if np.isfinite(v) else None for v in values[:count]]
+        for i, value in enumerate(column):
+            cells[f"{letter}{first_row + i}"] = value
+    return cells
+
+def _fragments(values, label):
+    """
+    Per cell, the end of its <c> element after r="..." and the style: the
+    value and closing tag, or "/>" for an empty cell (kept, with its style).
+    """
+    if label:
+        codes, labels = pd.factorize(values, use_na_sentinel=True)
+        # One fragment per distinct label, gathered by code (-1, empty, takes the last)
+        tails = [f' t="inlineStr"><is><t xml:space="preserve">{_xml_text(text)}</t></is></c>' for text in labels]
+        return np.asarray(tails + ["/>"], dtype=object)[codes]
+    out = np.full(len(values), "/>", dtype=object)
+    filled = np.flatnonzero(np.isfinite(values))
+    out[filled] = [f"><v>{v!r}</v></c>" for v in values[filled].tolist()]
+    return out
+
+def rows_xml(columns, start, stop, first_row, styles):
+    """<row> elements of rows start..stop of `columns`, numbered from `first_row`."""
+    # One format per row: the row number goes into every r="..."
+    template = '<row r="{0}">' + "".join(
+        f'<c r="{letter}{{0}}"{styles.get(letter, "")}{{{i}}}' for i, letter in enumerate(columns, 1)) + "</row>"
+    fragments = [_fragments(values[start:stop], letter in LABEL_CELLS) for letter, values in columns.items()]
+    numbers = range(first_row, first_row + stop - start)
+    return "".join([template.format(*row) for row in zip(numbers, *fragments)])
+
+# -----------------------------
+# 5. TEMPLATE PACKAGE
+# -----------------------------
+
+class _Template:
+    """The template's parts, read once per process, and where its sheets are."""
+
+    def __init__(self, path):
+        with zipfile.ZipFile(path) as zf:
+            self.parts = [(item.filename, zf.read(item.filename)) for item in zf.infolist()]
+        self.data = dict(self.parts)
+        targets = {} # relationship id -> part
+        for tag in re.findall(r"<Relationship\b[^>]*>", self.text("xl/_rels/workbook.xml.rels")):
+            attrs = dict(re.findall(r'(\w+)="([^"]*)"', tag))
+            targets[attrs["Id"]] = "xl/" + attrs["Target"].lstrip("/").removeprefix("xl/")
+        self.sheets = {} # sheet name -> part
+        for m in re.finditer(r'<sheet name="([^"]+)"[^>]*?r:id="([^"]+)"', self.text("xl/workbook.xml")):
+            name = m.group(1).replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"')
+            self.sheets[name] = targets[m.group(2)]
+
+    def text(self, part):
+        return self.data[part].decode("utf-8")
+
+    def sheet(self, name):
+        return self.text(self.sheets[name])
+
+_templates = {} # (path, mtime, size) -> _Template
+
+def _template(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _templates:
+        _templates.clear()
+        _templates[key] = _Template(path)
+    return _templates[key]
+
+_CALC_CHAIN = "xl/calcChain.xml"
+_SHEET_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+_SHEET_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+
+def _package_edits(tpl, names):
+    """
+    Edited workbook.xml, its rels and [Content_Types].xml: `names` added as
+    sheets (returned with their part paths), sheet tabs shown when there are
+    any, the calculation chain dropped (cells that held formulas now hold
+    values) and a full recalculation requested on open.
+    """
+    workbook = tpl.text("xl/workbook.xml")
+    rels = tpl.text("xl/_rels/workbook.xml.rels")
+    types = tpl.text("[Content_Types].xml")
+
+    rels = re.sub(r'<Relationship [^>]*?Target="/?(?:xl/)?calcChain\.xml"[^>]*/>', "", rels)
+    types = re.sub(r'<Override PartName="/xl/calcChain\.xml"[^>]*/>', "", types)
+    if "fullCalcOnLoad" not in workbook:
+        workbook = re.sub(r"<calcPr\b", '<calcPr fullCalcOnLoad="1"', workbook, count=1)
+
+    number = max(int(n) for n in re.findall(r"worksheets/sheet([0-9]+)\.xml", rels))
+    rel_id = max(int(n) for n in re.findall(r'Id="rId([0-9]+)"', rels))
+    sheet_id = max(int(n) for n in re.findall(r'sheetId="([0-9]+)"', workbook))
+    added = []
+    for name in names:
+        number, rel_id, sheet_id = number + 1, rel_id + 1, sheet_id + 1
+        part = f"xl/worksheets/sheet{number}.xml"
+        added.append(part)
+        workbook = workbook.replace("</sheets>", f'<sheet name="{_xml_text(name)}" sheetId="{sheet_id}" r:id="rId{rel_id}"/></sheets>')
+        rels = rels.replace("</Relationships>", f'<Relationship Id="rId{rel_id}" Type="{_SHEET_REL}" Target="worksheets/sheet{number}.xml"/></Relationships>')
+        types = types.replace("</Types>", f'<Override PartName="/{part}" ContentType="{_SHEET_TYPE}"/></Types>')
+    if names:
+        workbook = workbook.replace(' showSheetTabs="0"', "")
+    edits = {"xl/workbook.xml": workbook, "xl/_rels/workbook.xml.rels": rels, "[Content_Types].xml": types}
+    return edits, added
+
+def _continuation_parts(agri_xml, title_row, first_row, last_row):
+    """(head, tail) of an added sheet with the section's title and header rows of 3.Agriculture."""
+    root = re.sub(r'\sxr:uid="[^"]*"', "", re.search(r"<worksheet\b[^>]*>", agri_xml).group(0))
+    fmt = re.search(r"<sheetFormatPr\b[^>]*/>", agri_xml)
+    cols = re.search(r"<cols>.*?</cols>", agri_xml, re.S)
+    head = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' + root
+        + f'<dimension ref="A{title_row}:AT{last_row}"/>'
+        + f'<sheetViews><sheetView showGridLines="0" workbookViewId="0"><pane ySplit="{first_row - 1}" '
+        + f'topLeftCell="A{first_row}" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+        + (fmt.group(0) if fmt else "") + (cols.group(0) if cols else "")
+        + "<sheetData>" + _rows_between(agri_xml, title_row, first_row - 1)
+    )
+    tail = "</sheetData>" + _merges_between(agri_xml, title_row, first_row - 1) + "</worksheet>"
+    return head, tail
+
+# -----------------------------
+# 6. EXPORT
+# -----------------------------
+
+def _flags(info):
+    """check_* values of a project; the 3.x boxes are ticked unless set, as on the Start page."""
+    return {flag: bool(info[flag]) if flag in info else flag.startswith("check_agri")
+            for flag in dict.fromkeys(FLAG_CELLS.values())}
+
+def _report_date(value):
+    if isinstance(value, str) and value:
+        return datetime.fromisoformat(value).date()
+    return value if isinstance(value, (date, datetime)) else date.today()
+
+def _duration_text(years):
+    # The workbook's IF(W21>1, CONCATENATE(W21," years"), CONCATENATE(W21," year"))
+    if years is None or years == "":
+        return ""
+    text = f"{years:g}" if isinstance(years, (int, float)) else str(years)
+    return f"{text} years" if isinstance(years, (int, float)) and years > 1 else f"{text} year"
+
+def export_project(info, sections, target, results=None, sector_totals=None, template=None, imports=None):
+    """
+    Writes a project into a copy of the workbook template.
+
+    `info` holds the general-info and check_* values (session keys, see
+    batch.py), `sections` the 3.x tables ({"df_3_1": frame, ...}); `target`
+    is a path or a writable binary file. `results` ({key:
+    compute_section_ghg output}) saves recalculating sections already done;
+    `sector_totals` ({sector key: {table key: tCO2e}}) supplies the Energy
+    section totals. `imports` ({key: tCO2e}) are totals of rows calculated
+    elsewhere (the Agriculture page's file imports), added to the section
+    totals. Returns {"rows", "sheets", "totals", "grand_total"}.
+    """
+    tpl = _template(template or WORKBOOK_PATH)
+    country, soil_divisor = batch.project_settings(info)
+    params = agri_engine.get_region_params(country)
+    flags = _flags(info)
+
+    # 3.Agriculture: the first rows of each section in its input rows, the rest on an added sheet
+    agri_xml = tpl.sheet(AGRI_SHEET)
+    agri_cells, continued, totals, n_rows = {}, [], {}, 0
+    for key in sectors.get_sector("agriculture").enabled(flags):
+        df = sections.get(key)
+        section_results = (results or {}).get(key)
+        if section_results is None and df is not None:
+            section_results = agri_engine.compute_section_ghg(df, params, soil_divisor)
+        imported = float((imports or {}).get(key) or 0.0)
+        n = len(section_results) if section_results is not None else 0
+        if not n and not imported:
+            totals[key] = 0.0
+            continue
+        title_row, first_row, total_cell = AGRI_BLOCKS[key]
+        formula = f"SUM(AD{first_row}:AE{first_row + BLOCK_ROWS - 1})"
+        totals[key] = 0.0
+        if n:
+            totals[key] = agri_engine.section_total(section_results)
+            columns = section_columns(df, section_results, params)
+            n_rows += n
+            agri_cells.update(_block_cells(columns, first_row, min(n, BLOCK_ROWS)))
+            if n > BLOCK_ROWS:
+                name = f"{SECTION_NAMES[key]} (cont.)"
+                continued.append((name, key, columns))
+                formula = formula[:-1] + f",'{name}'!AD{first_row}:AD{first_row + n - BLOCK_ROWS - 1})"
+        if imported:
+            # Added after the rows, as the Agriculture page does
+            totals[key] += imported
+            formula += f"+{imported!r}"
+        agri_cells[total_cell] = _Formula(formula, totals[key])
+
+    # 1.Energy: section totals only (its tables are not part of the report)
+    sector_totals = {key: dict(tables) for key, tables in (sector_totals or {}).items()}
+    energy_cells = {}
+    if flags["check_energy"]:
+        energy = sector_totals.get("energy") or {}
+        energy_cells = {cell: float(energy.get(key, 0.0)) for key, cell in ENERGY_TOTAL_CELLS.items()}
+    sector_totals["agriculture"] = totals
+    grand_total = sectors.grand_total(sector_totals, flags)
+
+    # Start: general info, duration and the Activities reported boxes
+    values = {key: info.get(key) for key in START_CELLS}
+    values["gi_country"] = WORKBOOK_COUNTRIES.get(values["gi_country"], values["gi_country"])
+    values["gi_date"] = _report_date(values["gi_date"])
+    impl, cap = values["gi_impl_phase"], values["gi_cap_phase"]
+    start_cells = {ref: values[key] for key, ref in START_CELLS.items()}
+    start_cells[DURATION_CELL] = _Formula(None, impl + cap if impl not in (None, "") and cap not in (None, "") else 1)
+    start_cells.update({ref: flags[flag] for ref, flag in FLAG_CELLS.items()})
+
+    # Results: cached values of its formulas
+    shown = {key: "" if value is None else value for key, value in values.items()}
+    shown.update(duration=_duration_text(impl), grand_total=grand_total,
+                 generated_by=f"Report generated by {shown['gi_user_name']}")
+    results_cells = {ref: _Formula(None, shown[key]) for ref, key in RESULTS_CELLS.items()}
+
+    edits, added = _package_edits(tpl, [name for name, _, _ in continued])
+    edits[tpl.sheets[START_SHEET]] = set_cells(tpl.sheet(START_SHEET), start_cells)
+    edits[tpl.sheets[AGRI_SHEET]] = set_cells(agri_xml, agri_cells)
+    edits[tpl.sheets[RESULTS_SHEET]] = set_cells(tpl.sheet(RESULTS_SHEET), results_cells)
+    if energy_cells:
+        edits[tpl.sheets[ENERGY_SHEET]] = set_cells(tpl.sheet(ENERGY_SHEET), energy_cells)
+
+    level = int(os.environ.get("CMT_EXPORT_COMPRESSLEVEL", DEFAULT_COMPRESSLEVEL))
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as zf:
+        for part, data in tpl.parts:
+            if part == _CALC_CHAIN:
+                continue
+            zf.writestr(part, edits[part].encode("utf-8") if part in edits else data)
+        for part, (name, key, columns) in zip(added, continued):
+            title_row, first_row, _ = AGRI_BLOCKS[key]
+            n = len(columns["AD"])
+            styles = _row_styles(agri_xml, first_row)
+            head, tail = _continuation_parts(agri_xml, title_row, first_row, first_row + n - BLOCK_ROWS - 1)
+            with zf.open(part, "w") as stream:
+                stream.write(head.encode("utf-8"))
+                for start in range(BLOCK_ROWS, n, CHUNK_ROWS):
+                    stop = min(start + CHUNK_ROWS, n)
+                    stream.write(rows_xml(columns, start, stop, first_row + start - BLOCK_ROWS, styles).encode("utf-8"))
+                stream.write(tail.encode("utf-8"))
+
+    return {"rows": n_rows, "sheets": [name for name, _, _ in continued], "totals": totals, "grand_total": grand_total}
+
+def report_name(project_name):
+    """Download file name of a project's report, e.g. cmt_My_project.xlsm."""
+    stem = re.sub(r"[^\w\-]+", "_", str(project_name or "").strip()).strip("_")
+    return f"cmt_{stem or 'report'}.xlsm"
+
+def session_report(state, template=None):
+    """
+    The project held in `state` (st.session_state or any mapping) as workbook
+    bytes, for a download. Sections go through the validation stage, as in
+    batch mode, and come from the result cache when they were calculated
+    with the same inputs. File imports (agri_import_<key>) count in the
+    section totals when they were calculated with the current settings, as
+    on the Agriculture page.
+    """
+    import agri_incremental
+    import project_store
+    import result_cache
+
+    project_store.restore_pending(state, list(SECTION_NAMES))
+    country, soil_divisor = batch.project_settings(state)
+    params = agri_engine.get_region_params(country)
+    sections, results, imports = {}, {}, {}
+    for key in SECTION_NAMES:
+        if state.get(key) is not None:
+            df = agri_incremental.apply_editor_state(state[key], state.get(f"editor_{key}"))
+            sections[key], _ = validation.validate_section(df, params)
+            results[key], _ = result_cache.cached_section_ghg(sections[key], params, soil_divisor)
+        report = state.get(f"agri_import_{key}")
+        if report is not None and report.fingerprint == (soil_divisor, params_version(params)):
+            imports[key] = report.total
+    buf = io.BytesIO()
+    export_project(state, sections, buf, results=results, sector_totals=state.get(sectors.TOTALS_KEY), template=template,
+                   imports=imports)
+    return buf.getvalue()
+
+def session_report_data(state, template=None):
+    """
+    session_report as a callable, for st.download_button's deferred `data`.
+    Streamlit calls it later on a thread without the script's context, where
+    st.session_state reads as empty, so `state` is copied (shallowly) now.
+    """
+    snapshot = dict(state)
+    return lambda: session_report(snapshot, template)
+
+# -----------------------------
+# 7. BATCH
+# -----------------------------
+
+EXPORT_COLUMNS = ["project", "file", "report", "rows", "grand_total", "seconds", "error"]
+
+def report_paths(files, out_dir):
+    """<out_dir>/<file name>.xlsm per project file; repeated names get a -2, -3, ... suffix."""
+    used, paths = set(), []
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, k = stem, 1
+        while name.lower() in used:
+            k += 1
+            name = f"{stem}-{k}"
+        used.add(name.lower())
+        paths.append(os.path.join(out_dir, f"{name}.xlsm"))
+    return paths
+
+def export_file(path, report, template=None):
+    """
+    Validates one project file and exports it to `report`; returns its
+    EXPORT_COLUMNS summary. Never raises: failures land in 'error' and leave
+    no report behind.
+    """
+    start = time.perf_counter()
+    summary = dict.fromkeys(EXPORT_COLUMNS)
+    summary.update(project=os.path.splitext(os.path.basename(path))[0], file=path, report=report)
+    tmp = f"{report}.{os.getpid()}.tmp"
+    try:
+        info, sections = batch.load_project(path)
+        country, _ = batch.project_settings(info)
+        sections, _ = validation.validate_project(sections, agri_engine.get_region_params(country))
+        out = export_project(info, sections, tmp, template=template)
+        os.replace(tmp, report)
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+        summary["report"] = None
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    else:
+        summary.update(project=info.get("gi_project_name") or summary["project"], rows=out["rows"],
+                       grand_total=out["grand_total"])
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+def export_batch(files, out_dir, workers=1, template=None):
+    """
+    Exports every file to out_dir, yielding summaries as projects finish.
+    With workers > 1 a process pool is used, with at most 2 * workers
+    projects in flight (as batch.run_batch).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = zip(files, report_paths(files, out_dir))
+    if workers <= 1:
+        for path, report in jobs:
+            yield export_file(path, report, template)
+        return
+
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            for path, report in jobs:
+                pending.add(pool.submit(export_file, path, report, template))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+
+# -----------------------------
+# 8. CLI
+# -----------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export project files to CMT v1.1 workbooks.")
+    parser.add_argument("inputs", nargs="+", help="Project files, directories or glob patterns")
+    parser.add_argument("--out", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument("--template", default=WORKBOOK_PATH, help="Workbook to copy (default: CMT_v1.1.xlsm)")
+    args = parser.parse_args(argv)
+
+    files = batch.find_project_files(args.inputs)
+    if not files:
+        print("No project files found.", file=sys.stderr)
+        return 1
+    print(f"... Exporting {len(files)} projects with {args.workers} worker(s) ...")
+
+    summaries, failed = [], 0
+    for summary in export_batch(files, args.out, args.workers, args.template):
+        summaries.append(summary)
+        failed += summary["error"] is not None
+        if summary["error"]:
+            print(f"{summary['file']}: {summary['error']}", file=sys.stderr)
+        if len(summaries) % 100 == 0 or len(summaries) == len(files):
+            print(f"{len(summaries)}/{len(files)} done, {failed} failed")
+
+    index = os.path.join(args.out, "exports.csv")
+    pd.DataFrame(summaries, columns=EXPORT_COLUMNS).to_csv(index, index=False)
+    print(f"SUCCESS! Wrote {len(files) - failed} report(s) to '{args.out}' and '{index}'.")
+    return 0 if failed == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
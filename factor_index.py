@@ -0,0 +1,144 @@
+# factor_index.py
+# Precompiled lookup tables for the agriculture factors. Option labels (crops,
+# tillage, input and residue options) are interned to small integer codes and
+# the factor values live in contiguous NumPy arrays per region, so a batch of
+# rows is resolved with integer gathers instead of per-row dict lookups.
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from agri_calc import get_region_params, params_version
+from parameters import DEFAULT_AGB_BGB_SOIL_BY_REGION
+
+class FactorIndex:
+    """
+    Codes and factor arrays for one or more regions.
+
+    For every kind, `options[kind]` lists the labels (union over regions) and
+    `<kind>_factors` has shape (regions, len(options) + 1[, 3]). The extra last
+    slot holds the "unknown option" default, so code -1 gathers it directly.
+    crop_factors[..., 0/1/2] are AGB, BGB and Soil.
+    """
+
+    def __init__(self, params_by_region):
+        self.regions = list(params_by_region)
+        self.region_codes = {r: i for i, r in enumerate(self.regions)}
+
+        tables = {
+            "crop": [p["agb_bgb_soil"] for p in params_by_region.values()],
+            "tillage": [p["removal_factors"]["tillage"] for p in params_by_region.values()],
+            "input": [p["removal_factors"]["input"] for p in params_by_region.values()],
+            "residue": [p["removal_factors"]["residue"] for p in params_by_region.values()],
+        }
+        self.options = {kind: list(dict.fromkeys(k for t in ts for k in t)) for kind, ts in tables.items()}
+        self._lookup = {kind: pd.Index(opts, dtype=object) for kind, opts in self.options.items()}
+
+        n_regions = len(self.regions)
+        self.crop_factors = np.zeros((n_regions, len(self.options["crop"]) + 1, 3), dtype=np.float64)
+        for r, table in enumerate(tables["crop"]):
+            for c, crop in enumerate(self.options["crop"]):
+                if crop in table:
+                    self.crop_factors[r, c] = table[crop]
+        for kind in ("tillage", "input", "residue"):
+            arr = np.zeros((n_regions, len(self.options[kind]) + 1), dtype=np.float64)
+            for r, table in enumerate(tables[kind]):
+                for c, opt in enumerate(self.options[kind]):
+                    arr[r, c] = table.get(opt, 0)
+            setattr(self, f"{kind}_factors", arr)
+
+        self.residue_multiplier = np.asarray(
+            [p["residue_multiplier"] for p in params_by_region.values()], dtype=np.float64
+        )
+        for arr in (self.crop_factors, self.tillage_factors, self.input_factors, self.residue_factors, self.residue_multiplier):
+            arr.flags.writeable = False # shared, read-only
+
+    def dtype(self, kind):
+        """CategoricalDtype whose codes are this index's codes for `kind`."""
+        return pd.CategoricalDtype(self.options[kind])
+
+    def encode(self, kind, values):
+        """
+        int32 codes of `values` (Series / array of labels) for `kind`; -1 when
+        the label is unknown. Categorical input is mapped per category, not per row.
+        """
+        lookup = self._lookup[kind]
+        if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=True)
+        # One hash per distinct label; rows are remapped by an integer gather
+        remap = np.append(lookup.get_indexer(pd.Index(uniques, dtype=object)), -1).astype(np.int32)
+        return remap[codes]
+
+    def crop_defaults(self, region_codes, crop_codes):
+        """(AGB, BGB, Soil) default arrays for the given region and crop codes."""
+        values = self.crop_factors[region_codes, crop_codes]
+        return values[..., 0], values[..., 1], values[..., 2]
+
+    def factors(self, kind, region_codes, codes):
+        return getattr(self, f"{kind}_factors")[region_codes, codes]
+
+_by_version = {} # params_version -> FactorIndex
+
+def index_for(params):
+    """Single-region FactorIndex (region code 0) for a get_region_params() dict, cached."""
+    version = params_version(params)
+    index = _by_version.get(version)
+    if index is None:
+        if len(_by_version) >= 32:
+            _by_version.clear()
+        index = _by_version[version] = FactorIndex({"region": params})
+    return index
+
+@lru_cache(maxsize=1)
+def default_index():
+    """FactorIndex over every region in parameters.py, built once per process."""
+    return FactorIndex({region: get_region_params(region) for region in DEFAULT_AGB_BGB_SOIL_BY_REGION})
+
+# -----------------------------
+# SHARED MEMORY
+# -----------------------------
+
+_SHARED_ARRAYS = ("crop_factors", "tillage_factors", "input_factors", "residue_factors", "residue_multiplier")
+
+def share(index):
+    """
+    Copies the factor arrays of `index` into one SharedMemory block.
+    Returns (block, spec): the caller owns the block (close + unlink when
+    done); `spec` is the small picklable description attach() needs.
+    """
+    from multiprocessing import shared_memory
+
+    arrays = [getattr(index, name) for name in _SHARED_ARRAYS]
+    block = shared_memory.SharedMemory(create=True, size=sum(a.nbytes for a in arrays))
+    layout, offset = [], 0
+    for name, arr in zip(_SHARED_ARRAYS, arrays):
+        np.ndarray(arr.shape, arr.dtype, buffer=block.buf, offset=offset)[...] = arr
+        layout.append((name, arr.shape, arr.dtype.str, offset))
+        offset += arr.nbytes
+    spec = {"name": block.name, "layout": layout, "regions": index.regions, "options": index.options}
+    return block, spec
+
+def attach(spec):
+    """
+    FactorIndex over a block made by share(): the factor arrays are
+    read-only views of the shared memory, nothing is copied.
+    """
+    from multiprocessing import shared_memory
+
+    # Pool workers share their parent's resource tracker, so the block is
+    # unlinked once, by the process that created it.
+    block = shared_memory.SharedMemory(name=spec["name"])
+
+    index = FactorIndex.__new__(FactorIndex)
+    index.regions = list(spec["regions"])
+    index.region_codes = {r: i for i, r in enumerate(index.regions)}
+    index.options = spec["options"]
+    index._lookup = {kind: pd.Index(opts, dtype=object) for kind, opts in index.options.items()}
+    for name, shape, dtype, offset in spec["layout"]:
+        arr = np.ndarray(shape, np.dtype(dtype), buffer=block.buf, offset=offset)
+        arr.flags.writeable = False
+        setattr(index, name, arr)
+    index._block = block # keeps the mapping alive as long as the index
+    return index
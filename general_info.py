@@ -2,6 +2,7 @@
 import streamlit as st
 import shared_state
 import imported_data # <--- Loads Excel lists
+import sectors
 from datetime import date
 
 def render_general_info():
@@ -88,5 +89,5 @@ def render_general_info():
             if st.session_state.get("check_forest"): st.markdown("- Forestry & Conservation")
                 
             st.divider()
-            agri_total = shared_state.get("agri_grand_total") or 0.0
-            st.metric("Total Emissions Reduction", f"{agri_total:,.2f} tCO2e")
+            grand_total = sectors.grand_total(sectors.session_totals(st.session_state), st.session_state)
+            st.metric("Total Emissions Reduction", f"{grand_total:,.2f} tCO2e")
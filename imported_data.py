@@ -1,10 +1,16 @@
-# This file is auto-generated by sync_excel.py
+# Parameters extracted from CMT_v1.1.xlsm.
+# Loaded through param_loader, which parses the workbook once and reuses a
+# binary cache until the workbook changes (refresh with: python sync_excel.py).
+import param_loader
 
-SOIL_TYPES = ['DRC', 'Tropical lowland', 'Moist', 'Spodic soils', 'Implemetation phase', 'Capitalization phase', 'Total duration of calculation']
-CLIMATES = ['DRC', 'Tropical lowland', 'Moist', 'Spodic soils', 'Implemetation phase', 'Capitalization phase', 'Total duration of calculation']
-MOISTURES = ['DRC', 'Tropical lowland', 'Moist', 'Spodic soils', 'Implemetation phase', 'Capitalization phase', 'Total duration of calculation']
+_data = param_loader.load_parameters()
+
+SOIL_TYPES = _data["SOIL_TYPES"]
+CLIMATES = _data["CLIMATES"]
+MOISTURES = _data["MOISTURES"]
 
 # Format: {Crop Name: (AGB, BGB, Soil)}
-AGRI_CROP_DATA = {
-    'Genetic Crop (Fallback)': (0, 0, 0),
-}
+AGRI_CROP_DATA = _data["AGRI_CROP_DATA"]
+
+# Dropdown lists of the workbook, by source header or range name (e.g. "Fuel type")
+LISTS = _data.get("LISTS", {})
@@ -0,0 +1,227 @@
+# ingest.py
+# Streaming import of large 3.x activity tables from CSV or Parquet.
+# The file is read in chunks, headers are mapped to the data-editor schema,
+# and section totals are accumulated chunk by chunk, so only one chunk and a
+# bounded preview are ever held in memory.
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import agri_timeseries
+import factor_index
+import validation
+from agri_calc import SECTION_COLUMNS, params_version
+
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_PREVIEW_ROWS = 1_000
+DEFAULT_ISSUE_ROWS = 1_000 # issue lines kept for display; all are counted
+
+# Normalized header -> schema column (see normalize_header)
+COLUMN_ALIASES = {
+    "cropsystem": "Crop System", "crop": "Crop System", "cropping system": "Crop System",
+    "perennial cropping system deployed": "Crop System",
+    "area": "Area (ha)", "area ha": "Area (ha)", "hectares": "Area (ha)",
+    "tillage": "Tillage", "tillage practice": "Tillage", "tillage management": "Tillage",
+    "inputs": "Inputs", "input": "Inputs", "input level": "Inputs", "imput of organic materials": "Inputs",
+    "residue": "Residue", "residue mgmt": "Residue", "residue management": "Residue",
+    "local agb": "Local AGB", "local bgb": "Local BGB", "local soil": "Local Soil",
+    "local tillage factor": "Local Tillage Factor", "local input factor": "Local Input Factor",
+    "local residue factor": "Local Residue Factor",
+}
+COLUMN_ALIASES.update({col.lower(): col for col in SECTION_COLUMNS})
+
+REQUIRED_COLUMNS = ["Crop System", "Area (ha)"]
+
+# Read as categoricals: one copy of each label per chunk instead of one per row
+OPTION_COLUMNS = ["Crop System", "Tillage", "Inputs", "Residue"]
+
+# -----------------------------
+# 1. SCHEMA MAPPING
+# -----------------------------
+
+def normalize_header(h):
+    """'Area (ha)' -> 'area ha', ' Local AGB (tC/ha) ' -> 'local agb', etc."""
+    h = str(h).lower().strip()
+    h = re.sub(r"\((t?c/ha|tc ha|tco2e?)\)", "", h) # drop unit suffixes
+    h = re.sub(r"[^a-z0-9]+", " ", h).strip()
+    return h
+
+def map_columns(columns):
+    """Returns {source column: schema column}; raises ValueError if required ones are missing."""
+    mapping = {}
+    for col in columns:
+        target = COLUMN_ALIASES.get(normalize_header(col)) or COLUMN_ALIASES.get(str(col).lower().strip())
+        if target and target not in mapping.values():
+            mapping[col] = target
+    missing = [c for c in REQUIRED_COLUMNS if c not in mapping.values()]
+    if missing:
+        raise ValueError(f"no column found for {missing} (file columns: {list(columns)})")
+    return mapping
+
+# -----------------------------
+# 2. CHUNKED READERS
+# -----------------------------
+
+def _is_parquet(source, name=None):
+    name = name or (source if isinstance(source, str) else getattr(source, "name", ""))
+    return str(name).lower().endswith(".parquet")
+
+def read_header(source, name=None):
+    if _is_parquet(source, name):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source).schema_arrow.names
+    columns = list(pd.read_csv(source, nrows=0).columns)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return columns
+
+def iter_chunks(source, mapping, chunk_rows=DEFAULT_CHUNK_ROWS, name=None):
+    """Yields DataFrames in the schema (renamed, option columns categorical) of at most chunk_rows rows."""
+    option_cols = [src for src, dst in mapping.items() if dst in OPTION_COLUMNS]
+    if _is_parquet(source, name):
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+        offset = 0
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows, columns=list(mapping)):
+            # Dictionary-encode option columns in Arrow: they arrive as categoricals
+            for src in option_cols:
+                i = batch.schema.get_field_index(src)
+                if not str(batch.schema.field(i).type).startswith("dictionary"):
+                    batch = batch.set_column(i, src, pc.dictionary_encode(batch.column(i)))
+            chunk = batch.to_pandas().rename(columns=mapping)
+            chunk.index += offset # row numbers run on across chunks, as with read_csv
+            offset += len(chunk)
+            yield chunk
+        return
+
+    reader = pd.read_csv(
+        source, usecols=list(mapping), chunksize=chunk_rows,
+        dtype={src: "category" for src in option_cols}
+    )
+    for chunk in reader:
+        yield chunk.rename(columns=mapping)
+
+# -----------------------------
+# 3. STREAMING CALCULATION
+# -----------------------------
+
+class IngestReport:
+    """Outcome of one streamed import: totals, per-crop aggregates, preview and throughput."""
+
+    def __init__(self, source_name, mapping, fingerprint):
+        self.source_name = source_name
+        self.mapping = mapping
+        self.fingerprint = fingerprint
+        self.rows = 0             # rows read from the file
+        self.calculated_rows = 0  # rows with a crop selected
+        self.total = 0.0
+        self.terms = [0.0, 0.0]   # agri_timeseries.section_terms of all calculated rows
+        self.by_crop = pd.DataFrame(columns=["Area", "Emission Reduction", "Rows"], dtype=np.float64)
+        self.preview = None
+        self.issue_count = 0
+        self.issue_counts = pd.DataFrame(columns=["column", "issue", "severity", "count"])
+        self.issues = pd.DataFrame(columns=validation.ISSUE_COLUMNS) # first issue lines, in file order
+        self.seconds = 0.0
+        self.peak_memory_mb = 0.0 # process RSS, see rss_mb
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f"{self.rows:,} rows ({self.calculated_rows:,} calculated, {self.issue_count:,} issues) in {self.seconds:.1f}s "
+                f"- {self.rows_per_second:,.0f} rows/s, peak {self.peak_memory_mb:,.1f} MB RSS")
+
+def rss_mb():
+    """
+    Resident memory of this process, Arrow and NumPy buffers included (peak
+    RSS where /proc is missing). Shared by every session of the server.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+def ingest_section(source, params, soil_divisor, chunk_rows=DEFAULT_CHUNK_ROWS,
+                   preview_rows=DEFAULT_PREVIEW_ROWS, name=None, progress=None,
+                   issue_rows=DEFAULT_ISSUE_ROWS):
+    """
+    Streams a CSV/Parquet file (path or file-like) through the validation
+    stage and the section engine. Issues are counted over the whole file;
+    the first `issue_rows` are kept. `progress(report)` is called after each
+    chunk. Peak memory is the largest resident size of the process sampled
+    while a chunk is held, so imports running at the same time in other
+    sessions count too.
+    """
+    source_name = name or (source if isinstance(source, str) else getattr(source, "name", "upload"))
+    mapping = map_columns(read_header(source, name))
+    report = IngestReport(source_name, mapping, (soil_divisor, params_version(params)))
+
+    report.peak_memory_mb = rss_mb()
+    start = time.perf_counter()
+    try:
+        index = factor_index.index_for(params)
+        by_crop = []
+        preview = []
+        kept_preview = 0
+        issues, issue_counts = [], []
+        kept_issues = 0
+        for chunk in iter_chunks(source, mapping, chunk_rows, name):
+            clean, chunk_issues = validation.validate_section(chunk, index=index)
+            results = agri_engine.compute_section_ghg(clean, params, soil_divisor, index=index)
+            report.peak_memory_mb = max(report.peak_memory_mb, rss_mb()) # chunk, clean frame and results alive
+
+            # Left-to-right continuation of the running total, like process_section
+            report.total = float(np.cumsum(np.concatenate(([report.total], results["total"].to_numpy())))[-1])
+            terms = agri_timeseries.section_terms(results, soil_divisor, params["residue_multiplier"])
+            report.terms = [a + b for a, b in zip(report.terms, terms)]
+            report.rows += len(chunk)
+            report.calculated_rows += len(results)
+            by_crop.append(
+                results.groupby("crop", observed=True, dropna=False)
+                .agg(Area=("area", "sum"), **{"Emission Reduction": ("total", "sum")}, Rows=("total", "size"))
+            )
+            if kept_preview < preview_rows:
+                preview.append(chunk.iloc[:preview_rows - kept_preview])
+                kept_preview += len(preview[-1])
+            if len(chunk_issues):
+                report.issue_count += len(chunk_issues)
+                issue_counts.append(validation.issue_counts(chunk_issues))
+                if kept_issues < issue_rows:
+                    issues.append(chunk_issues.iloc[:issue_rows - kept_issues])
+                    kept_issues += len(issues[-1])
+
+            report.seconds = time.perf_counter() - start
+            if progress:
+                progress(report)
+
+        if by_crop:
+            report.by_crop = pd.concat(by_crop).groupby(level=0, observed=True, dropna=False).sum()
+        report.preview = (pd.concat(preview) if preview else pd.DataFrame(columns=SECTION_COLUMNS)).reindex(columns=SECTION_COLUMNS)
+        if issues:
+            report.issues = pd.concat(issues, ignore_index=True)
+            report.issue_counts = (pd.concat(issue_counts).groupby(["column", "issue", "severity"], sort=False)["count"].sum()
+                                   .reset_index().sort_values("count", ascending=False, kind="stable"))
+    finally:
+        report.seconds = time.perf_counter() - start
+    return report
+
+def report_results_rows(report, section_name):
+    """Per-crop aggregate lines for the Results tab table (one per crop, not per row)."""
+    by_crop = report.by_crop
+    return pd.DataFrame({
+        "Section": section_name,
+        "Crop": [f"{crop if pd.notna(crop) else 'Unspecified'} (imported)" for crop in by_crop.index],
+        "Area": by_crop["Area"].to_numpy(),
+        "Ref AGB": np.nan,
+        "Ref Soil": np.nan,
+        "Emission Reduction": by_crop["Emission Reduction"].to_numpy(),
+    }, columns=agri_engine.RESULT_COLUMNS)
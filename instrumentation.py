@@ -0,0 +1,233 @@
+# instrumentation.py
+# Timing spans for Streamlit reruns. app.py wraps every rerun in
+# begin_run()/end_run() and the expensive parts (tab renders, section
+# calculations, chart building) in span(). A finished rerun is written as one
+# structured log line, folded into process-wide histograms that can be
+# exported as a Prometheus text file, and shown in the optional debug panel.
+# Other modules can register event counters (e.g. result_cache hits) that are
+# exported and shown alongside.
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("cmt.timing")
+
+# Prometheus text file, rewritten after every rerun when set
+METRICS_PATH = os.environ.get("CMT_METRICS_FILE")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HISTORY_RUNS = 50 # reruns kept per session for the debug panel
+
+# Each Streamlit session runs its script in its own thread
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = {} # (span name, sorted label items) -> [count per bucket..., count, sum]
+_counters = {} # counter group name -> callable returning {event: count}
+
+# -----------------------------
+# 1. SPANS
+# -----------------------------
+
+class Run:
+    """Spans recorded during one script run, in start order."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+        self._stack = []
+
+    def rows(self):
+        return [{
+            "span": s["name"], **s["labels"],
+            "depth": s["depth"], "start_ms": round(s["start"] * 1000, 2), "ms": round(s["seconds"] * 1000, 2),
+        } for s in self.spans if s["seconds"] is not None]
+
+def begin_run():
+    _local.run = Run()
+    return _local.run
+
+def current_run():
+    return getattr(_local, "run", None)
+
+@contextmanager
+def span(name, **labels):
+    """Times the block as `name`; a no-op outside begin_run()/end_run()."""
+    run = current_run()
+    if run is None or run.seconds is not None:
+        yield
+        return
+    start = time.perf_counter()
+    record = {"name": name, "labels": {k: str(v) for k, v in labels.items()},
+              "depth": len(run._stack), "start": start - run.started, "seconds": None}
+    run.spans.append(record)
+    run._stack.append(record)
+    try:
+        yield
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        run._stack.pop()
+
+def end_run():
+    """Closes the current run, records it and returns it (None if none was begun)."""
+    run = current_run()
+    if run is None or run.seconds is not None:
+        return None
+    run.seconds = time.perf_counter() - run.started
+
+    finished = [s for s in run.spans if s["seconds"] is not None]
+    with _lock:
+        _observe("rerun", {}, run.seconds)
+        for s in finished:
+            _observe(s["name"], s["labels"], s["seconds"])
+    logger.info(json.dumps({
+        "event": "rerun",
+        "seconds": round(run.seconds, 6),
+        "spans": [{"span": s["name"], **s["labels"], "depth": s["depth"], "seconds": round(s["seconds"], 6)} for s in finished],
+    }))
+    if METRICS_PATH:
+        try:
+            write_prometheus(METRICS_PATH)
+        except OSError as e:
+            logger.warning("could not write %s: %s", METRICS_PATH, e)
+    return run
+
+# -----------------------------
+# 2. PROMETHEUS EXPORT
+# -----------------------------
+
+def _observe(name, labels, seconds):
+    key = (name, tuple(sorted(labels.items())))
+    hist = _histograms.get(key)
+    if hist is None:
+        hist = _histograms[key] = [0] * len(BUCKETS) + [0, 0.0]
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            hist[i] += 1
+    hist[-2] += 1
+    hist[-1] += seconds
+
+def register_counters(name, read):
+    """
+    Exports `read()` ({event: count}, counted since process start) as the
+    Prometheus counter cmt_<name>_total{event=...} and in the debug panel.
+    """
+    with _lock:
+        _counters[name] = read
+
+def counter_values():
+    """{group name: {event: count}} of every registered counter group."""
+    with _lock:
+        readers = dict(_counters)
+    return {name: dict(read()) for name, read in readers.items()}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(items):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+
+def prometheus_text():
+    """All spans observed in this process, as cmt_span_seconds histograms."""
+    lines = [
+        "# HELP cmt_span_seconds Time spent in instrumented parts of a Streamlit rerun.",
+        "# TYPE cmt_span_seconds histogram",
+    ]
+    with _lock:
+        snapshot = {key: list(hist) for key, hist in _histograms.items()}
+    for (name, label_items), hist in sorted(snapshot.items()):
+        base = (("span", name),) + label_items
+        for bound, count in zip(BUCKETS, hist):
+            lines.append(f"cmt_span_seconds_bucket{{{_label_text(base + (('le', bound),))}}} {count}")
+        lines.append(f"cmt_span_seconds_bucket{{{_label_text(base + (('le', '+Inf'),))}}} {hist[-2]}")
+        lines.append(f"cmt_span_seconds_sum{{{_label_text(base)}}} {hist[-1]:.6f}")
+        lines.append(f"cmt_span_seconds_count{{{_label_text(base)}}} {hist[-2]}")
+    for name, counts in sorted(counter_values().items()):
+        lines.append(f"# TYPE cmt_{name}_total counter")
+        for event, count in counts.items():
+            lines.append(f"cmt_{name}_total{{{_label_text((('event', event),))}}} {count}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path) # scrapers never see a half-written file
+
+# -----------------------------
+# 3. SESSION MEMORY
+# -----------------------------
+
+def estimate_bytes(value, seen=None):
+    """
+    Approximate bytes held by a session-state value. Frames, arrays and
+    objects with an `nbytes` property (result stores, trackers) are counted
+    deeply; objects reachable twice are counted once.
+    """
+    import pandas as pd
+
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int) or type(nbytes).__module__ == "numpy":
+        return int(nbytes)
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v, seen) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k, seen) + estimate_bytes(v, seen) for k, v in value.items())
+    return sys.getsizeof(value)
+
+def session_memory(state):
+    """[{"key", "type", "bytes"}] for every session-state entry, largest first."""
+    seen = set()
+    rows = [{"key": key, "type": type(value).__name__, "bytes": estimate_bytes(value, seen)}
+            for key, value in state.items()]
+    return sorted(rows, key=lambda r: r["bytes"], reverse=True)
+
+# -----------------------------
+# 4. DEBUG PANEL
+# -----------------------------
+
+def render_debug_panel(run, history, state=None):
+    """
+    Sidebar breakdown of `run` plus p50/p95 per span over `history`
+    (a list of earlier Run.rows() results, updated in place), and the
+    memory held by `state` (the session state) when given.
+    """
+    import pandas as pd
+    import streamlit as st
+
+    if run is None:
+        return
+    rows = run.rows()
+    history.append([{"span": "rerun", "ms": round(run.seconds * 1000, 2)}] + rows)
+    del history[:-HISTORY_RUNS]
+
+    with st.sidebar.expander(f"Rerun timings ({run.seconds * 1000:,.0f} ms)", expanded=True):
+        if rows:
+            df = pd.DataFrame(rows)
+            df["span"] = ["· " * d + s for d, s in zip(df["depth"], df["span"])]
+            st.dataframe(df.drop(columns=["depth"]).fillna(""), hide_index=True, use_container_width=True)
+
+        recent = pd.DataFrame([r for runs in history for r in runs])
+        labels = [c for c in recent.columns if c not in ("span", "ms", "depth", "start_ms")]
+        recent[labels] = recent[labels].fillna("")
+        stats = recent.groupby(["span"] + labels)["ms"].describe(percentiles=[0.5, 0.95])
+        st.caption(f"Last {len(history)} reruns of this session")
+        st.dataframe(stats[["count", "50%", "95%", "max"]].round(1), use_container_width=True)
+        for name, counts in counter_values().items():
+            st.caption(f"{name} (process): " + " · ".join(f"{event} {count:,}" for event, count in counts.items()))
+
+    if state is not None:
+        memory = pd.DataFrame(session_memory(dict(state.items())))
+        with st.sidebar.expander(f"Session memory ({memory['bytes'].sum() / 1e6:,.1f} MB)"):
+            st.dataframe(memory.head(15), hide_index=True, use_container_width=True)
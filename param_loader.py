@@ -0,0 +1,79 @@
+# param_loader.py
+# Loads the parameter tables extracted from CMT_v1.1.xlsm. The workbook is
+# parsed once; the result is pickled under .cmt_cache/ keyed by the
+# workbook's SHA-256, so later processes load it in milliseconds and only
+# re-parse when the workbook content changes.
+import hashlib
+import os
+import pickle
+import warnings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKBOOK_PATH = os.path.join(BASE_DIR, "CMT_v1.1.xlsm")
+CACHE_DIR = os.environ.get("CMT_CACHE_DIR", os.path.join(BASE_DIR, ".cmt_cache"))
+
+# Bump when the extracted structure changes so old cache files are ignored
+CACHE_FORMAT = 2
+
+_loaded = {} # workbook hash -> parameters, per process
+
+def workbook_hash(path=WORKBOOK_PATH):
+    """SHA-256 of the workbook bytes (streamed, so large files stay cheap)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path(content_hash=None, path=WORKBOOK_PATH):
+    content_hash = content_hash or workbook_hash(path)
+    return os.path.join(CACHE_DIR, f"params-v{CACHE_FORMAT}-{content_hash[:32]}.pickle")
+
+def _read_cache(target):
+    try:
+        with open(target, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        warnings.warn(f"Ignoring unreadable parameter cache {target}: {e}")
+        return None
+
+def _write_cache(target, data):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target) # atomic, so concurrent workers never see half a file
+
+def _fallback():
+    from sync_excel import FALLBACK_PARAMETERS
+    return dict(FALLBACK_PARAMETERS)
+
+def load_parameters(path=WORKBOOK_PATH, force=False):
+    """
+    Returns {"SOIL_TYPES", "CLIMATES", "MOISTURES", "COUNTRIES", "AGRI_CROP_DATA",
+    "LISTS", "TABLES"} for the workbook at `path`. `force=True` re-parses and
+    rewrites the cache.
+    """
+    if not os.path.exists(path):
+        warnings.warn(f"{path} not found, using fallback parameters.")
+        return _fallback()
+
+    content_hash = workbook_hash(path)
+    if not force and content_hash in _loaded:
+        return _loaded[content_hash]
+
+    target = cache_path(content_hash)
+    data = None if force else _read_cache(target)
+    if data is None:
+        # Only a cache miss pays for the workbook parse
+        from sync_excel import extract_parameters
+        data = extract_parameters(path)
+        try:
+            _write_cache(target, data)
+        except OSError as e:
+            warnings.warn(f"Could not write parameter cache {target}: {e}")
+
+    _loaded[content_hash] = data
+    return data
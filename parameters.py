@@ -29,3 +29,74 @@ REMOVAL_FACTORS_BY_REGION = {
     }
     for region in ["Central Africa", "Indonesia", "Brazil"]
 }
+
+# --- Energy Parameters ---
+# From the Start sheet's PARAMETERS block (and Sheet5 for charcoal kilns) of
+# CMT_v1.1.xlsm, as used by the '1.Energy' formulas.
+
+def _workbook_list(name, default):
+    return list(imported_data.LISTS.get(name) or default)
+
+ENERGY_LISTS = {
+    "cookstove": _workbook_list("Cookstove type", ["Natural draft", "Forced draft", "Gasifier", "Rocket type", "Other"]),
+    "fuel": _workbook_list("Fuel type", ["Wood", "Charcoal", "Other"]),
+    "transformation_activity": _workbook_list("Transformation activity", ["ICPS *", "Eco-Charcoal **"]),
+    "transformation_system": _workbook_list("Transformation system", [
+        "Wood distilation", "Retort, no extra fuel", "Retort, with extra fuel", "Kiln, ceramic or metal"]),
+    "fuel_category": _workbook_list("Fuel category", ["Modern", "Renewable"]),
+    # The fuel type cells list INDIRECT(category): the ranges named "Modern" / "Renewable"
+    "modern_fuel": _workbook_list("Modern", ["LPG", "Electric (incl. induction)", "Natural gas", "Kerosene", "Propane", "Other"]),
+    "renewable_fuel": _workbook_list("Renewable", ["Ethanol", "Biodiesel", "Other biogas", "Other"]),
+    "chp_facility": _workbook_list("CHP Facility", ["CHP Unit 1", "CHP Unit 2", "CHP Unit 3", "CHP Unit 4", "CHP Unit 5"]),
+}
+
+# Global warming potentials (Tier 1)
+GWP = {"CO2": 1.0, "CH4": 34.0, "NMVOC": 3.4, "CO": 1.8, "N2O": 265.0}
+
+# 1.1 Cookstoves: traditional cookstove emission factors (g/kg fuel) and
+# fuel use of a stove (ton/household/year), per fuel
+TRADITIONAL_COOKSTOVE_EF = {
+    "Wood": {"CO2": 1638.0, "CH4": 5.0, "NMVOC": 10.0, "CO": 113.0},
+    "Charcoal": {"CO2": 2533.0, "CH4": 11.0, "NMVOC": 16.0, "CO": 313.0},
+    "Other": {"CO2": 0.0, "CH4": 0.0, "NMVOC": 0.0, "CO": 0.0},
+}
+STOVE_FUEL_USE = {"Wood": 1095 * 5 / 1000, "Charcoal": 1095 * 5 / 1000, "Other": 1095 * 5 / 1000}
+DEFAULT_FUEL_REDUCTION = 0.35
+DEFAULT_ADOPTION_RATE = 0.7
+
+# 1.2 Transformation: earth mounds / pits as the baseline, improved systems (g/kg charcoal)
+BASELINE_CHARCOAL_EF = {"CO2": 9778.0, "CH4": 47.0}
+TRANSFORMATION_SYSTEM_EF = {
+    "Wood distilation": {"CO2": 3074.0, "CH4": 0.02},
+    "Retort, no extra fuel": {"CO2": 4908.0, "CH4": 0.02},
+    "Retort, with extra fuel": {"CO2": 5856.0, "CH4": 0.02},
+    "Kiln, ceramic or metal": {"CO2": 4969.0, "CH4": 28.0},
+}
+NO_EMISSION_ACTIVITY = "Eco-Charcoal **" # its default factors are 0
+
+# 1.3 Fuel substitution: energy of wood (MWh/kg) and substitute fuel factors
+# (CO2 kg/MWh, CH4 and N2O g/MWh). Electricity uses the country's grid intensity.
+WOOD_ENERGY_MWH_PER_KG = 0.003
+SUBSTITUTION_FUEL_EF = {
+    "LPG": {"CO2": 210.61433447098977, "CH4": 10.238907849829353, "N2O": 2.0477815699658706},
+    "Natural gas": {"CO2": 181.0921501706485, "CH4": 3.4129692832764507, "N2O": 0.3412969283276451},
+    "Kerosene": {"CO2": 256.65529010238913, "CH4": 10.238907849829353, "N2O": 2.0477815699658706},
+    "Propane": {"CO2": 214.57337883959045, "CH4": 10.238907849829353, "N2O": 2.0477815699658706},
+    "Ethanol": {"CO2": 233.5836177474403, "CH4": 3.754266211604096, "N2O": 0.3754266211604096},
+    "Biodiesel": {"CO2": 252.01365187713313, "CH4": 3.754266211604096, "N2O": 0.3754266211604096},
+    "Other biogas": {"CO2": 177.7133105802048, "CH4": 10.921501706484642, "N2O": 2.150170648464164},
+}
+ELECTRIC_FUEL = "Electric (incl. induction)"
+# Carbon intensity of electricity in the Congo Basin (kgCO2/MWh), by app country name
+GRID_INTENSITY_BY_COUNTRY = {
+    "Cameroon": 305.4187,
+    "Central African Republic": 0.0,
+    "Republic of Congo": 700.0,
+    "Democratic Republic of the Congo": 24.456524,
+    "Equatorial Guinea": 591.83673,
+    "Gabon": 491.59662,
+}
+
+# 1.4 Cogeneration: default factors of CHP output (kgCO2e/MWh)
+CHP_ELECTRICITY_EF = 37.79
+CHP_HEAT_EF = 10.08
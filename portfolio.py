@@ -0,0 +1,251 @@
+# portfolio.py
+"""
+Portfolio evaluator: scores many projects at once, grouped by region.
+
+    python portfolio.py projects/ --workers 4 --out portfolio.csv
+
+Project files are read as in batch.py. Every project is tagged with its
+resolved region (agri_calc.resolve_region), and the factor tables of each
+region present (its parameter shard) are built once and copied into shared
+memory. Pool workers attach to the shards in place, so a task carries only
+its rows and the region name, never the parameters. Rows are validated
+(validation.py) before calculation, as in batch.py. The rows of a region
+are cut into tasks at project boundaries and summed per project section as
+batch.run_project does, so the figures match scoring the files one by one.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import batch
+import factor_index
+import validation
+
+# Rows per task; a task always holds whole projects, so it can be larger
+ROWS_PER_TASK = 50_000
+
+REGION_COLUMNS = ["region", "projects", "input_rows", "rows", "tasks", "cpu_s", "agri_grand_total"]
+
+# -----------------------------
+# 1. LOADING & GROUPING
+# -----------------------------
+
+def load_portfolio(files):
+    """
+    (summary, sections) per project file: a batch.PROJECT_COLUMNS dict with
+    country, region and soil period filled in, and the {section key: DataFrame}
+    of batch.load_project (None when the file could not be read).
+    """
+    projects = []
+    for path in files:
+        summary = batch.new_summary(path)
+        try:
+            info, sections = batch.load_project(path)
+            country, soil_divisor = batch.project_settings(info)
+        except Exception as e:
+            summary["error"] = f"{type(e).__name__}: {e}"
+            projects.append((summary, None))
+            continue
+        summary.update({
+            "project": info.get("gi_project_name") or summary["project"],
+            "country": country,
+            "region": agri_engine.resolve_region(country),
+            "soil_divisor": soil_divisor,
+        })
+        projects.append((summary, sections))
+    return projects
+
+def _chunk(pieces):
+    return pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0].reset_index(drop=True)
+
+def region_tasks(projects, rows_per_task=ROWS_PER_TASK):
+    """
+    Yields (region, soil_divisor, rows) tasks. `rows` holds whole projects of
+    one region and soil period in the agri row schema plus "project" (position
+    in `projects`) and "section" (session key); a task is closed once it
+    reaches rows_per_task rows.
+    """
+    order = sorted((i for i, (_, sections) in enumerate(projects) if sections is not None),
+                   key=lambda i: (projects[i][0]["region"], projects[i][0]["soil_divisor"]))
+    group, pieces, size = None, [], 0
+    for i in order:
+        summary, sections = projects[i]
+        key = (summary["region"], summary["soil_divisor"])
+        if pieces and (key != group or size >= rows_per_task):
+            yield (*group, _chunk(pieces))
+            pieces, size = [], 0
+        group = key
+        for section in agri_engine.SECTION_NAMES:
+            df = sections.get(section)
+            if df is not None and len(df):
+                pieces.append(df.reindex(columns=agri_engine.SECTION_COLUMNS).assign(project=i, section=section))
+                size += len(df)
+    if pieces:
+        yield (*group, _chunk(pieces))
+
+# -----------------------------
+# 2. WORKERS
+# -----------------------------
+
+_specs = {}  # region -> shared-memory shard spec, set once per worker
+_shards = {} # region -> FactorIndex attached to its shard
+
+def _init_worker(specs):
+    _specs.clear()
+    _specs.update(specs)
+    _shards.clear()
+
+def _shard(region):
+    index = _shards.get(region)
+    if index is None:
+        index = _shards[region] = factor_index.attach(_specs[region])
+    return index
+
+def evaluate_task(region, soil_divisor, rows, index=None):
+    """
+    Section totals of one task: ([(project, section key, total, calculated
+    rows, issues), ...], input rows, CPU seconds). Rows are validated first
+    (validation.py). Uses the region's shared shard unless an `index` is given.
+    """
+    start = time.process_time()
+    index = index if index is not None else _shard(region)
+    projects = rows["project"].to_numpy()
+    out = []
+    for section, part in rows.groupby("section", sort=False):
+        clean, issues = validation.validate_section(part, index=index)
+        results = agri_engine.compute_section_ghg(clean, None, soil_divisor, index=index)
+        if not len(results):
+            continue
+        owner = projects[results.index.to_numpy()] # rows keep their project order
+        # Issue rows are positions in `rows`, like the results' index
+        issue_count = np.bincount(projects[issues["row"].to_numpy(dtype=np.intp)], minlength=projects.max() + 1)
+        totals = results["total"].to_numpy()
+        bounds = np.flatnonzero(np.diff(owner)) + 1
+        for project, values in zip(owner[np.r_[0, bounds]], np.split(totals, bounds)):
+            out.append((int(project), section, agri_engine.sequential_sum(values), len(values), int(issue_count[project])))
+    return out, len(rows), time.process_time() - start
+
+# -----------------------------
+# 3. EVALUATION
+# -----------------------------
+
+def _tasks_in_pool(tasks, specs, workers):
+    """Runs tasks in a pool, at most 2 * workers in flight; yields (region, result)."""
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(specs,)) as pool:
+        while True:
+            for region, soil_divisor, rows in tasks:
+                pending[pool.submit(evaluate_task, region, soil_divisor, rows)] = region
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield pending.pop(future), future.result()
+
+def evaluate_portfolio(projects, workers=1, rows_per_task=ROWS_PER_TASK):
+    """
+    Scores load_portfolio() output. With workers > 1 the region tasks run in
+    a process pool on shared-memory parameter shards. Returns (one line per
+    project in batch.PROJECT_COLUMNS, one line per region in REGION_COLUMNS,
+    stats dict with wall time and throughput).
+    """
+    start = time.perf_counter()
+    summaries = [dict(summary) for summary, _ in projects]
+    for summary, (_, sections) in zip(summaries, projects):
+        if sections is not None:
+            summary.update({"rows": 0, "issues": 0, **{f"agri{key[2:]}_total": 0 for key in agri_engine.SECTION_NAMES}})
+
+    regions = sorted({summary["region"] for summary, sections in projects if sections is not None})
+    shards = {region: factor_index.index_for(agri_engine.get_region_params(region)) for region in regions}
+    per_region = {region: {"input_rows": 0, "tasks": 0, "cpu_s": 0.0} for region in regions}
+
+    tasks = region_tasks(projects, rows_per_task)
+    blocks = {}
+    try:
+        if workers <= 1:
+            results = ((region, evaluate_task(region, soil_divisor, rows, shards[region]))
+                       for region, soil_divisor, rows in tasks)
+        else:
+            specs = {}
+            for region, index in shards.items():
+                blocks[region], specs[region] = factor_index.share(index)
+            results = _tasks_in_pool(tasks, specs, workers)
+
+        for region, (totals, input_rows, cpu_s) in results:
+            stats = per_region[region]
+            stats["input_rows"] += input_rows
+            stats["tasks"] += 1
+            stats["cpu_s"] += cpu_s
+            for project, section, total, n, issues in totals:
+                summaries[project][f"agri{section[2:]}_total"] = total
+                summaries[project]["rows"] += n
+                summaries[project]["issues"] += issues
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+    for summary in summaries:
+        if summary["rows"] is not None:
+            summary["agri_grand_total"] = summary["agri_3_1_total"] + summary["agri_3_2_total"] + summary["agri_3_3_total"]
+    seconds = time.perf_counter() - start
+
+    project_frame = pd.DataFrame(summaries, columns=batch.PROJECT_COLUMNS)
+    region_lines = []
+    for region in regions:
+        members = [s for s in summaries if s["region"] == region and s["rows"] is not None]
+        region_lines.append({
+            "region": region,
+            "projects": len(members),
+            "rows": sum(s["rows"] for s in members),
+            "agri_grand_total": agri_engine.sequential_sum([s["agri_grand_total"] for s in members]),
+            **per_region[region],
+        })
+    input_rows = sum(r["input_rows"] for r in per_region.values())
+    stats = {
+        "workers": max(workers, 1),
+        "projects": len(projects),
+        "input_rows": input_rows,
+        "tasks": sum(r["tasks"] for r in per_region.values()),
+        "seconds": seconds,
+        "rows_per_s": input_rows / seconds if seconds else 0.0,
+    }
+    return project_frame, pd.DataFrame(region_lines, columns=REGION_COLUMNS), stats
+
+# -----------------------------
+# 4. CLI
+# -----------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a portfolio of project files, region by region.")
+    parser.add_argument("inputs", nargs="+", help="Project files, directories or glob patterns")
+    parser.add_argument("--out", default="portfolio.csv", help="Per-project results CSV (default: portfolio.csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument("--rows-per-task", type=int, default=ROWS_PER_TASK, help=f"Rows per pool task (default: {ROWS_PER_TASK})")
+    args = parser.parse_args(argv)
+
+    files = batch.find_project_files(args.inputs)
+    if not files:
+        print("No project files found.", file=sys.stderr)
+        return 1
+    print(f"... Scoring a portfolio of {len(files)} projects with {args.workers} worker(s) ...")
+
+    projects = load_portfolio(files)
+    project_frame, region_frame, stats = evaluate_portfolio(projects, args.workers, args.rows_per_task)
+    project_frame.to_csv(args.out, index=False)
+
+    print(region_frame.to_string(index=False))
+    print(f"{stats['input_rows']:,} rows in {stats['seconds']:.2f} s ({stats['rows_per_s']:,.0f} rows/s)")
+    print(f"SUCCESS! Wrote '{args.out}'.")
+    return 0 if project_frame["error"].isna().all() else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+# project_store.py
+# Local project store: saves a session's project (general info, activity
+# tables, per-row and Results-page results, parameter version) to disk and
+# restores it. Each project is a directory holding a JSON manifest and one
+# Arrow IPC file per table, read back through a memory map. Loading only reads
+# the manifest; a table is materialized when a page first needs it, and saved
+# results are reused as long as the parameter version and soil period match.
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import agri_incremental
+import results_view
+import sectors
+from agri_calc import SECTION_NAMES, get_region_params, params_version
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECTS_DIR = os.environ.get("CMT_PROJECTS_DIR", os.path.join(BASE_DIR, ".cmt_projects"))
+
+# Bump when the layout changes; older projects are then refused, not misread
+STORE_FORMAT = 1
+MANIFEST = "project.json"
+
+# Session keys saved with a project (besides the tables)
+SAVED_PREFIXES = ("gi_", "check_")
+SAVED_KEYS = ("soil_divisor", "agri_grand_total", "agri_3_1_total", "agri_3_2_total", "agri_3_3_total", "agri_yearly_terms",
+              sectors.TOTALS_KEY)
+RESULTS_KEY = "agri_results_table"
+PENDING_KEY = "project_store_pending" # tables of a loaded project not read yet
+
+# -----------------------------
+# 1. TABLE FILES
+# -----------------------------
+
+def _arrow_columns(s):
+    """
+    [(name, pyarrow array, kind)] holding column `s` exactly; raises if Arrow
+    cannot. Text columns keep None and NaN apart (a NaN crop counts as a
+    crop, None does not) with an extra "__nan__" mask column.
+    """
+    import pyarrow as pa
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        dictionary = pa.array(s.cat.categories.to_numpy(dtype=object), from_pandas=False)
+        return [(s.name, pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), dictionary), "category")]
+    if isinstance(s.dtype, np.dtype) and s.dtype.kind in "biuf":
+        return [(s.name, pa.array(s.to_numpy()), "numeric")] # NaN stays NaN (not null)
+    if isinstance(s.dtype, pd.StringDtype):
+        # pandas string dtypes have a single missing value, so no NaN mask is needed
+        kind = f"{'str' if s.dtype.na_value is np.nan else 'string'}:{s.dtype.storage}"
+        return [(s.name, pa.array(s.array, type=pa.string()), kind)]
+
+    # Object columns: text, None and NaN only; anything else goes to the pickle fallback
+    values = s.to_numpy(dtype=object)
+    nan = pd.isna(values) & (values != None) # noqa: E711 (elementwise)
+    if nan.any():
+        if not all(isinstance(v, float) for v in values[nan]):
+            raise TypeError(f"column {s.name!r} holds missing-value markers other than None and NaN")
+        values = values.copy()
+        values[nan] = None
+    text = pa.array(values, from_pandas=False)
+    if not (pa.types.is_string(text.type) or pa.types.is_null(text.type)):
+        raise TypeError(f"column {s.name!r} holds {text.type} values")
+    columns = [(s.name, text, "object")]
+    if nan.any():
+        columns.append((f"__nan__{s.name}", pa.array(nan), "nan_mask"))
+    return columns
+
+def write_frame(path_stem, df):
+    """
+    Writes `df` to `<path_stem>.arrow` (Arrow IPC, uncompressed so it can be
+    memory-mapped), or `<path_stem>.pickle` when a column has no exact Arrow
+    form (mixed-type cells). Returns the file name.
+    """
+    import pyarrow as pa
+
+    columns, kinds = {}, {}
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        columns["__index__"], kinds["__index__"] = pa.array(df.index.to_numpy(dtype=np.int64)), "numeric"
+    try:
+        for name in df.columns:
+            for column, array, kind in _arrow_columns(df[name]):
+                columns[column], kinds[column] = array, kind
+    except (pa.ArrowException, TypeError, ValueError):
+        path = f"{path_stem}.pickle"
+        with open(path, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return os.path.basename(path)
+
+    table = pa.table(columns).replace_schema_metadata({"cmt_kinds": json.dumps(kinds)})
+    path = f"{path_stem}.arrow"
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return os.path.basename(path)
+
+def read_frame(path, writable=True):
+    """
+    Reads a write_frame file. Arrow files are memory-mapped; with
+    writable=False numeric columns stay views of the map (read-only).
+    """
+    if path.endswith(".pickle"):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    kinds = json.loads(table.schema.metadata[b"cmt_kinds"])
+    columns = {}
+    for name in table.column_names:
+        col = table.column(name).combine_chunks()
+        if kinds[name] == "numeric":
+            values = col.to_numpy(zero_copy_only=False)
+            columns[name] = values.copy() if writable else values
+        elif kinds[name] == "category":
+            codes = col.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            columns[name] = pd.Categorical.from_codes(codes, categories=col.dictionary.to_numpy(zero_copy_only=False))
+        elif kinds[name] == "object":
+            # object, not str dtype: nulls stay None
+            columns[name] = pd.Series(col.to_numpy(zero_copy_only=False), dtype=object, copy=False)
+        elif kinds[name].startswith(("str:", "string:")):
+            flavor, storage = kinds[name].split(":")
+            dtype = pd.StringDtype(storage, na_value=np.nan if flavor == "str" else pd.NA)
+            columns[name] = pd.Series(pd.array(col, dtype=dtype), copy=False) # straight from Arrow, no Python strings
+        else: # nan_mask of the text column before it
+            columns[name[len("__nan__"):]][col.to_numpy(zero_copy_only=False)] = np.nan
+    index = columns.pop("__index__", None)
+    df = pd.DataFrame(columns, copy=False) # one block per column, no consolidation copy
+    if index is not None:
+        df.index = index
+    return df
+
+# -----------------------------
+# 2. SAVE
+# -----------------------------
+
+def _sector_tables():
+    """Session keys of the tables of sectors with a generic page (sector_page.py)."""
+    return [key for sector in sectors.all_sectors() if not sector.own_page for key in sector.tables]
+
+def _slug(name):
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", name.strip()).strip("._")
+    return slug or "project"
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _section_snapshot(state, key, fingerprint):
+    """(frame, results or None) of a section as currently shown in the editor."""
+    base = state.get(key)
+    if base is None:
+        return None, None
+    editor_state = state.get(f"editor_{key}")
+    tracker = state.get(f"agri_tracker_{key}")
+    if tracker is not None and tracker.base_df is base and tracker.fingerprint == fingerprint:
+        return tracker.snapshot(editor_state)
+    return agri_incremental.apply_editor_state(base, editor_state), None
+
+def save_project(name, state, root=None):
+    """
+    Saves the project held in `state` (st.session_state or any mapping)
+    under `name`, replacing an earlier save of that name. Returns the manifest.
+    """
+    restore_pending(state) # tables of a loaded project that were never opened
+    root = root or PROJECTS_DIR
+    target = os.path.join(root, _slug(name))
+    os.makedirs(root, exist_ok=True)
+    # One directory per save: the sessions of a server share its PID
+    tmp = tempfile.mkdtemp(prefix=f"{_slug(name)}.", suffix=".tmp", dir=root)
+    try:
+        manifest = _write_project(name, state, tmp)
+        _swap(tmp, target)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+_swap_lock = threading.Lock()
+
+def _swap(tmp, target):
+    """Puts directory `tmp` in place of `target`, so a reader never sees half a project."""
+    with _swap_lock: # two saves of one name from different sessions take turns
+        old = None
+        if os.path.exists(target):
+            old = tempfile.mkdtemp(prefix=f"{os.path.basename(target)}.", suffix=".old", dir=os.path.dirname(target))
+            os.replace(target, os.path.join(old, "project"))
+        os.replace(tmp, target)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+def _write_project(name, state, tmp):
+    """Writes the project's tables and manifest into directory `tmp`; returns the manifest."""
+    country = state.get("gi_country")
+    soil_divisor = state.get("soil_divisor")
+    fingerprint = (soil_divisor, params_version(get_region_params(country)))
+
+    values = {k: _json_value(v) for k, v in state.items() if k.startswith(SAVED_PREFIXES) or k in SAVED_KEYS}
+    manifest = {
+        "format": STORE_FORMAT,
+        "name": name,
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "params_version": fingerprint[1],
+        "soil_divisor": soil_divisor,
+        "values": values,
+        "date_keys": [k for k, v in state.items() if k in values and isinstance(v, date)],
+        "sections": {},
+        "results": None,
+    }
+    for key in SECTION_NAMES:
+        frame, results = _section_snapshot(state, key, fingerprint)
+        if frame is None:
+            continue
+        manifest["sections"][key] = {
+            "rows": len(frame),
+            "file": write_frame(os.path.join(tmp, key), frame),
+            "results": write_frame(os.path.join(tmp, f"{key}.results"), results) if results is not None else None,
+        }
+    for key in _sector_tables():
+        if state.get(key) is not None:
+            frame = agri_incremental.apply_editor_state(state[key], state.get(f"editor_{key}"))
+            manifest["sections"][key] = {"rows": len(frame), "file": write_frame(os.path.join(tmp, key), frame), "results": None}
+    table = state.get(RESULTS_KEY)
+    if isinstance(table, results_view.ResultsTable):
+        manifest["results"] = {"rows": len(table), "file": write_frame(os.path.join(tmp, "results"), table.to_frame())}
+
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+# -----------------------------
+# 3. LOAD
+# -----------------------------
+
+class StoredProject:
+    """A saved project: the manifest now, each table when it is asked for."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != STORE_FORMAT:
+            raise ValueError(f"{path} was saved in store format {self.manifest.get('format')}, expected {STORE_FORMAT}")
+
+    @property
+    def name(self):
+        return self.manifest["name"]
+
+    def values(self):
+        """Saved session values (dates parsed back)."""
+        values = dict(self.manifest["values"])
+        for key in self.manifest["date_keys"]:
+            values[key] = date.fromisoformat(values[key][:10])
+        return values
+
+    def section(self, key):
+        entry = self.manifest["sections"].get(key)
+        return read_frame(os.path.join(self.path, entry["file"])) if entry else None
+
+    def section_results(self, key):
+        entry = self.manifest["sections"].get(key)
+        if not entry or not entry["results"]:
+            return None
+        return read_frame(os.path.join(self.path, entry["results"]), writable=False)
+
+    def results_table(self):
+        entry = self.manifest["results"]
+        if not entry:
+            return None
+        df = read_frame(os.path.join(self.path, entry["file"]), writable=False)
+        # Saved from a ResultsTable, so the columns are already in its form (values stay on the map)
+        return results_view.ResultsTable({name: df[name].array if isinstance(df[name].dtype, pd.CategoricalDtype) else df[name].to_numpy()
+                                          for name in df.columns})
+
+def list_projects(root=None):
+    """Manifests of the saved projects, most recently saved first."""
+    root = root or PROJECTS_DIR
+    if not os.path.isdir(root):
+        return []
+    manifests = []
+    for entry in os.scandir(root):
+        path = os.path.join(entry.path, MANIFEST)
+        if entry.is_dir() and not entry.name.endswith((".tmp", ".old")) and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            manifest["path"] = entry.path
+            manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m["saved_at"], reverse=True)
+
+def load_project(name_or_path, root=None):
+    path = name_or_path if os.path.isdir(name_or_path) else os.path.join(root or PROJECTS_DIR, _slug(name_or_path))
+    return StoredProject(path)
+
+def restore(state, project):
+    """
+    Makes `project` the session's project. General info is set at once; the
+    activity tables and results are read by restore_pending() when a page
+    needs them. Returns notes for the user (e.g. results that went stale).
+    """
+    values = project.values()
+    tables = set(SECTION_NAMES) | set(_sector_tables())
+    for key in list(state.keys()):
+        # Drop the current project's tables, editor deltas, trackers, imports and sector rows
+        if key in tables or key.startswith(("editor_df_", "agri_tracker_", "agri_import_", "sector_rows_")):
+            del state[key]
+    for key, value in values.items():
+        state[key] = value
+    if sectors.TOTALS_KEY not in values:
+        state[sectors.TOTALS_KEY] = {} # saved before sector totals: agriculture falls back to agri_3_x_total
+
+    notes = []
+    current = params_version(get_region_params(values.get("gi_country")))
+    results_valid = project.manifest["params_version"] == current
+    if not results_valid:
+        notes.append("Parameters changed since this project was saved: click Calculate to refresh its results.")
+        for key in SAVED_KEYS[1:-1]:
+            state[key] = None if key == "agri_yearly_terms" else 0.0
+        # Other sectors keep their totals; agriculture's are recalculated
+        state[sectors.TOTALS_KEY] = {k: v for k, v in (values.get(sectors.TOTALS_KEY) or {}).items() if k != "agriculture"}
+    state[RESULTS_KEY] = []
+    state[PENDING_KEY] = {
+        "project": project,
+        "keys": set(project.manifest["sections"]) | ({RESULTS_KEY} if results_valid and project.manifest["results"] else set()),
+    }
+    return notes
+
+def restore_pending(state, keys=None):
+    """
+    Reads the loaded project's tables listed in `keys` (all when None) into
+    `state`. A section's saved per-row results become its tracker when
+    they were computed with the current soil period and parameters.
+    """
+    pending = state.get(PENDING_KEY)
+    if not pending:
+        return
+    project = pending["project"]
+    for key in list(pending["keys"] if keys is None else pending["keys"] & set(keys)):
+        if key == RESULTS_KEY:
+            state[RESULTS_KEY] = project.results_table()
+        elif key not in SECTION_NAMES:
+            state[key] = project.section(key) # sector tables: no per-row results saved
+        else:
+            frame = state[key] = project.section(key)
+            params = get_region_params(state.get("gi_country"))
+            soil_divisor = state.get("soil_divisor")
+            if (project.manifest["soil_divisor"], project.manifest["params_version"]) == (soil_divisor, params_version(params)):
+                results = project.section_results(key)
+                if results is not None:
+                    state[f"agri_tracker_{key}"] = agri_incremental.SectionTracker(frame, params, soil_divisor, results=results)
+        pending["keys"].discard(key)
+    if not pending["keys"]:
+        del state[PENDING_KEY]
+
+# -----------------------------
+# 4. SIDEBAR PANEL
+# -----------------------------
+
+def _save_clicked():
+    import streamlit as st
+
+    name = (st.session_state.get("store_name") or st.session_state.get("gi_project_name") or "").strip()
+    if not name:
+        st.session_state["store_message"] = ("warning", "Enter a project name first.")
+        return
+    start = time.perf_counter()
+    manifest = save_project(name, st.session_state)
+    rows = sum(s["rows"] for s in manifest["sections"].values())
+    st.session_state["store_message"] = ("success", f"Saved '{name}' ({rows:,} rows) in {time.perf_counter() - start:,.2f} s.")
+
+def _load_clicked():
+    import streamlit as st
+
+    picked = st.session_state.get("store_pick")
+    if not picked:
+        return
+    start = time.perf_counter()
+    notes = restore(st.session_state, StoredProject(picked))
+    message = f"Loaded '{st.session_state.get('gi_project_name') or os.path.basename(picked)}' in {(time.perf_counter() - start) * 1000:,.0f} ms."
+    st.session_state["store_message"] = ("warning" if notes else "success", " ".join([message] + notes))
+
+def render_project_panel():
+    """Save / load controls for the sidebar."""
+    import streamlit as st
+
+    with st.sidebar.expander("Projects"):
+        st.text_input("Save as", key="store_name", placeholder=st.session_state.get("gi_project_name") or "Project name")
+        st.button("Save project", on_click=_save_clicked, use_container_width=True)
+
+        saved = list_projects()
+        if saved:
+            labels = {m["path"]: f"{m['name']} ({m['saved_at'].replace('T', ' ')})" for m in saved}
+            st.selectbox("Saved projects", list(labels), format_func=labels.get, key="store_pick")
+            st.button("Load project", on_click=_load_clicked, use_container_width=True)
+
+        message = st.session_state.get("store_message")
+        if message:
+            getattr(st, message[0])(message[1])
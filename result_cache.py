@@ -0,0 +1,262 @@
+# result_cache.py
+# Memoized section results. compute_section_ghg output is stored under a key
+# made of a content hash of the section table, the soil period and the
+# parameter version of the region (agri_calc.params_version: the hash of its
+# parameters.py / workbook tables, so the region enters by content). An
+# unchanged table is then not calculated again: not on a repeated Calculate,
+# not in another session, and with the disk tier not after a restart.
+#
+# Two tiers: an in-memory LRU bounded in bytes and shared by all sessions of
+# the process, and an optional directory of Arrow files (project_store's
+# table format, memory-mapped on read) bounded in total size, least recently
+# used first out. Hits, misses and evictions are counted for monitoring.
+import hashlib
+import os
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import instrumentation
+from agri_calc import SECTION_COLUMNS, params_version
+
+# Bump when the engine's output changes, so older disk entries are ignored
+RESULT_FORMAT = 2 # 2: rows with an empty (NaN) crop are no longer calculated
+
+DEFAULT_MEMORY_MB = 256
+DEFAULT_DISK_MB = 2048
+
+COUNTERS = ("memory_hits", "disk_hits", "misses", "stores", "memory_evictions", "disk_evictions")
+
+# -----------------------------
+# 1. KEYS
+# -----------------------------
+
+_repr_cells = np.frompyfunc(repr, 1, 1)
+_NUMBER_KINDS = ("floating", "integer", "mixed-integer-float", "boolean", "decimal")
+_MISSING_HASH = np.uint64(0x9E3779B97F4A7C15) # hash of an empty cell in a str column
+_MIX = np.uint64(0x100000001B3)
+_NUMBER_SALT = np.uint64(0xC2B2AE3D27D4EB4F) # keeps 1 apart from "1": hash_array hashes both as text
+
+def _column_hash(s):
+    """
+    uint64 hash per cell. Cells the engine may treat differently hash
+    differently: None and NaN (alike for the engine today, not for the
+    row-by-row reference) and text vs. other values ("1" vs. 1 as a label)
+    are kept apart.
+    """
+    if isinstance(s.dtype, pd.StringDtype):
+        # Hashed per distinct label, not per row (as categoricals are)
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        hashes = np.append(pd.util.hash_array(np.asarray(uniques, dtype=object)), _MISSING_HASH)
+        return hashes[codes]
+    if s.dtype != object:
+        return pd.util.hash_pandas_object(s, index=False).to_numpy()
+    values = s.to_numpy()
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind in ("string", "empty"):
+        # hash_array hashes None and NaN alike; flip a bit for None
+        return pd.util.hash_array(values) ^ (values == None).astype(np.uint64) # noqa: E711 (elementwise)
+    if kind in _NUMBER_KINDS:
+        return pd.util.hash_array(values) ^ _NUMBER_SALT # hashed as text: None, nan, 1 and 1.0 all differ
+    return pd.util.hash_array(_repr_cells(values).astype(object)) # mixed types: repr shows the type
+
+def frame_hash(df):
+    """Hex digest of a section table: its schema columns (dtypes and values) and index."""
+    df = df.reindex(columns=SECTION_COLUMNS)
+    digest = hashlib.blake2b(digest_size=16)
+    rows = np.zeros(len(df), dtype=np.uint64)
+    for col in SECTION_COLUMNS:
+        s = df[col]
+        digest.update(f"{col}\0{s.dtype}\0".encode("utf-8"))
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            digest.update(repr(list(s.cat.categories)).encode("utf-8"))
+        # Columns folded into one hash per row (order-sensitive, wraps mod 2**64),
+        # so the digest reads 8 bytes a row rather than 8 per cell
+        rows *= _MIX
+        rows ^= _column_hash(s)
+    digest.update(rows.tobytes())
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        digest.update(f"range\0{index.start}\0{index.stop}\0{index.step}".encode("utf-8"))
+    else:
+        digest.update(pd.util.hash_array(index.to_numpy()).tobytes())
+    return digest.hexdigest()
+
+def cache_key(df, params, soil_divisor):
+    """Key of a section's results: table contents, soil period and parameter version."""
+    text = f"{RESULT_FORMAT}|{frame_hash(df)}|{soil_divisor!r}|{params_version(params)}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+# -----------------------------
+# 2. CACHE
+# -----------------------------
+
+class ResultCache:
+    """
+    Two-tier store of compute_section_ghg results. `memory_bytes` bounds the
+    in-memory LRU (0 disables it); `disk_dir` enables the disk tier, bounded
+    by `disk_bytes`. Thread-safe; returned frames are shallow copies, so the
+    cached ones are never modified by callers.
+    """
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_MB * 1_000_000, disk_dir=None, disk_bytes=DEFAULT_DISK_MB * 1_000_000):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self._entries = OrderedDict() # key -> (results, bytes), least recently used first
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """Cached results for `key`, or None. A disk hit is promoted to memory."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.counts["memory_hits"] += 1
+                return entry[0].copy(deep=False)
+        results = self._read_disk(key)
+        with self._lock:
+            self.counts["disk_hits" if results is not None else "misses"] += 1
+        if results is not None:
+            self._remember(key, results)
+            return results.copy(deep=False)
+        return None
+
+    def put(self, key, results):
+        self._remember(key, results)
+        self._write_disk(key, results)
+        with self._lock:
+            self.counts["stores"] += 1
+
+    def _remember(self, key, results):
+        size = int(results.memory_usage(deep=True).sum())
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._memory_used -= old[1]
+            self._entries[key] = (results, size)
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._memory_used -= evicted
+                self.counts["memory_evictions"] += 1
+
+    # -- disk tier --
+
+    def _paths(self, key):
+        return [os.path.join(self.disk_dir, f"{key}{ext}") for ext in (".arrow", ".pickle")]
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        import project_store
+
+        for path in self._paths(key):
+            try:
+                results = project_store.read_frame(path, writable=False)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                warnings.warn(f"Ignoring unreadable result cache entry {path}: {e}")
+                continue
+            try:
+                os.utime(path) # mtime = last use, for eviction
+            except OSError:
+                pass
+            return results
+        return None
+
+    def _write_disk(self, key, results):
+        if not self.disk_dir:
+            return
+        import project_store
+
+        # Written under a temporary name and renamed: readers never see half a file
+        stem = os.path.join(self.disk_dir, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            name = project_store.write_frame(stem, results)
+            os.replace(os.path.join(self.disk_dir, name), os.path.join(self.disk_dir, key + os.path.splitext(name)[1]))
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.name.endswith((".arrow", ".pickle")) and ".tmp" not in entry.name:
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        used = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            used -= size
+            with self._lock:
+                self.counts["disk_evictions"] += 1
+
+    def stats(self):
+        """Counters plus the current size of each tier."""
+        with self._lock:
+            out = dict(self.counts, memory_entries=len(self._entries), memory_bytes=self._memory_used)
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_rate"] = (out["memory_hits"] + out["disk_hits"]) / lookups if lookups else 0.0
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_used = 0
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_cache():
+    """
+    The process-wide cache, configured from the environment on first use:
+    CMT_RESULT_CACHE_MB (memory tier, default 256), CMT_RESULT_CACHE_DIR
+    (disk tier directory, off unless set) and CMT_RESULT_CACHE_DISK_MB
+    (default 2048).
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ResultCache(
+                memory_bytes=int(float(os.environ.get("CMT_RESULT_CACHE_MB", DEFAULT_MEMORY_MB)) * 1_000_000),
+                disk_dir=os.environ.get("CMT_RESULT_CACHE_DIR") or None,
+                disk_bytes=int(float(os.environ.get("CMT_RESULT_CACHE_DISK_MB", DEFAULT_DISK_MB)) * 1_000_000),
+            )
+            instrumentation.register_counters("result_cache", lambda: _default.counts)
+    return _default
+
+# -----------------------------
+# 3. MEMOIZED ENGINE
+# -----------------------------
+
+def cached_section_ghg(df, params, soil_divisor, cache=None):
+    """
+    (results, hit): compute_section_ghg output for `df`, from the cache when
+    the same table was calculated with the same soil period and parameters.
+    """
+    cache = cache if cache is not None else default_cache()
+    key = cache_key(df, params, soil_divisor)
+    results = cache.get(key)
+    if results is not None:
+        return results, True
+    results = agri_engine.compute_section_ghg(df, params, soil_divisor)
+    cache.put(key, results)
+    return results.copy(deep=False), False
@@ -0,0 +1,123 @@
+# results_view.py
+# Storage, aggregation, paging and export for the Results page. Per-row
+# results are kept column by column (ResultsTable); the chart and the summary
+# table only ever receive Section x Crop (optionally x Region / practice)
+# aggregates, and the detail table is sent to the browser one page at a time.
+import io
+
+import numpy as np
+import pandas as pd
+
+from agri_calc import PRACTICE_COLUMNS
+
+BASE_GROUPS = ["Section", "Crop"]
+GROUP_OPTIONS = ["Region"] + PRACTICE_COLUMNS
+PAGE_SIZES = [100, 1_000, 10_000]
+UNSPECIFIED = "(none)"
+
+VALUE_FIELDS = ["Area", "Ref AGB", "Ref Soil", "Emission Reduction"]
+
+# -----------------------------
+# 1. COLUMNAR STORAGE
+# -----------------------------
+
+class ResultsTable:
+    """
+    Per-row results stored column by column: float64 arrays for the values
+    and categoricals (small integer codes + one copy of each label) for
+    Section, Crop, the practices and Region. Fields keep the Results table
+    names: table["Emission Reduction"], table.fields.
+    """
+
+    def __init__(self, columns):
+        self._columns = dict(columns)
+        self._length = len(next(iter(self._columns.values()))) if self._columns else 0
+
+    @classmethod
+    def from_frame(cls, df):
+        columns = {}
+        for name in df.columns:
+            s = df[name]
+            if name in VALUE_FIELDS:
+                columns[name] = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            elif isinstance(s.dtype, pd.CategoricalDtype):
+                columns[name] = s.array.remove_unused_categories()
+            else:
+                columns[name] = pd.Categorical(s.to_numpy(dtype=object))
+        return cls(columns)
+
+    @property
+    def fields(self):
+        return list(self._columns)
+
+    def __getitem__(self, field):
+        """Column by Results field name: a float64 array or a pd.Categorical."""
+        return self._columns[field]
+
+    def __contains__(self, field):
+        return field in self._columns
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def nbytes(self):
+        total = 0
+        for col in self._columns.values():
+            if isinstance(col, pd.Categorical):
+                total += col.codes.nbytes + int(col.categories.memory_usage(deep=True))
+            else:
+                total += col.nbytes
+        return total
+
+    def to_frame(self):
+        """DataFrame over the stored arrays (no copy of the values)."""
+        return pd.DataFrame(self._columns, columns=self.fields, copy=False)
+
+# -----------------------------
+# 2. AGGREGATION
+# -----------------------------
+
+def _group_labels(s):
+    """Column as string labels, missing values shown as UNSPECIFIED."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Relabel the categories, not the rows
+        s = s.cat.rename_categories(s.cat.categories.astype(str))
+        if UNSPECIFIED not in s.cat.categories:
+            s = s.cat.add_categories([UNSPECIFIED])
+        return s.fillna(UNSPECIFIED)
+    return s.astype(object).where(s.notna(), UNSPECIFIED).astype(str)
+
+def aggregate(results, extra_groups=()):
+    """
+    Area, Emission Reduction and row count per Section x Crop (plus any of
+    GROUP_OPTIONS in `extra_groups` that the results have), sorted by group.
+    """
+    by = BASE_GROUPS + [c for c in extra_groups if c in results.columns and c not in BASE_GROUPS]
+    keys = pd.DataFrame({c: _group_labels(results[c]) for c in by}, index=results.index)
+    grouped = pd.concat([keys, results[["Area", "Emission Reduction"]]], axis=1).groupby(by, observed=True, sort=True)
+    return grouped.agg(**{
+        "Area": ("Area", "sum"),
+        "Emission Reduction": ("Emission Reduction", "sum"),
+        "Rows": ("Emission Reduction", "size"),
+    }).reset_index()
+
+# -----------------------------
+# 3. PAGING & EXPORT
+# -----------------------------
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+def page(results, number, page_size):
+    """Rows of 1-based page `number`."""
+    start = (number - 1) * page_size
+    return results.iloc[start:start + page_size]
+
+def to_csv_bytes(results):
+    return results.to_csv(index=False).encode("utf-8")
+
+def to_parquet_bytes(results):
+    buf = io.BytesIO()
+    results.to_parquet(buf, index=False)
+    return buf.getvalue()
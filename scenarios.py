@@ -0,0 +1,149 @@
+# scenarios.py
+# Scenario sweeps / sensitivity analysis for the agriculture sections.
+#
+# Each row total is
+#     round(B + soil / soil_divisor * tillage * input - residue * residue_multiplier * 3.664, 2)
+# where B (biomass term) does not depend on the swept values. With the
+# scenario scales folded into two numbers per scenario,
+#     a = tillage_scale * input_scale / soil_divisor
+#     c = residue_scale * residue_multiplier * 3.664
+# every row total is B + a * (soil * tillage * input) - c * residue, so a
+# whole block of scenarios x rows is evaluated with a few broadcast array
+# operations. Scenarios are processed in chunks to bound memory.
+import numpy as np
+import pandas as pd
+
+import agri_engine
+from agri_calc import SECTION_NAMES, CO2_PER_C
+
+SCENARIO_COLUMNS = ["soil_divisor", "tillage_scale", "input_scale", "residue_scale", "residue_multiplier"]
+
+# Largest scenarios x rows block held in memory at once (float64 cells)
+CHUNK_CELLS = 4_000_000
+
+# -----------------------------
+# 1. SCENARIO GENERATION
+# -----------------------------
+
+def _defaults(params, base_soil_divisor):
+    return {
+        "soil_divisor": base_soil_divisor,
+        "tillage_scale": 1.0,
+        "input_scale": 1.0,
+        "residue_scale": 1.0,
+        "residue_multiplier": params["residue_multiplier"],
+    }
+
+def grid(params, base_soil_divisor, **axes):
+    """
+    Cartesian product of the given axes, e.g.
+    grid(params, 20, soil_divisor=range(15, 31), input_scale=[0.9, 1.0, 1.1]).
+    Axes not given stay at their base value (current soil_divisor, scale 1.0,
+    the region's residue multiplier).
+    """
+    unknown = set(axes) - set(SCENARIO_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown scenario axes: {sorted(unknown)}")
+    values = {k: np.atleast_1d(np.asarray(axes.get(k, v), dtype=np.float64)) for k, v in _defaults(params, base_soil_divisor).items()}
+    mesh = np.meshgrid(*values.values(), indexing="ij")
+    return pd.DataFrame({k: m.ravel() for k, m in zip(values, mesh)})
+
+def monte_carlo(params, base_soil_divisor, n, seed=None, **ranges):
+    """
+    `n` scenarios with each given axis drawn uniformly from a (low, high)
+    range, e.g. monte_carlo(params, 20, 10_000, soil_divisor=(15, 30), input_scale=(0.9, 1.1)).
+    """
+    unknown = set(ranges) - set(SCENARIO_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown scenario axes: {sorted(unknown)}")
+    rng = np.random.default_rng(seed)
+    out = {}
+    for k, base in _defaults(params, base_soil_divisor).items():
+        if k in ranges:
+            low, high = ranges[k]
+            out[k] = rng.uniform(low, high, n)
+        else:
+            out[k] = np.full(n, base, dtype=np.float64)
+    return pd.DataFrame(out)
+
+# -----------------------------
+# 2. SWEEP
+# -----------------------------
+
+class SweepInputs:
+    """Per-row terms of every section, concatenated, with one slice per section."""
+
+    def __init__(self, results_by_section):
+        parts, self.slices, start = [], {}, 0
+        for key in SECTION_NAMES:
+            results = results_by_section.get(key)
+            n = 0 if results is None else len(results)
+            self.slices[key] = slice(start, start + n)
+            start += n
+            if n:
+                parts.append(results)
+        cols = ["agb_used", "bgb_used", "soil_used", "tillage_factor", "input_factor", "residue_factor", "area"]
+        data = pd.concat(parts)[cols] if parts else pd.DataFrame(columns=cols, dtype=np.float64)
+        agb, bgb, soil, tillage, inputs, residue, area = (data[c].to_numpy(dtype=np.float64) for c in cols)
+
+        self.biomass = (agb * CO2_PER_C + bgb * CO2_PER_C) * area
+        self.soil = soil * tillage * inputs
+        self.residue = residue
+        self.rows = start
+
+def sweep_inputs(sections, params):
+    """SweepInputs from raw section frames ({"df_3_1": DataFrame, ...})."""
+    # soil_divisor only enters the "total" column, not the terms used here
+    return SweepInputs({
+        key: agri_engine.compute_section_ghg(df, params, 1)
+        for key, df in sections.items() if df is not None
+    })
+
+def run_sweep(inputs, scenarios, chunk_cells=CHUNK_CELLS):
+    """
+    Evaluates every scenario (row of `scenarios`) over all rows in `inputs`.
+    Returns `scenarios` with one total column per section plus "grand_total".
+    """
+    n = len(scenarios)
+    a = (scenarios["tillage_scale"].to_numpy(np.float64) * scenarios["input_scale"].to_numpy(np.float64)
+         / scenarios["soil_divisor"].to_numpy(np.float64))
+    c = (scenarios["residue_scale"].to_numpy(np.float64) * scenarios["residue_multiplier"].to_numpy(np.float64)
+         * CO2_PER_C)
+
+    totals = {key: np.zeros(n) for key in SECTION_NAMES}
+    chunk = max(1, chunk_cells // max(inputs.rows, 1))
+    block = np.empty((min(chunk, n), inputs.rows))
+    scratch = np.empty_like(block)
+
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        m = block[:stop - start]
+        tmp = scratch[:stop - start]
+        # m = round(B + a * soil - c * residue, 2), all in place
+        np.multiply(a[start:stop, None], inputs.soil[None, :], out=m)
+        m += inputs.biomass
+        np.multiply(c[start:stop, None], inputs.residue[None, :], out=tmp)
+        m -= tmp
+        np.round(m, 2, out=m)
+        for key, sl in inputs.slices.items():
+            totals[key][start:stop] = m[:, sl].sum(axis=1)
+
+    out = scenarios.reset_index(drop=True).copy()
+    for key, values in totals.items():
+        out[key] = values
+    out["grand_total"] = sum(totals.values())
+    return out
+
+def summarize(sweep, percentiles=(5, 25, 50, 75, 95)):
+    """Distribution of each section total (and the grand total) across scenarios."""
+    cols = list(SECTION_NAMES) + ["grand_total"]
+    values = sweep[cols].to_numpy(dtype=np.float64)
+    summary = {
+        "mean": values.mean(axis=0),
+        "std": values.std(axis=0),
+        "min": values.min(axis=0),
+        **{f"p{p}": np.percentile(values, p, axis=0) for p in percentiles},
+        "max": values.max(axis=0),
+    }
+    labels = [SECTION_NAMES.get(c, "Grand total") for c in cols]
+    return pd.DataFrame(summary, index=labels)
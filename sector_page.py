@@ -0,0 +1,93 @@
+# sector_page.py
+# Streamlit page of a sector module (sectors.Sector): one data editor per
+# table, built from the sector's Column schema and option lists, a Calculate
+# button that runs the sector through sectors.run_sectors, and its totals.
+# A new sector gets its page from its declaration alone.
+import streamlit as st
+
+import agri_incremental
+import instrumentation
+import project_store
+import sectors
+import shared_state
+
+def rows_key(sector):
+    return f"sector_rows_{sector.key}"
+
+def persist_editor_state(sector):
+    """Folds each table's data-editor edits into its base frame (see agri.persist_editor_state)."""
+    for key in sector.tables:
+        editor_state = st.session_state.get(f"editor_{key}")
+        if key not in st.session_state or not editor_state:
+            continue
+        if any(editor_state.get(part) for part in ("edited_rows", "added_rows", "deleted_rows")):
+            st.session_state[key] = agri_incremental.apply_editor_state(st.session_state[key], editor_state)
+
+def current_tables(sector, state):
+    """Each table as the editor currently shows it."""
+    return {key: agri_incremental.apply_editor_state(state[key], state.get(f"editor_{key}"))
+            for key in sector.tables if key in state}
+
+def _column_config(columns, params):
+    config = {}
+    for col in columns:
+        if col.kind == "option":
+            config[col.name] = st.column_config.SelectboxColumn(col.label, options=list(params["lists"][col.options]), help=col.help)
+        else:
+            config[col.name] = st.column_config.NumberColumn(col.label, help=col.help)
+    return config
+
+def store_results(state, results):
+    """Keeps run_sectors output in the session: totals merged into the cross-sector ones, rows per sector."""
+    state[sectors.TOTALS_KEY] = sectors.merge_totals(state.get(sectors.TOTALS_KEY), results)
+    for result in results.values():
+        state[rows_key(result.sector)] = result.rows
+
+def render_sector_page(sector):
+    st.header(sector.title)
+    # Tables of a loaded project are read when this page is first shown
+    project_store.restore_pending(st.session_state, list(sector.tables))
+    settings = sectors.session_settings(st.session_state)
+    params = sector.parameters(settings)
+
+    if not sector.enabled(st.session_state):
+        st.info(f"'{sector.title}' is not ticked under Activities Reported on the Start page, so it is left out of the totals.")
+    st.info("ℹ️ **Defaults:** columns starting with 'Local' replace the CAFI default factor when they hold a positive number.")
+
+    for tab, (key, label) in zip(st.tabs(list(sector.tables.values())), sector.tables.items()):
+        with tab, instrumentation.span("data_editor", section=key):
+            if key not in st.session_state:
+                st.session_state[key] = sector.empty_table(key)
+            st.data_editor(
+                st.session_state[key],
+                key=f"editor_{key}",
+                num_rows="dynamic",
+                column_config=_column_config(sector.schema[key], params),
+                use_container_width=True
+            )
+
+    st.divider()
+    if st.button(f"Calculate {sector.name} Emissions", type="primary", key=f"calculate_{sector.key}"):
+        with instrumentation.span("sector_run", sector=sector.key):
+            # Calculated whether ticked or not; the totals only count ticked sectors
+            flags = dict.fromkeys(sector.flags, True)
+            results = sectors.run_sectors(flags, current_tables(sector, st.session_state), settings, sectors=[sector])
+        store_results(st.session_state, results)
+        st.success("Calculations updated!")
+        for key, error in results[sector.key].errors.items():
+            st.error(f"{sector.tables[key]}: {error}")
+
+    totals = shared_state.get(sectors.TOTALS_KEY) or {}
+    if sector.key in totals:
+        cols = st.columns(len(sector.tables) + 1)
+        section_totals = totals[sector.key]
+        for col, (key, label) in zip(cols, sector.tables.items()):
+            col.metric(label, f"{section_totals.get(key, 0.0):,.2f}")
+        cols[-1].metric("TOTAL", f"{sum(section_totals.values()):,.2f}")
+
+        rows = {key: df for key, df in (shared_state.get(rows_key(sector)) or {}).items() if len(df)}
+        if rows:
+            with st.expander(f"Detailed rows ({sum(len(df) for df in rows.values()):,})"):
+                for key, df in rows.items():
+                    st.caption(sector.tables[key])
+                    st.dataframe(df.rename(columns={"total": "Emission Reduction"}), use_container_width=True)
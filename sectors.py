@@ -0,0 +1,261 @@
+# sectors.py
+# Sector modules and the runner that calculates them together.
+#
+# A sector (energy.py, the agriculture adapter below; ARR and forestry to
+# come) declares its input tables as Column schemas, builds its read-only
+# parameter tables once per process and calculates a whole table per call,
+# column by column, never row by row. run_sectors takes the sectors enabled
+# by the Start page's check_* flags, calculates their tables concurrently and
+# returns one SectorResult per sector. Their totals merge into one
+# cross-sector structure, {sector key: {table key: tCO2e}}, kept in the
+# session under TOTALS_KEY and read by the Start and Results pages.
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import agri_engine
+
+# Modules that register a sector when imported (see register)
+SECTOR_MODULES = ("energy",)
+
+TOTALS_KEY = "sector_totals"
+TOTAL_COLUMNS = ["Sector", "Section", "Emission Reduction"]
+
+# -----------------------------
+# 1. SCHEMA & REGISTRY
+# -----------------------------
+
+class Column:
+    """
+    One input column of a sector table: kind "option" (a label from the
+    parameter list `options`, e.g. params["lists"]["fuel"]) or "number".
+    `label` and `help` are shown in the data editor.
+    """
+
+    def __init__(self, name, kind="number", options=None, label=None, help=None):
+        self.name = name
+        self.kind = kind
+        self.options = options
+        self.label = label or name
+        self.help = help
+
+class Sector:
+    """
+    Base class of a sector module. Subclasses set the class attributes and
+    implement parameters() and calculate(); the page (sector_page.py), the
+    runner and the totals need nothing else.
+    """
+    key = None        # e.g. "energy"
+    name = None       # e.g. "Energy"
+    title = None      # page and results label, e.g. "1. Energy"
+    flags = ()        # Start page check_* flags; the sector counts when any is ticked
+    tables = {}       # session key of each table -> section label
+    schema = {}       # session key -> [Column, ...]
+    row_key = {}      # session key -> column that must be filled for a row to count
+    own_page = False  # True: the app calculates it on its own page, not through the runner
+
+    def enabled(self, flags):
+        """Keys of the tables that count, given the check_* values in `flags`."""
+        return list(self.tables) if any(flags.get(flag) for flag in self.flags) else []
+
+    def parameters(self, settings):
+        """Read-only parameter tables for `settings` ({"country", "soil_divisor"})."""
+        raise NotImplementedError
+
+    def calculate(self, table, df, params):
+        """
+        Per-row results of one table: a frame with the index of the rows of
+        `df` that count (row_key filled) and a "total" column in tCO2e.
+        """
+        raise NotImplementedError
+
+    def empty_table(self, table):
+        """A table with no rows and the schema's columns (labels as text, numbers as float64)."""
+        return pd.DataFrame({col.name: pd.Series(dtype=object if col.kind == "option" else "float64")
+                             for col in self.schema[table]})
+
+    def counted(self, table, df):
+        """The rows of `df` that count, in the schema's columns."""
+        df = df.reindex(columns=[col.name for col in self.schema[table]])
+        return df[selected(df[self.row_key[table]])]
+
+SECTORS = {} # key -> Sector
+
+def register(sector):
+    SECTORS[sector.key] = sector
+    return sector
+
+def all_sectors():
+    """Every registered sector, in page order (by title)."""
+    for name in SECTOR_MODULES:
+        importlib.import_module(name)
+    return sorted(SECTORS.values(), key=lambda sector: sector.title)
+
+def get_sector(key):
+    all_sectors()
+    return SECTORS[key]
+
+# -----------------------------
+# 2. COLUMN HELPERS
+# -----------------------------
+
+def selected(s):
+    """bool per cell of a label column: a label is chosen (not empty, not the workbook's placeholder)."""
+    s = agri_engine.unwrap_column(s)
+    return agri_engine.truthy_column(s) & (s != "Please select").to_numpy(dtype=bool, na_value=True)
+
+def number(s):
+    """A number column as float64, with empty and unparsable cells as 0 (blank cells in the workbook)."""
+    return np.nan_to_num(agri_engine.coerce_float_column(s), nan=0.0)
+
+def lookup(s, table, default=0.0):
+    """
+    float64 per cell of label column `s`: table[label], or `default` for
+    labels not in `table` and empty cells. Works per distinct label.
+    """
+    codes, uniques = pd.factorize(agri_engine.unwrap_column(s), use_na_sentinel=True)
+    values = np.array([table.get(label, default) for label in uniques] + [default], dtype=np.float64)
+    return values[codes]
+
+def local_or_default(s, default):
+    """The workbook's IF(local > 0, local, default) over a whole column."""
+    local = number(s)
+    return np.where(local > 0, local, default)
+
+# -----------------------------
+# 3. RUNNER
+# -----------------------------
+
+class SectorResult:
+    """One sector's run: per-table totals, per-row results, wall seconds and errors."""
+
+    def __init__(self, sector):
+        self.sector = sector
+        self.totals = {}  # table key -> tCO2e
+        self.rows = {}    # table key -> calculate() output
+        self.seconds = {} # table key -> wall seconds
+        self.errors = {}  # table key -> "ErrorType: message"
+
+    @property
+    def total(self):
+        return agri_engine.sequential_sum([self.totals[key] for key in self.sector.tables if key in self.totals])
+
+def _calculate(sector, key, df, params):
+    start = time.perf_counter()
+    rows = sector.calculate(key, df, params)
+    return rows, agri_engine.sequential_sum(rows["total"].to_numpy(dtype=np.float64)), time.perf_counter() - start
+
+def run_sectors(flags, tables, settings, workers=None, sectors=None):
+    """
+    Calculates the tables of the sectors enabled in `flags` (check_* values)
+    concurrently, one thread per table up to `workers` (default: the core
+    count); the engines work on whole columns, so most of the time is spent
+    outside the GIL. `tables` maps table keys to frames (missing: nothing
+    entered, total 0). `sectors` defaults to every registered one.
+    Returns {sector key: SectorResult}.
+    """
+    results, jobs = {}, []
+    for sector in sectors if sectors is not None else all_sectors():
+        keys = sector.enabled(flags)
+        if not keys:
+            continue
+        result = results[sector.key] = SectorResult(sector)
+        params = sector.parameters(settings)
+        for key in keys:
+            df = tables.get(key)
+            if df is None or not len(df):
+                result.totals[key] = 0.0
+            else:
+                jobs.append((sector, key, df, params))
+
+    workers = max(1, min(len(jobs), workers or os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(sector, key, pool.submit(_calculate, sector, key, df, params)) for sector, key, df, params in jobs]
+        for sector, key, future in futures:
+            result = results[sector.key]
+            try:
+                result.rows[key], result.totals[key], result.seconds[key] = future.result()
+            except Exception as e:
+                result.totals[key] = 0.0
+                result.errors[key] = f"{type(e).__name__}: {e}"
+    for result in results.values():
+        result.totals = {key: result.totals[key] for key in result.sector.tables if key in result.totals}
+    return results
+
+# -----------------------------
+# 4. CROSS-SECTOR TOTALS
+# -----------------------------
+
+def merge_totals(totals, results):
+    """`totals` ({sector key: {table key: tCO2e}}) updated with run_sectors output; a new dict."""
+    merged = {key: dict(tables) for key, tables in (totals or {}).items()}
+    for key, result in results.items():
+        merged.setdefault(key, {}).update(result.totals)
+    return merged
+
+def session_totals(state):
+    """
+    The session's cross-sector totals. Agriculture falls back to the
+    agri_3_x_total values for sessions and projects from before the sector
+    totals were kept.
+    """
+    totals = dict(state.get(TOTALS_KEY) or {})
+    if "agriculture" not in totals:
+        totals["agriculture"] = {key: state.get(f"agri{key[2:]}_total") or 0.0 for key in agri_engine.SECTION_NAMES}
+    return totals
+
+def totals_frame(totals, flags):
+    """One line per counted table of the enabled sectors (TOTAL_COLUMNS), in page order."""
+    lines = []
+    for sector in all_sectors():
+        for key in sector.enabled(flags):
+            lines.append({"Sector": sector.title, "Section": sector.tables[key],
+                          "Emission Reduction": (totals.get(sector.key) or {}).get(key, 0.0)})
+    return pd.DataFrame(lines, columns=TOTAL_COLUMNS)
+
+def grand_total(totals, flags):
+    """Sum over the enabled sectors' counted tables."""
+    return agri_engine.sequential_sum(totals_frame(totals, flags)["Emission Reduction"].to_numpy(dtype=np.float64))
+
+def session_settings(state):
+    return {"country": state.get("gi_country"), "soil_divisor": state.get("soil_divisor") or 20}
+
+# -----------------------------
+# 5. AGRICULTURE ADAPTER
+# -----------------------------
+
+class AgricultureSector(Sector):
+    """
+    The 3.x sections as a sector, calculated with the section engine (through
+    the result cache). The app calculates them on the Agriculture page
+    (incremental, with file imports) and records the totals there.
+    """
+    key = "agriculture"
+    name = "Agriculture"
+    title = "3. Agriculture"
+    flags = ("check_agri_3_1", "check_agri_3_2", "check_agri_3_3")
+    tables = dict(agri_engine.SECTION_NAMES)
+    schema = {key: [Column(name, "option" if name in agri_engine.SECTION_COLUMNS[:5] and name != "Area (ha)" else "number")
+                    for name in agri_engine.SECTION_COLUMNS]
+              for key in agri_engine.SECTION_NAMES}
+    row_key = dict.fromkeys(agri_engine.SECTION_NAMES, "Crop System")
+    own_page = True
+
+    def enabled(self, flags):
+        # One flag per section, ticked by default on the Start page
+        return [key for key in self.tables if flags.get(f"check_agri{key[2:]}", True)]
+
+    def parameters(self, settings):
+        return {"region": agri_engine.get_region_params(settings["country"]), "soil_divisor": settings["soil_divisor"]}
+
+    def calculate(self, table, df, params):
+        import result_cache
+
+        results, _ = result_cache.cached_section_ghg(df, params["region"], params["soil_divisor"])
+        return results
+
+register(AgricultureSector())
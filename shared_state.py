@@ -29,6 +29,9 @@ def init_state():
         "check_arr": False,
         "check_agri": True,
         "check_forest": False,
+
+        # Navigation: render only the selected page on each rerun
+        "nav_lazy": True,
         
         # Agri Logic State
         "soil_divisor": 20,
@@ -39,6 +42,10 @@ def init_state():
         "agri_3_1_total": 0.0,
         "agri_3_2_total": 0.0,
         "agri_3_3_total": 0.0,
+        "agri_yearly_terms": None,    # per-section sums for the yearly totals (agri_timeseries)
+
+        # Totals of every sector, {sector: {table: tCO2e}} (see sectors.py)
+        "sector_totals": {},
     }
 
     for key, value in defaults.items():
@@ -49,4 +56,17 @@ def get(key):
     return st.session_state.get(key)
 
 def set(key, value):
-    st.session_state[key] = value
\ No newline at end of file
+    st.session_state[key] = value
+
+# Widget keys whose values must survive reruns in which their widget is not drawn
+PERSISTENT_WIDGET_PREFIXES = ("gi_", "check_")
+
+def keep_widget_state():
+    """
+    Streamlit forgets the value of a widget that is not rendered in a run.
+    Re-assigning the keys at the top of the script keeps them when only the
+    active page is rendered.
+    """
+    for key in list(st.session_state.keys()):
+        if key.startswith(PERSISTENT_WIDGET_PREFIXES):
+            st.session_state[key] = st.session_state[key]
@@ -1,132 +1,443 @@
 # sync_excel.py
-import pandas as pd
-import sys
+# Extracts the parameter tables from CMT_v1.1.xlsm in one streaming,
+# read-only pass over the workbook's XML parts: every part is read once with
+# iterparse, and the lists the app needs are taken from where Excel itself
+# takes them (the data-validation sources of the input cells, named ranges,
+# and the VLOOKUP tables behind the calculation formulas) instead of being
+# guessed from cell contents.
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree as ET
 
 def normalize_header(h):
     """Normalize strings to match our code (e.g. 'Crop System' -> 'crop')"""
     if not isinstance(h, str): return ""
-    h = header.lower().strip()
-    if "crop" in h or "system" in h: return "Crop System"
-    if "area" in h: return "Area (ha)"
-    if "agb" in h: return "AGB"
-    if "bgb" in h: return "BGB"
-    if "soil" in h: return "Soil"
-    return header
+    key = h.lower().strip()
+    if "crop" in key or "system" in key: return "Crop System"
+    if "area" in key: return "Area (ha)"
+    if "agb" in key or "above" in key: return "AGB"
+    if "bgb" in key or "below" in key: return "BGB"
+    if "soil" in key: return "Soil"
+    return h
+
+FALLBACK_PARAMETERS = {
+    "SOIL_TYPES": ["Spodic soils", "Volcanic soils", "Clay soils", "Sandy soils", "Loam soils", "Wetland/Organic soils"],
+    "CLIMATES": ["Tropical montane", "Tropical wet", "Tropical dry"],
+    "MOISTURES": ["Moist", "Wet", "Dry"],
+    "COUNTRIES": [],
+    "AGRI_CROP_DATA": {"Genetic Crop (Fallback)": (0,0,0)},
+    "LISTS": {},
+    "TABLES": {},
+}
+
+PLACEHOLDER = "Please select" # first entry of every dropdown source in the workbook
+
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_X14 = "{http://schemas.microsoft.com/office/spreadsheetml/2009/9/main}"
+_XM = "{http://schemas.microsoft.com/office/excel/2006/main}"
+_DOC_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# -----------------------------
+# 1. CELL REFERENCES
+# -----------------------------
+
+_CELL = re.compile(r"\$?([A-Z]{1,3})\$?(\d+)")
+_VLOOKUP = re.compile(r"VLOOKUP\(\s*\$?([A-Z]{1,3}\$?\d+)\s*,\s*((?:'[^']+'|[\w.]+)!\$?[A-Z]{1,3}\$?\d+:\$?[A-Z]{1,3}\$?\d+)\s*,\s*(\d+)", re.I)
+
+def column_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index
+
+def cell_position(ref):
+    """'AB16' or '$AB$16' -> (16, 28)."""
+    m = _CELL.fullmatch(ref)
+    return int(m.group(2)), column_index(m.group(1))
+
+def parse_range(text, sheet=None):
+    """
+    "Sheet4!$A$6:$A$12" / "'3.Agriculture'!D16" / "T17:W17" ->
+    (sheet, first row, first col, last row, last col); None for #REF! etc.
+    """
+    text = text.strip().lstrip("=")
+    if "!" in text:
+        sheet, _, text = text.rpartition("!")
+        sheet = sheet.strip("'").replace("''", "'")
+    first, _, last = text.partition(":")
+    try:
+        r1, c1 = cell_position(first)
+        r2, c2 = cell_position(last or first)
+    except AttributeError:
+        return None
+    return sheet, min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2)
+
+# -----------------------------
+# 2. STREAMING WORKBOOK READER
+# -----------------------------
+
+class WorkbookData:
+    """Everything the extraction needs, collected in one pass over the workbook."""
+    def __init__(self):
+        self.sheets = [] # (name, part, state) in workbook order
+        self.names = {} # defined name -> [(local sheet or None, formula)]
+        self.cells = {} # sheet -> {(row, col): value}
+        self.formulas = {} # sheet -> {(row, col): formula text}
+        self.validations = {} # sheet -> [(list source formula, sqref)]
+
+    def value(self, sheet, row, col):
+        return self.cells.get(sheet, {}).get((row, col))
+
+    def block(self, sheet, r1, c1, r2, c2):
+        cells = self.cells.get(sheet, {})
+        return [[cells.get((r, c)) for c in range(c1, c2 + 1)] for r in range(r1, r2 + 1)]
+
+def _iter_end(stream, tags):
+    """Yields (tag, element) for the given tags; parsed elements are dropped as we go."""
+    parents = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag in tags:
+            yield elem.tag, elem
+            if parents:
+                parents[-1].remove(elem)
+
+def _read_rels(zf, part):
+    """{relationship id: part path} of a package part ("" for the package itself)."""
+    folder, _, name = part.rpartition("/")
+    try:
+        stream = zf.open(posixpath.join(folder, "_rels", f"{name}.rels"))
+    except KeyError:
+        return {}
+    with stream:
+        rels = {}
+        for _, elem in _iter_end(stream, {_PKG_REL + "Relationship"}):
+            target = elem.get("Target")
+            path = target.lstrip("/") if target.startswith("/") else posixpath.join(folder, target)
+            rels[elem.get("Id")] = posixpath.normpath(path)
+        return rels
+
+def _read_shared_strings(zf, part):
+    if part is None:
+        return []
+    strings = []
+    with zf.open(part) as stream:
+        for _, si in _iter_end(stream, {_MAIN + "si"}):
+            # Plain text sits in <t>, rich text in <r><t> runs; phonetic hints (<rPh>) are not part of the value
+            text = []
+            for child in si:
+                if child.tag == _MAIN + "t":
+                    text.append(child.text or "")
+                elif child.tag == _MAIN + "r":
+                    text.append(child.findtext(_MAIN + "t") or "")
+            strings.append("".join(text))
+    return strings
+
+# Styled but empty cells (<c r="F16" s="318"/>) are most of a formatted sheet's XML and carry
+# nothing to extract; they are cut from each chunk before it reaches the XML parser.
+_EMPTY_CELL = re.compile(rb'<c r="[A-Z]{1,3}[0-9]+"(?: s="[0-9]+")?/>')
+
+class _SheetTarget:
+    """
+    XMLParser target for a worksheet part: called back per tag, so no element
+    tree is built. Keeps cell values (shared strings resolved), formula texts
+    and list validations (both <dataValidation> and the x14 extension form).
+    """
+    def __init__(self, shared):
+        self.shared = shared
+        self.cells, self.formulas, self.validations = {}, {}, []
+        self._text = None # list collecting character data, or None
+        self._cell = None # [ref, type, value, formula] of the open <c>
+        self._rule = None # [type, formula, sqref] of the open data validation
+
+    def start(self, tag, attrib):
+        if tag == _C:
+            self._cell = [attrib.get("r"), attrib.get("t"), None, None]
+        elif tag in _TEXT_TAGS:
+            self._text = []
+        elif tag in _RULE_TAGS:
+            self._rule = [attrib.get("type"), None, attrib.get("sqref")]
+
+    def data(self, text):
+        if self._text is not None:
+            self._text.append(text)
+
+    def end(self, tag):
+        if tag == _C:
+            self._end_cell(*self._cell)
+            self._cell = None
+        elif tag in _TEXT_TAGS:
+            text = "".join(self._text)
+            self._text = None
+            if tag == _V or tag == _T:
+                if self._cell is not None:
+                    self._cell[2] = text if tag == _V else (self._cell[2] or "") + text
+            elif tag == _F:
+                if self._cell is not None:
+                    self._cell[3] = text
+            elif self._rule is not None:
+                self._rule[1 if tag in (_FORMULA1, _XM_F) else 2] = text
+        elif tag in _RULE_TAGS:
+            kind, source, sqref = self._rule
+            if kind == "list" and source and sqref:
+                self.validations.append((source, sqref))
+            self._rule = None
+
+    def _end_cell(self, ref, kind, value, formula):
+        if value is None and not formula:
+            return
+        pos = cell_position(ref)
+        if formula:
+            self.formulas[pos] = formula
+        if value is None or kind == "e":
+            return
+        if kind == "s":
+            self.cells[pos] = self.shared[int(value)]
+        elif kind in ("str", "inlineStr"):
+            self.cells[pos] = value
+        elif kind == "b":
+            self.cells[pos] = value == "1"
+        else:
+            self.cells[pos] = float(value)
+
+    def close(self):
+        return self
+
+_C, _V, _F, _T = _MAIN + "c", _MAIN + "v", _MAIN + "f", _MAIN + "t"
+_FORMULA1, _XM_F, _XM_SQREF = _MAIN + "formula1", _XM + "f", _XM + "sqref"
+_TEXT_TAGS = {_V, _F, _T, _FORMULA1, _XM_F, _XM_SQREF}
+_RULE_TAGS = {_MAIN + "dataValidation", _X14 + "dataValidation"}
+
+def _read_sheet(zf, part, shared, chunk_size=1 << 20):
+    """Streams one worksheet part through _SheetTarget, chunk by chunk."""
+    parser = ET.XMLParser(target=_SheetTarget(shared))
+    tail = b""
+    with zf.open(part) as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            # Cut after the last '>' so the empty-cell pattern only ever sees whole tags
+            data = tail + chunk
+            cut = data.rfind(b">") + 1
+            data, tail = data[:cut], data[cut:]
+            parser.feed(_EMPTY_CELL.sub(b"", data))
+    parser.feed(tail)
+    return parser.close()
+
+def read_workbook(path):
+    """Reads the workbook's sheets, names, cell values, formulas and list validations in one pass."""
+    data = WorkbookData()
+    with zipfile.ZipFile(path) as zf:
+        book = next((t for t in _read_rels(zf, "").values() if t.endswith("workbook.xml")), "xl/workbook.xml")
+        rels = _read_rels(zf, book)
+
+        local_ids = []
+        with zf.open(book) as stream:
+            for tag, elem in _iter_end(stream, {_MAIN + "sheet", _MAIN + "definedName"}):
+                if tag == _MAIN + "sheet":
+                    part = rels.get(elem.get(_DOC_REL + "id"))
+                    data.sheets.append((elem.get("name"), part, elem.get("state", "visible")))
+                else:
+                    local_ids.append((elem.get("name"), elem.get("localSheetId"), elem.text or ""))
+        for name, local_id, formula in local_ids:
+            local = data.sheets[int(local_id)][0] if local_id is not None else None
+            data.names.setdefault(name, []).append((local, formula))
+
+        shared_part = next((t for t in rels.values() if t.endswith("sharedStrings.xml")), None)
+        shared = _read_shared_strings(zf, shared_part)
+        for name, part, _ in data.sheets:
+            if part and part.endswith(".xml") and "worksheets/" in part:
+                sheet = _read_sheet(zf, part, shared)
+                data.cells[name] = sheet.cells
+                data.formulas[name] = sheet.formulas
+                data.validations[name] = sheet.validations
+    return data
+
+# -----------------------------
+# 3. LISTS AND LOOKUP TABLES
+# -----------------------------
+
+def _clean(values):
+    """Dropdown entries of a source range: text, stripped, without blanks or the placeholder."""
+    out = []
+    for v in values:
+        if isinstance(v, float):
+            v = f"{v:g}"
+        if isinstance(v, str) and v.strip() and v.strip() != PLACEHOLDER:
+            out.append(v.strip())
+    return out
+
+def _resolve_name(data, name, sheet):
+    formulas = data.names.get(name, [])
+    local = [f for s, f in formulas if s == sheet]
+    shared = [f for s, f in formulas if s is None]
+    return (local or shared or [None])[0]
+
+def resolve_list(data, source, sheet):
+    """
+    The entries of a list validation's source: a range, a named range or a
+    literal "a,b,c" list. None when it is not static (INDIRECT, #REF!).
+    """
+    source = source.strip().lstrip("=")
+    if source.startswith('"'):
+        return _clean(source.strip('"').split(","))
+    if re.fullmatch(r"[A-Za-z_\\][\w.]*", source) and source in data.names:
+        source = _resolve_name(data, source, sheet) or ""
+    rng = parse_range(source, sheet)
+    if rng is None or rng[0] not in data.cells:
+        return None
+    s, r1, c1, r2, c2 = rng
+    return _clean(v for row in data.block(s, r1, c1, r2, c2) for v in row)
+
+def _label_left(data, sheet, row, col):
+    """Nearest text cell left of (row, col): the caption of an input cell."""
+    for c in range(col - 1, 0, -1):
+        v = data.value(sheet, row, c)
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return None
+
+def _label_above(data, sheet, row, col, depth=3):
+    """Nearest text above a source range that is not the placeholder: its column header."""
+    for r in range(row - 1, max(row - 1 - depth, 0), -1):
+        v = data.value(sheet, r, col)
+        if isinstance(v, str) and v.strip() and v.strip() != PLACEHOLDER:
+            return v.strip()
+    return None
+
+def validation_lists(data):
+    """
+    One entry per static list validation in the workbook: the sheet and first
+    cell it applies to, the caption next to that cell, the source range's own
+    header and the resolved entries.
+    """
+    found = []
+    for sheet, rules in data.validations.items():
+        for source, sqref in rules:
+            values = resolve_list(data, source, sheet)
+            if values is None:
+                continue
+            target = parse_range(sqref.split()[0], sheet)
+            rng = parse_range(_resolve_name(data, source.strip(), sheet) or source, sheet)
+            header = _label_above(data, rng[0], rng[1], rng[2]) if rng and rng[0] in data.cells else None
+            found.append({
+                "sheet": sheet, "cell": target[1:3], "sqref": sqref, "source": source,
+                "caption": _label_left(data, sheet, *target[1:3]), "header": header, "values": values,
+            })
+    return found
+
+def lookup_tables(data):
+    """
+    Every range used as a VLOOKUP table by a formula in the workbook:
+    {range: {"sheet", "used_by", "columns", "header", "rows"}}.
+    """
+    tables = {}
+    for sheet, formulas in data.formulas.items():
+        for formula in formulas.values():
+            for key, source, index in _VLOOKUP.findall(formula):
+                rng = parse_range(source, sheet)
+                if rng is None or rng[0] not in data.cells:
+                    continue
+                s, r1, c1, r2, c2 = rng
+                name = f"{s}!{source.rpartition('!')[2]}"
+                table = tables.get(name)
+                if table is None:
+                    table = tables[name] = {
+                        "sheet": s, "used_by": set(), "columns": set(),
+                        "header": [data.value(s, r1 - 1, c) for c in range(c1, c2 + 1)],
+                        "rows": [row for row in data.block(s, r1, c1, r2, c2) if row[0] is not None],
+                    }
+                table["used_by"].add(sheet)
+                table["columns"].add(int(index))
+    return tables
+
+# -----------------------------
+# 4. PARAMETER TABLES
+# -----------------------------
+
+_START_LISTS = {"SOIL_TYPES": "soil", "CLIMATES": "climate", "MOISTURES": "moist", "COUNTRIES": "countr"}
+
+def _number(value):
+    try: return float(value)
+    except (TypeError, ValueError): return 0.0
+
+def crop_table(tables, sheet):
+    """{crop: (AGB, BGB, Soil)} from the lookup table the sheet's formulas read crop defaults from."""
+    for table in tables.values():
+        if sheet not in table["used_by"]:
+            continue
+        header = [normalize_header(h) for h in table["header"]]
+        if "AGB" not in header or "BGB" not in header:
+            continue
+        cols = [header.index(h) if h in header else None for h in ("AGB", "BGB", "Soil")]
+        crops = {}
+        for row in table["rows"]:
+            crop = row[0]
+            if isinstance(crop, str) and "Select" not in crop:
+                crops[crop.strip()] = tuple(_number(row[c]) if c is not None else 0.0 for c in cols)
+        if crops:
+            return crops
+    return {}
+
+def extract_parameters(path="CMT_v1.1.xlsm"):
+    """
+    Parses the workbook and returns the public parameter tables
+    (SOIL_TYPES, CLIMATES, MOISTURES, COUNTRIES, AGRI_CROP_DATA) plus every
+    dropdown list (LISTS, by source header or range name) and every lookup
+    table (TABLES, by range) found in the workbook.
+    """
+    data = read_workbook(path)
+    sheet_names = [name for name, _, _ in data.sheets]
+    validations = validation_lists(data)
+    tables = lookup_tables(data)
+
+    # Start page: the lists validating the Country / Climate / Moisture / Soil cells
+    start_sheet = next((s for s in sheet_names if "Start" in s or "General" in s), None)
+    result = {}
+    for key, word in _START_LISTS.items():
+        values = next((v["values"] for v in validations
+                       if v["sheet"] == start_sheet and word in (v["caption"] or "").lower() and v["values"]), None)
+        result[key] = values or list(FALLBACK_PARAMETERS[key])
+
+    agri_sheet = next((s for s in sheet_names if "Agri" in s), None)
+    result["AGRI_CROP_DATA"] = crop_table(tables, agri_sheet) or dict(FALLBACK_PARAMETERS["AGRI_CROP_DATA"])
+
+    lists = {}
+    for v in validations:
+        label = v["header"] or v["source"]
+        if len(v["values"]) > len(lists.get(label, ())):
+            lists[label] = v["values"]
+    for name, formulas in data.names.items():
+        if name.startswith("_xl") or name in lists:
+            continue
+        values = resolve_list(data, name, formulas[0][0])
+        if values:
+            lists[name] = values
+    result["LISTS"] = lists
+    result["TABLES"] = {name: {"sheet": t["sheet"], "header": t["header"], "rows": t["rows"]}
+                        for name, t in tables.items()}
+    return result
 
 def sync_data():
+    """Re-parses CMT_v1.1.xlsm and refreshes the parameter cache used by imported_data."""
+    import param_loader
     print("... Reading CMT_v1.1.xlsm ...")
     try:
-        # Load the Excel File
-        xls = pd.ExcelFile("CMT_v1.1.xlsm")
-        sheet_names = xls.sheet_names
-        print(f"Found sheets: {sheet_names}")
-
-        # ----------------------------------------
-        # 1. EXTRACT START PAGE LISTS
-        # ----------------------------------------
-        # We look for a sheet with 'Start' or 'General' in the name
-        start_sheet = next((s for s in sheet_names if "Start" in s or "General" in s), None)
-        
-        soil_types = []
-        climates = []
-        moistures = []
-        
-        if start_sheet:
-            print(f"Reading Start Page: {start_sheet}")
-            df_start = pd.read_excel(xls, sheet_name=start_sheet)
-            
-            # Heuristic: Look for columns that might contain these lists
-            # We convert the whole sheet to a list of values to find keywords
-            for col in df_start.columns:
-                unique_vals = df_start[col].dropna().astype(str).unique()
-                
-                # Check for Soil list
-                if any("Spodic" in v or "Sandy" in v for v in unique_vals):
-                    soil_types = [v for v in unique_vals if len(v) < 50] # Filter out long text
-                
-                # Check for Climate list
-                if any("Tropical" in v or "Montane" in v for v in unique_vals):
-                    climates = [v for v in unique_vals if len(v) < 50]
-
-                # Check for Moisture list
-                if any("Wet" in v or "Moist" in v for v in unique_vals):
-                    moistures = [v for v in unique_vals if len(v) < 50]
-
-        # Fallbacks if extraction fails
-        if not soil_types: soil_types = ["Spodic soils", "Volcanic soils", "Clay soils", "Sandy soils", "Loam soils", "Wetland/Organic soils"]
-        if not climates: climates = ["Tropical montane", "Tropical wet", "Tropical dry"]
-        if not moistures: moistures = ["Moist", "Wet", "Dry"]
-
-        # ----------------------------------------
-        # 2. EXTRACT AGRICULTURE PARAMETERS
-        # ----------------------------------------
-        # Look for sheet with 'Agri'
-        agri_sheet = next((s for s in sheet_names if "Agri" in s), None)
-        
-        agri_data = {}
-        
-        if agri_sheet:
-            print(f"Reading Agriculture Page: {agri_sheet}")
-            # Read first 50 rows to find the header
-            df_raw = pd.read_excel(xls, sheet_name=agri_sheet, header=None, nrows=50)
-            
-            # Find the row that contains "Crop" and "AGB"
-            header_row_idx = None
-            for idx, row in df_raw.iterrows():
-                row_str = row.astype(str).str.lower().values
-                if any("crop" in x for x in row_str) and any("agb" in x for x in row_str):
-                    header_row_idx = idx
-                    break
-            
-            if header_row_idx is not None:
-                # Reload with correct header
-                df_agri = pd.read_excel(xls, sheet_name=agri_sheet, header=header_row_idx)
-                
-                # Clean column names
-                df_agri.columns = [normalize_header(c) for c in df_agri.columns]
-                
-                # Extract valid rows
-                if "Crop System" in df_agri.columns and "AGB" in df_agri.columns:
-                    for _, row in df_agri.iterrows():
-                        crop = row["Crop System"]
-                        if pd.notna(crop) and isinstance(crop, str) and "Select" not in crop:
-                            # Extract defaults (handle non-numeric gracefully)
-                            try: agb = float(row["AGB"])
-                            except: agb = 0.0
-                            try: bgb = float(row["BGB"])
-                            except: bgb = 0.0
-                            try: soil = float(row["Soil"])
-                            except: soil = 0.0
-                            
-                            agri_data[crop] = (agb, bgb, soil)
-            else:
-                print("Could not find Crop/AGB table headers.")
-
-        # If extraction failed, add at least one default
-        if not agri_data:
-            agri_data = {"Genetic Crop (Fallback)": (0,0,0)}
-
-        # ----------------------------------------
-        # 3. WRITE TO PYTHON FILE
-        # ----------------------------------------
-        with open("imported_data.py", "w", encoding="utf-8") as f:
-            f.write("# This file is auto-generated by sync_excel.py\n\n")
-            
-            f.write(f"SOIL_TYPES = {soil_types}\n")
-            f.write(f"CLIMATES = {climates}\n")
-            f.write(f"MOISTURES = {moistures}\n\n")
-            
-            f.write("# Format: {Crop Name: (AGB, BGB, Soil)}\n")
-            f.write("AGRI_CROP_DATA = {\n")
-            for crop, values in agri_data.items():
-                f.write(f"    '{crop}': {values},\n")
-            f.write("}\n")
-
-        print("SUCCESS! Created 'imported_data.py'.")
+        data = param_loader.load_parameters(force=True)
+        print(f"Countries: {data['COUNTRIES']}")
+        print(f"Soil types: {data['SOIL_TYPES']}")
+        print(f"Climates: {data['CLIMATES']}")
+        print(f"Moistures: {data['MOISTURES']}")
+        print(f"Crops: {list(data['AGRI_CROP_DATA'])}")
+        print(f"Lists: {len(data['LISTS'])}, lookup tables: {len(data['TABLES'])}")
+        print(f"SUCCESS! Cached parameters in '{param_loader.cache_path()}'.")
 
     except Exception as e:
         print(f"Error: {e}")
         print("Please ensure 'CMT_v1.1.xlsm' is in the same folder.")
 
 if __name__ == "__main__":
-    sync_data()
\ No newline at end of file
+    sync_data()
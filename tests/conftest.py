@@ -0,0 +1,6 @@
+# tests/conftest.py
+# The modules are flat files at the repo root; make them importable however pytest is started.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
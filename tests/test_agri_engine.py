@@ -0,0 +1,129 @@
+# tests/test_agri_engine.py
+# compute_section_ghg against the row-by-row reference (agri_calc.compute_row_ghg).
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import agri_engine
+from agri_calc import SECTION_COLUMNS, compute_row_ghg, safe_float, safe_get
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+SOIL_DIVISOR = 20
+
+@pytest.fixture(scope="module")
+def params():
+    return agri_engine.get_region_params(COUNTRY)
+
+def reference(df, params, soil_divisor=SOIL_DIVISOR):
+    """The loop process_section ran before the engine: (row totals by index, details, section total)."""
+    totals, details, total = {}, {}, 0
+    df = df.reindex(columns=SECTION_COLUMNS)
+    columns = {col: df[col].to_numpy(dtype=object) for col in SECTION_COLUMNS}
+    for i, idx in enumerate(df.index):
+        # Cells as stored (iterrows would turn None into NaN in rows that also hold a NaN)
+        row = {col: values[i] for col, values in columns.items()}
+        # An empty crop cell is None or NaN (categorical, str and CSV-read columns); process_section's bool(NaN) counted the latter
+        crop = safe_get(row["Crop System"])
+        if crop and not (isinstance(crop, float) and math.isnan(crop)):
+            val, used = compute_row_ghg(row, params, soil_divisor)
+            totals[idx], details[idx] = val, {**used, "area": safe_float(row["Area (ha)"])}
+            total += val
+    return totals, details, total
+
+def same(a, b):
+    return (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b)) or a == b
+
+def assert_parity(df, params, soil_divisor=SOIL_DIVISOR):
+    totals, details, total = reference(df, params, soil_divisor)
+    results = agri_engine.compute_section_ghg(df, params, soil_divisor)
+    assert list(results.index) == list(totals)
+    for idx, row in results.iterrows():
+        assert same(float(row["total"]), float(totals[idx])), idx
+        for col in ("agb_used", "bgb_used", "soil_used", "tillage_factor", "input_factor", "area"):
+            assert same(float(row[col]), float(details[idx][col])), (idx, col)
+    assert same(float(agri_engine.section_total(results)), float(total))
+
+def _labels(params):
+    factors = params["removal_factors"]
+    return (next(iter(params["agb_bgb_soil"])), next(iter(factors["tillage"])),
+            next(iter(factors["input"])), next(iter(factors["residue"])))
+
+def _row(params):
+    crop, tillage, inputs, residue = _labels(params)
+    return {"Crop System": crop, "Area (ha)": 12.5, "Tillage": tillage, "Inputs": inputs, "Residue": residue}
+
+# Each case: a few rows around one kind of dirty cell
+CASES = {
+    "empty-crop": [{"Crop System": None}, {"Crop System": ""}, {"Crop System": np.nan}],
+    "empty-area": [{"Area (ha)": None}, {"Area (ha)": np.nan}, {"Area (ha)": ""}],
+    "empty-options": [{"Tillage": None, "Inputs": np.nan, "Residue": ""}],
+    "empty-locals": [{"Local AGB": None, "Local BGB": np.nan, "Local Soil": ""}],
+    "list-crop": [{"Crop System": "__crop_list__"}, {"Crop System": []}],
+    "list-numbers": [{"Area (ha)": ["7.25"], "Local AGB": [3.5], "Local Soil": []}],
+    "list-options": [{"Tillage": "__tillage_list__", "Inputs": [], "Residue": [None]}],
+    "zero-overrides": [{"Local AGB": 0, "Local BGB": 0.0, "Local Soil": "0",
+                        "Local Tillage Factor": 0, "Local Input Factor": 0.0, "Local Residue Factor": "0"}],
+    "negative-overrides": [{"Local AGB": -4.0, "Local Tillage Factor": -1}],
+    "positive-overrides": [{"Local AGB": 55.5, "Local BGB": "11", "Local Soil": 80,
+                            "Local Tillage Factor": 1.1, "Local Input Factor": "0.9", "Local Residue Factor": 1.5}],
+    "text-numbers": [{"Area (ha)": "abc", "Local AGB": "n/a"}, {"Area (ha)": " 42 "}],
+    "unknown-labels": [{"Crop System": "Moon wheat", "Tillage": "Laser tillage"}],
+    "rounding-ties": [{"Area (ha)": 0.005}, {"Area (ha)": 1.125}, {"Area (ha)": 2.675}],
+}
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_edge_cases(params, case):
+    crop, tillage, _, _ = _labels(params)
+    rows = []
+    for cells in CASES[case]:
+        cells = {k: [crop] if v == "__crop_list__" else [tillage] if v == "__tillage_list__" else v
+                 for k, v in cells.items()}
+        rows.append({**_row(params), **cells})
+    rows.append(_row(params)) # a clean row next to the dirty ones
+    df = pd.DataFrame(rows, columns=SECTION_COLUMNS, dtype=object)
+    assert_parity(df, params)
+
+def test_missing_local_columns(params):
+    df = pd.DataFrame([_row(params)])[["Crop System", "Area (ha)", "Tillage", "Inputs", "Residue"]]
+    assert_parity(df, params)
+
+def test_empty_section(params):
+    results = agri_engine.compute_section_ghg(pd.DataFrame(columns=SECTION_COLUMNS), params, SOIL_DIVISOR)
+    assert len(results) == 0 and agri_engine.section_total(results) == 0
+
+@pytest.mark.parametrize("soil_divisor", [20, 10, 7])
+def test_typed_editor_frame(params, soil_divisor):
+    # Categorical option columns and float64 numbers, as the data editor holds them
+    assert_parity(synthetic.section_frame(500, COUNTRY, seed=soil_divisor), params, soil_divisor)
+
+def test_dirty_fuzz(params):
+    """Random mixes of every cell kind above, with the index not starting at 0."""
+    rng = np.random.default_rng(42)
+    crop, tillage, inputs, residue = _labels(params)
+    n = 2_000
+
+    def pick(choices):
+        return [choices[i] for i in rng.integers(0, len(choices), n)]
+
+    numbers = [None, np.nan, "", 0, 0.0, "0", -3.0, 1.5, "2.5", "abc", [4.0], [], ["7"], 12.345, 250.0]
+    df = pd.DataFrame({
+        "Crop System": pick([crop, [crop], None, "", [], "Moon wheat", "Please select", np.nan]),
+        "Area (ha)": pick(numbers),
+        "Tillage": pick([tillage, [tillage], None, "", "Laser tillage"]),
+        "Inputs": pick([inputs, [inputs], None, np.nan]),
+        "Residue": pick([residue, [residue], None, []]),
+        **{col: pick(numbers) for col in SECTION_COLUMNS[5:]},
+    }, columns=SECTION_COLUMNS, index=np.arange(n) * 3 + 100, dtype=object)
+    assert_parity(df, params)
+
+@pytest.mark.parametrize("dtype", ["category", "str", object])
+def test_blank_crop_is_not_calculated(params, dtype):
+    # The data editor's option columns are categoricals: a blank crop is code -1, not a label
+    df = pd.DataFrame([_row(params), {**_row(params), "Crop System": None}, _row(params)], columns=SECTION_COLUMNS)
+    df["Crop System"] = df["Crop System"].astype(dtype) if dtype != object else df["Crop System"].where(df["Crop System"].notna(), np.nan)
+    results = agri_engine.compute_section_ghg(df, params, SOIL_DIVISOR)
+    assert list(results.index) == [0, 2]
+    assert agri_engine.section_total(results) == pytest.approx(2 * float(results["total"].iloc[0]))
@@ -0,0 +1,138 @@
+# tests/test_agri_incremental.py
+# SectionTracker against a full recompute (validated, as in batch mode) of the frame the editor shows.
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import agri_engine
+import validation
+from agri_calc import SECTION_COLUMNS
+from agri_incremental import SectionTracker, apply_editor_state
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+NUMBER_COLUMNS = [c for c in SECTION_COLUMNS if c == "Area (ha)" or c.startswith("Local")]
+LABEL_COLUMNS = [c for c in SECTION_COLUMNS if c not in NUMBER_COLUMNS]
+
+@pytest.fixture(scope="module")
+def params():
+    return agri_engine.get_region_params(COUNTRY)
+
+def full(base, state, params):
+    clean, _ = validation.validate_section(apply_editor_state(base, state), params)
+    return agri_engine.compute_section_ghg(clean, params, 20)
+
+def assert_same(tracker, base, state, params):
+    expected = full(base, state, params)
+    total = agri_engine.sequential_sum(expected["total"].to_numpy(dtype=np.float64))
+    if math.isnan(total):
+        assert math.isnan(tracker.total)
+    else:
+        assert tracker.total == pytest.approx(total, abs=0.01)
+    got = tracker.results()
+    assert len(got) == len(expected)
+    np.testing.assert_allclose(got["total"].to_numpy(dtype=np.float64),
+                               expected["total"].to_numpy(dtype=np.float64), equal_nan=True)
+
+def _cell(rng, base, col):
+    """A value the data editor can put in `col`: a label, a number or a cleared cell."""
+    if rng.random() < 0.3:
+        return None
+    if col in NUMBER_COLUMNS:
+        return round(rng.uniform(0.0, 300.0), 1)
+    labels = base[col].cat.categories
+    return labels[rng.randrange(len(labels))]
+
+def _step(rng, base, state):
+    """One editor interaction; Streamlit keeps the deltas cumulative."""
+    edited, added, deleted = state["edited_rows"], state["added_rows"], state["deleted_rows"]
+    col = rng.choice(SECTION_COLUMNS)
+    op = rng.random()
+    if op < 0.45:
+        edited.setdefault(str(rng.randrange(len(base))), {})[col] = _cell(rng, base, col)
+    elif op < 0.55 and edited:
+        edited.pop(rng.choice(list(edited)))
+    elif op < 0.7:
+        added.append({c: _cell(rng, base, c) for c in rng.sample(SECTION_COLUMNS, 3)})
+    elif op < 0.85 and added:
+        added[rng.randrange(len(added))][col] = _cell(rng, base, col)
+    elif op < 0.9 and added:
+        added.pop()
+    else:
+        pos = rng.randrange(len(base))
+        if pos in deleted:
+            deleted.remove(pos)
+        else:
+            deleted.append(pos)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_replayed_edits_match_full_recompute(params, seed):
+    base = synthetic.section_frame(40, COUNTRY, seed=seed)
+    tracker = SectionTracker(base, params, 20)
+    rng = random.Random(seed)
+    state = {"edited_rows": {}, "added_rows": [], "deleted_rows": []}
+    for _ in range(100):
+        _step(rng, base, state)
+        # The widget hands over a copy each rerun
+        snapshot = {"edited_rows": {k: dict(v) for k, v in state["edited_rows"].items()},
+                    "added_rows": [dict(r) for r in state["added_rows"]],
+                    "deleted_rows": list(state["deleted_rows"])}
+        tracker.apply(snapshot)
+        assert_same(tracker, base, snapshot, params)
+
+@pytest.mark.parametrize("state", [
+    {"edited_rows": {"3": {"Area (ha)": None}}},
+    {"edited_rows": {"3": {"Local AGB": None, "Local Soil": 12.5}}},
+    {"added_rows": [{"Crop System": "__first__", "Area (ha)": None}]},
+    {"added_rows": [{"Crop System": "__first__", "Area (ha)": 10.0, "Local BGB": None}]},
+], ids=["cleared-area", "cleared-local", "added-no-area", "added-cleared-local"])
+def test_cleared_number_cells(params, state):
+    base = synthetic.section_frame(20, COUNTRY, seed=1)
+    crop = base["Crop System"].dropna().iloc[0]
+    for row in state.get("added_rows", []):
+        row["Crop System"] = crop
+    tracker = SectionTracker(base, params, 20).apply(state)
+    assert_same(tracker, base, state, params)
+
+def test_fold_keeps_results(params):
+    base = synthetic.section_frame(20, COUNTRY, seed=4)
+    state = {"edited_rows": {"2": {"Area (ha)": None}, "5": {"Area (ha)": 7.5}}, "deleted_rows": [0],
+             "added_rows": [{"Crop System": base["Crop System"].dropna().iloc[0], "Area (ha)": 3.0}]}
+    tracker = SectionTracker(base, params, 20)
+    new_base = tracker.fold(state)
+    pd.testing.assert_frame_equal(new_base, apply_editor_state(base, state))
+    assert_same(tracker, new_base, None, params)
+
+def test_issues_follow_the_edits(params):
+    base = synthetic.section_frame(10, COUNTRY, seed=5)
+    base["Area (ha)"] = base["Area (ha)"].astype(object)
+    base.loc[1, "Area (ha)"] = "abc"
+    base.loc[4, "Area (ha)"] = float("inf")
+    tracker = SectionTracker(base, params, 20)
+    issues = tracker.issues()
+    assert list(issues.columns) == validation.ISSUE_COLUMNS
+    area = issues[issues["column"] == "Area (ha)"]
+    assert list(zip(area["row"], area["issue"])) == [(1, validation.NOT_A_NUMBER), (4, validation.NOT_FINITE)]
+    assert np.isfinite(tracker.total) # the infinite area counts as 0, as in batch mode
+
+    crop = base["Crop System"].dropna().iloc[0]
+    tracker.apply({"edited_rows": {"1": {"Area (ha)": 5.0}, "6": {"Area (ha)": -2.0}}, "deleted_rows": [4],
+                   "added_rows": [{"Crop System": crop, "Area (ha)": None}]})
+    issues = tracker.issues()
+    area = issues[issues["column"] == "Area (ha)"]
+    assert list(zip(area["row"], area["issue"])) == [(6, validation.NEGATIVE_AREA), (10, validation.NO_AREA)]
+    assert list(issues["row"]) == sorted(issues["row"])
+
+def test_edit_dict_changed_in_place(params):
+    # Streamlit keeps one dict per edited row and updates it as more cells change
+    base = synthetic.section_frame(10, COUNTRY, seed=6)
+    row = {"Area (ha)": 4.0}
+    state = {"edited_rows": {"3": row}}
+    tracker = SectionTracker(base, params, 20).apply(state)
+    row["Area (ha)"] = 9.0
+    tracker.apply(state)
+    assert tracker.last_recomputed == 1
+    assert_same(tracker, base, state, params)
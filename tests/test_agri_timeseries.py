@@ -0,0 +1,68 @@
+# tests/test_agri_timeseries.py
+# Yearly reductions against the static section totals.
+import numpy as np
+import pytest
+
+import agri_engine
+import agri_timeseries
+from agri_timeseries import Timeline
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+SOIL_DIVISOR = 20
+
+@pytest.fixture(scope="module")
+def params():
+    return agri_engine.get_region_params(COUNTRY)
+
+@pytest.fixture(scope="module")
+def sections(params):
+    return {key: agri_engine.compute_section_ghg(df, params, SOIL_DIVISOR)
+            for key, df in synthetic.project_sections(3_000, COUNTRY).items()}
+
+def _terms(sections, params):
+    return {key: agri_timeseries.section_terms(results, SOIL_DIVISOR, params["residue_multiplier"])
+            for key, results in sections.items()}
+
+def test_full_adoption_year_is_the_section_total(sections, params):
+    # No implementation phase: year 1 has all the area in place and all of it changing soil
+    yearly = agri_timeseries.yearly_totals(_terms(sections, params), Timeline(0, 5, SOIL_DIVISOR))
+    for key, label in agri_engine.SECTION_NAMES.items():
+        # Row totals are rounded to 2 dp, the yearly terms are not
+        assert yearly[label].iloc[0] == pytest.approx(agri_engine.section_total(sections[key]), abs=0.005 * len(sections[key]))
+    np.testing.assert_allclose(yearly["Total"], yearly[list(agri_engine.SECTION_NAMES.values())].sum(axis=1))
+    np.testing.assert_allclose(yearly["Cumulative"], np.cumsum(yearly["Total"]))
+
+def test_soil_counts_soil_divisor_years_per_hectare(sections, params):
+    # Long enough for every tranche's soil period to end: S is counted soil_divisor times, B - R every year adopted
+    timeline = Timeline(4, 30, SOIL_DIVISOR)
+    terms = _terms(sections, params)
+    yearly = agri_timeseries.yearly_totals(terms, timeline)
+    area_sum = sum(t[0] for t in terms.values())
+    soil_sum = sum(t[1] for t in terms.values())
+    expected = area_sum * timeline.adopted.sum() + soil_sum * SOIL_DIVISOR
+    assert yearly["Cumulative"].iloc[-1] == pytest.approx(expected)
+
+@pytest.mark.parametrize("impl, cap, soil_divisor", [(0, 3, 20), (4, 10, 5), (3, 0, 2), (0, 0, 20)])
+def test_timeline_profiles(impl, cap, soil_divisor):
+    timeline = Timeline(impl, cap, soil_divisor)
+    assert len(timeline) == impl + cap
+    assert list(timeline.phase) == ["Implementation"] * impl + ["Capitalization"] * cap
+    if impl:
+        np.testing.assert_allclose(timeline.adopted[:impl], np.arange(1, impl + 1) / impl)
+    assert np.all(timeline.adopted[impl:] == 1.0)
+    assert np.all((timeline.soil_active >= 0) & (timeline.soil_active <= timeline.adopted))
+    if len(timeline) >= max(impl, 1) + soil_divisor:
+        # Every adopted share changes soil for exactly soil_divisor years
+        assert timeline.soil_active.sum() == pytest.approx(soil_divisor)
+
+@pytest.mark.parametrize("dtype, rtol", [(np.float64, 1e-9), (np.float32, 1e-4)])
+def test_matrix_sums_to_yearly_totals(sections, params, dtype, rtol):
+    timeline = Timeline(3, 8, SOIL_DIVISOR)
+    yearly = agri_timeseries.yearly_totals(_terms(sections, params), timeline)
+    for key, label in agri_engine.SECTION_NAMES.items():
+        matrix = agri_timeseries.yearly_matrix(sections[key], timeline, params["residue_multiplier"], dtype=dtype, chunk_cells=1_000)
+        assert matrix.shape == (len(sections[key]), len(timeline)) and matrix.dtype == dtype
+        np.testing.assert_allclose(matrix.sum(axis=0, dtype=np.float64), yearly[label], rtol=rtol)
+        running = agri_timeseries.yearly_matrix(sections[key], timeline, params["residue_multiplier"], dtype=dtype, cumulative=True)
+        np.testing.assert_allclose(running[:, -1], matrix.sum(axis=1, dtype=np.float64), rtol=rtol, atol=1e-3)
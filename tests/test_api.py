@@ -0,0 +1,144 @@
+# tests/test_api.py
+# The HTTP/JSON service: project parsing and answers to non-finite input.
+import asyncio
+import json
+
+import pytest
+
+import api
+
+ROW = {"Crop System": "Oil palm", "Area (ha)": 10.0, "Tillage": "Full tillage"}
+
+@pytest.mark.parametrize("row", [
+    {**ROW, "Area (ha)": "inf"},
+    {**ROW, "Area (ha)": float("inf")},  # what json.loads makes of 1e999
+    {**ROW, "Local AGB": "-Infinity"},
+    {**ROW, "Area (ha)": [float("-inf")]},
+], ids=["text", "number", "local-text", "list-cell"])
+def test_parse_project_rejects_infinite_cells(row):
+    with pytest.raises(ValueError, match="not a finite number"):
+        api.parse_project({"df_3_2": [ROW, row]})
+
+@pytest.mark.parametrize("soil_divisor", [float("inf"), 0, -1, "20", True])
+def test_parse_project_rejects_bad_soil_divisor(soil_divisor):
+    with pytest.raises(ValueError, match="soil_divisor"):
+        api.parse_project({"soil_divisor": soil_divisor, "df_3_1": [ROW]})
+
+def test_parse_project_defaults_only_a_missing_soil_divisor():
+    assert api.parse_project({"df_3_1": [ROW]})["soil_divisor"] == api.batch.DEFAULT_SOIL_DIVISOR
+    assert api.parse_project({"soil_divisor": None, "df_3_1": [ROW]})["soil_divisor"] == api.batch.DEFAULT_SOIL_DIVISOR
+    assert api.parse_project({"soil_divisor": 0.5, "df_3_1": [ROW]})["soil_divisor"] == 0.5
+
+def test_parse_project_keeps_text_for_validation():
+    # Not a number at all: calculated as 0 and reported as an issue, not rejected
+    project = api.parse_project({"df_3_1": [{**ROW, "Area (ha)": "n/a"}]})
+    result = api.evaluate_batch([project])[0]
+    assert result["agri_3_1_total"] == 0
+    assert any(issue["column"] == "Area (ha)" for issue in result["issue_rows"])
+
+# -----------------------------
+# Over HTTP
+# -----------------------------
+
+async def _request(port, method, path, body=b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    if b"chunked" in head.lower():
+        chunks = b""
+        while True:
+            size, _, payload = payload.partition(b"\r\n")
+            size = int(size, 16)
+            if not size:
+                break
+            chunks, payload = chunks + payload[:size], payload[size + 2:]
+        return status, [json.loads(line) for line in chunks.splitlines()]
+    return status, json.loads(payload)
+
+def _serve(scenario):
+    async def main():
+        server, app = await api.start_server(port=0, max_wait=0)
+        try:
+            return await scenario(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await app.batcher.stop()
+    return asyncio.run(main())
+
+def test_calculate_answers_400_for_infinite_input():
+    async def scenario(port):
+        for body in (b'{"df_3_1": [{"Crop System": "Oil palm", "Area (ha)": 1e999}]}',
+                     b'{"soil_divisor": 1e999, "df_3_1": []}',
+                     b'{"df_3_1": [{"Crop System": "Oil palm", "Area (ha)": "inf"}]}'):
+            status, result = await _request(port, "POST", "/calculate", body)
+            assert status == 400 and result["error"].startswith("invalid project")
+        status, result = await _request(port, "POST", "/calculate", json.dumps({"df_3_1": [ROW]}).encode())
+        assert status == 200 and result["agri_3_1_total"] > 0
+    _serve(scenario)
+
+@pytest.mark.parametrize("soil_divisor", [0, -20])
+def test_calculate_answers_422_for_a_soil_divisor_not_above_0(soil_divisor):
+    async def scenario(port):
+        return await _request(port, "POST", "/calculate", json.dumps({"soil_divisor": soil_divisor, "df_3_1": [ROW]}).encode())
+    status, result = _serve(scenario)
+    assert status == 422 and result["error"] == f"soil_divisor must be a positive number, not {soil_divisor}"
+
+def test_bulk_keeps_lines_after_a_bad_one():
+    lines = [{"df_3_1": [ROW]}, {"df_3_1": [{**ROW, "Area (ha)": "inf"}]}, {"df_3_2": [ROW]}]
+    body = b"\n".join(json.dumps(line).encode() for line in lines[:1]) + b'\n{"df_3_1": [{"Area (ha)": 1e999}]}\n' + \
+        b"\n".join(json.dumps(line).encode() for line in lines[1:])
+
+    async def scenario(port):
+        return await _request(port, "POST", "/bulk", body)
+    status, results = _serve(scenario)
+    assert status == 200
+    assert [r["line"] for r in results] == [1, 2, 3, 4]
+    assert ["error" in r for r in results] == [False, True, True, False]
+    assert results[3]["agri_3_2_total"] == results[0]["agri_3_1_total"]
+
+@pytest.mark.parametrize("row", [
+    {**ROW, "Area (ha)": 1e308, "Local AGB": 1e308},
+    {**ROW, "Area (ha)": "1e308", "Local Soil": "1e308"},
+], ids=["numbers", "text"])
+@pytest.mark.filterwarnings("ignore:overflow encountered:RuntimeWarning")
+def test_overflowing_results_are_a_client_error(row):
+    # Finite input whose results overflow to inf: a 422 naming the section and row, not a 500
+    async def scenario(port):
+        body = json.dumps({"df_3_1": [ROW], "df_3_2": [ROW, ROW, row]}).encode()
+        return (await _request(port, "POST", "/calculate", body),
+                await _request(port, "POST", "/bulk", json.dumps({"df_3_1": [ROW]}).encode() + b"\n" + body))
+    (status, result), (bulk_status, results) = _serve(scenario)
+    assert status == 422 and result["error"] == "overflow: df_3_2 row 2: the result is not a finite number"
+    assert bulk_status == 200 and "error" not in results[0] and results[1]["error"] == result["error"]
+
+@pytest.mark.filterwarnings("ignore:overflow encountered:RuntimeWarning")
+@pytest.mark.parametrize("rows, error", [
+    ({"df_3_1": 30}, "df_3_1: the section total is not a finite number"),
+    ({"df_3_1": 15, "df_3_2": 15}, "the grand total is not a finite number"),
+], ids=["section", "grand"])
+def test_overflowing_totals(rows, error):
+    # Every row finite (about 8.8e306 tCO2e each), their sum not
+    project = api.parse_project({key: [{**ROW, "Area (ha)": 1e306}] * n for key, n in rows.items()})
+    assert api.evaluate_batch([project]) == [{"error": f"overflow: {error}"}]
+
+def test_unserializable_results_do_not_drop_the_connection(monkeypatch):
+    # Whatever slips through parse_project: /calculate answers 500, /bulk loses only that line
+    real = api.evaluate_batch
+    def evaluate_batch(projects):
+        return [{**r, "agri_grand_total": float("inf")} if p["info"].get("gi_project_name") == "bad" else r
+                for p, r in zip(projects, real(projects))]
+    monkeypatch.setattr(api, "evaluate_batch", evaluate_batch)
+    bad = json.dumps({"gi_project_name": "bad", "df_3_1": [ROW]}).encode()
+    good = json.dumps({"gi_project_name": "good", "df_3_1": [ROW]}).encode()
+
+    async def scenario(port):
+        return (await _request(port, "POST", "/calculate", bad),
+                await _request(port, "POST", "/bulk", b"\n".join([good, bad, good])))
+    (status, result), (bulk_status, results) = _serve(scenario)
+    assert status == 500 and "error" in result
+    assert bulk_status == 200
+    assert ["error" in r for r in results] == [False, True, False]
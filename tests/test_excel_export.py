@@ -0,0 +1,104 @@
+# tests/test_excel_export.py
+# The session report's totals against the Results page's, as readers that do not recalculate see them.
+import io
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+import agri_engine
+import excel_export
+import ingest
+import sectors
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+SOIL_DIVISOR = 20
+
+# openpyxl drops the template's data validation and conditional formatting extensions on read
+pytestmark = pytest.mark.filterwarnings("ignore:.*extension is not supported:UserWarning")
+
+@pytest.fixture(scope="module")
+def params():
+    return agri_engine.get_region_params(COUNTRY)
+
+def _state(sections):
+    return {"gi_project_name": "test", "gi_country": COUNTRY, "soil_divisor": SOIL_DIVISOR, **sections}
+
+def _read(data):
+    """(section total cells, Results L28) as cached in the workbook."""
+    book = openpyxl.load_workbook(io.BytesIO(data), data_only=True, keep_vba=False)
+    agri = book[excel_export.AGRI_SHEET]
+    totals = {key: agri[cell].value for key, (_, _, cell) in excel_export.AGRI_BLOCKS.items()}
+    return totals, book[excel_export.RESULTS_SHEET]["L28"].value
+
+def test_imports_count_in_the_totals(params, tmp_path):
+    sections = synthetic.project_sections(40, COUNTRY, seed=3)
+    state = _state(sections)
+    path = tmp_path / "import.csv"
+    synthetic.section_frame(500, COUNTRY, seed=4).to_csv(path, index=False)
+    report = state["agri_import_df_3_2"] = ingest.ingest_section(str(path), params, SOIL_DIVISOR)
+    assert report.total
+
+    # As the Agriculture page records them: the section total plus the import's
+    totals = {key: agri_engine.section_total(agri_engine.compute_section_ghg(df, params, SOIL_DIVISOR)) for key, df in sections.items()}
+    totals["df_3_2"] += report.total
+    state[sectors.TOTALS_KEY] = {"agriculture": totals}
+    page_total = sectors.grand_total(sectors.session_totals(state), state)
+
+    cells, grand_total = _read(excel_export.session_report(state))
+    assert cells == pytest.approx(totals)
+    assert grand_total == pytest.approx(page_total)
+
+def test_import_with_other_settings_is_left_out(params, tmp_path):
+    state = _state(synthetic.project_sections(10, COUNTRY, seed=5))
+    path = tmp_path / "import.csv"
+    synthetic.section_frame(50, COUNTRY, seed=6).to_csv(path, index=False)
+    state["agri_import_df_3_1"] = ingest.ingest_section(str(path), params, SOIL_DIVISOR + 1)
+    expected = agri_engine.section_total(agri_engine.compute_section_ghg(state["df_3_1"], params, SOIL_DIVISOR))
+    cells, _ = _read(excel_export.session_report(state))
+    assert cells["df_3_1"] == pytest.approx(expected)
+
+def test_non_finite_areas_export_finite_totals(params):
+    df = synthetic.section_frame(12, COUNTRY, seed=7, typed=False)
+    df["Area (ha)"] = df["Area (ha)"].astype(object)
+    df.loc[[1, 8], "Area (ha)"] = [float("nan"), float("inf")]  # one in the template's rows, one on the added sheet
+    df.loc[3, "Area (ha)"] = "abc"
+    state = _state({"df_3_1": df})
+    data = excel_export.session_report(state)
+
+    # The same cleaned rows as batch mode: the bad areas count as 0
+    clean = df.copy()
+    clean.loc[[1, 3, 8], "Area (ha)"] = 0.0
+    expected = agri_engine.section_total(agri_engine.compute_section_ghg(clean, params, SOIL_DIVISOR))
+    cells, grand_total = _read(data)
+    assert np.isfinite(expected) and cells["df_3_1"] == pytest.approx(expected)
+    assert grand_total == pytest.approx(expected)
+    results = pd.read_excel(io.BytesIO(data), sheet_name=excel_export.RESULTS_SHEET, header=None)
+    assert results.iloc[27, 11] == pytest.approx(expected) # L28
+
+def _download_page():
+    # The Results page's download button data, built from the live session state
+    import streamlit as st
+    import excel_export
+    from benchmarks import synthetic
+
+    st.session_state.update(gi_project_name="test", gi_country="Cameroon", soil_divisor=20,
+                            **synthetic.project_sections(30, "Cameroon", seed=8))
+    st.session_state["report_data"] = excel_export.session_report_data(st.session_state)
+
+def test_download_data_outside_the_script_thread(params):
+    from concurrent.futures import ThreadPoolExecutor
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(_download_page).run()
+    assert not at.exception
+    data = at.session_state["report_data"]
+    # Streamlit calls it on a thread without the session's context
+    with ThreadPoolExecutor(1) as pool:
+        cells, grand_total = _read(pool.submit(data).result())
+    sections = synthetic.project_sections(30, COUNTRY, seed=8)
+    totals = {key: agri_engine.section_total(agri_engine.compute_section_ghg(df, params, SOIL_DIVISOR)) for key, df in sections.items()}
+    assert cells == pytest.approx(totals)
+    assert grand_total == pytest.approx(sum(totals.values())) and grand_total
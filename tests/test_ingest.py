@@ -0,0 +1,37 @@
+# tests/test_ingest.py
+# Streaming import: totals against the whole file at once, and what it leaves behind.
+import tracemalloc
+
+import pytest
+
+import agri_engine
+import ingest
+import validation
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+
+@pytest.fixture(scope="module")
+def params():
+    return agri_engine.get_region_params(COUNTRY)
+
+def test_import_leaves_tracing_alone(params, tmp_path):
+    # tracemalloc is process-wide: another session's measurement must survive an import
+    df = synthetic.section_frame(2_500, COUNTRY, seed=2)
+    path = tmp_path / "rows.csv"
+    df.to_csv(path, index=False)
+    tracemalloc.start()
+    try:
+        block = bytearray(50_000_000)
+        del block
+        report = ingest.ingest_section(str(path), params, 20, chunk_rows=1_000)
+        assert tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[1] >= 50_000_000
+    finally:
+        tracemalloc.stop()
+    assert report.peak_memory_mb > 0
+    assert report.rows == len(df)
+
+    clean, _ = validation.validate_section(df, params)
+    expected = agri_engine.section_total(agri_engine.compute_section_ghg(clean, params, 20))
+    assert report.total == pytest.approx(expected)
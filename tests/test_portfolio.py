@@ -0,0 +1,74 @@
+# tests/test_portfolio.py
+# The region-sharded portfolio evaluator against scoring the files one by one (batch.py).
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch
+import portfolio
+from benchmarks import synthetic
+
+# Three regions, plus a country that falls back to Central Africa
+PROJECTS = [("Cameroon", 20), ("Indonesia", 20), ("Brazil", 10), ("Gabon", 20), ("Cameroon", 10), ("Indonesia", 20)]
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    root = tmp_path_factory.mktemp("portfolio")
+    paths = []
+    for i, (country, soil_divisor) in enumerate(PROJECTS):
+        region = "Central Africa" if country in ("Cameroon", "Gabon") else country
+        sections = synthetic.project_sections(300 + 50 * i, region if region != "Central Africa" else country, seed=i, typed=False)
+        if i % 2:
+            # A table file: one frame with a Section column and the general info repeated
+            table = pd.concat([df.assign(Section=key) for key, df in sections.items()], ignore_index=True)
+            table["gi_project_name"], table["gi_country"], table["soil_divisor"] = f"p{i}", country, soil_divisor
+            table["Area (ha)"] = table["Area (ha)"].astype(object)
+            table.loc[3, "Area (ha)"] = "abc" # an issue, counted as 0
+            path = root / f"p{i}.csv"
+            table.to_csv(path, index=False)
+        else:
+            data = {"gi_project_name": f"p{i}", "gi_country": country, "soil_divisor": soil_divisor}
+            data.update({key: df.astype(object).where(df.notna(), None).to_dict("records") for key, df in sections.items()})
+            path = root / f"p{i}.json"
+            path.write_text(json.dumps(data))
+        paths.append(str(path))
+    broken = root / "broken.json"
+    broken.write_text("{not json")
+    zero = root / "zero.json" # an explicit 0 is an error, not the default period
+    zero.write_text(json.dumps({"gi_country": "Cameroon", "soil_divisor": 0, "df_3_1": []}))
+    return sorted(paths + [str(broken), str(zero)])
+
+@pytest.mark.parametrize("workers, rows_per_task", [(1, portfolio.ROWS_PER_TASK), (1, 500), (2, 700)])
+def test_matches_batch(files, workers, rows_per_task):
+    project_frame, region_frame, stats = portfolio.evaluate_portfolio(portfolio.load_portfolio(files), workers, rows_per_task)
+    assert list(project_frame["file"]) == files
+    for line, path in zip(project_frame.to_dict("records"), files):
+        expected, _, _ = batch.run_project(path)
+        if expected["error"]:
+            assert line["error"] == expected["error"]
+            continue
+        assert pd.isna(line["error"])
+        for col in ("project", "country", "region", "soil_divisor", "rows", "issues"):
+            assert line[col] == expected[col], (path, col)
+        for col in ("agri_3_1_total", "agri_3_2_total", "agri_3_3_total", "agri_grand_total"):
+            assert line[col] == expected[col], (path, col) # summed in the same order, so exactly equal
+
+    assert sorted(region_frame["region"]) == ["Brazil", "Central Africa", "Indonesia"]
+    assert region_frame["projects"].sum() == len(PROJECTS)
+    assert region_frame["rows"].sum() == project_frame["rows"].sum()
+    np.testing.assert_allclose(region_frame["agri_grand_total"].sum(), project_frame["agri_grand_total"].sum())
+    assert stats["tasks"] >= len(region_frame)
+
+def test_tasks_hold_whole_projects(files):
+    projects = portfolio.load_portfolio(files)
+    seen = []
+    for region, soil_divisor, rows in portfolio.region_tasks(projects, rows_per_task=400):
+        members = rows["project"].unique()
+        for project in members:
+            summary, _ = projects[project]
+            assert (summary["region"], summary["soil_divisor"]) == (region, soil_divisor)
+        seen.extend(members)
+    # Every readable project lands in exactly one task
+    assert sorted(seen) == [i for i, (_, sections) in enumerate(projects) if sections is not None]
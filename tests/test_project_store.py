@@ -0,0 +1,33 @@
+# tests/test_project_store.py
+# Saving and loading projects, including saves of one name from concurrent sessions.
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import project_store
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+
+def _state(seed, n=200):
+    return {"gi_project_name": f"seed {seed}", "gi_country": COUNTRY, "soil_divisor": 20,
+            **synthetic.project_sections(n, COUNTRY, seed=seed)}
+
+def test_round_trip(tmp_path):
+    state = _state(1)
+    project_store.save_project("My project", state, root=str(tmp_path))
+    project = project_store.load_project("My project", root=str(tmp_path))
+    assert project.values()["gi_project_name"] == "seed 1"
+    for key in ("df_3_1", "df_3_2", "df_3_3"):
+        pd.testing.assert_frame_equal(project.section(key), state[key].reset_index(drop=True), check_categorical=False)
+
+def test_concurrent_saves_of_one_name(tmp_path):
+    # Streamlit sessions share the server's PID; each save must still be whole
+    states = [_state(seed) for seed in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda state: project_store.save_project("Shared", state, root=str(tmp_path)), states))
+    assert [p.name for p in tmp_path.iterdir()] == ["Shared"] # no .tmp / .old left behind
+    project = project_store.load_project("Shared", root=str(tmp_path))
+    saved = next(state for state in states if state["gi_project_name"] == project.values()["gi_project_name"])
+    for key in ("df_3_1", "df_3_2", "df_3_3"):
+        pd.testing.assert_frame_equal(project.section(key), saved[key].reset_index(drop=True), check_categorical=False)
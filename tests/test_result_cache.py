@@ -0,0 +1,80 @@
+# tests/test_result_cache.py
+# Keys, the memory LRU and the disk tier of the section result cache.
+import numpy as np
+import pandas as pd
+import pytest
+
+import agri_engine
+import result_cache
+from agri_calc import SECTION_COLUMNS
+from benchmarks import synthetic
+from result_cache import ResultCache
+
+COUNTRY = "Cameroon"
+
+@pytest.fixture(scope="module")
+def params():
+    return agri_engine.get_region_params(COUNTRY)
+
+@pytest.fixture
+def frame():
+    return synthetic.section_frame(300, COUNTRY, seed=11)
+
+def test_hit_returns_the_engine_results(params, frame):
+    cache = ResultCache()
+    first, hit = result_cache.cached_section_ghg(frame, params, 20, cache=cache)
+    assert not hit
+    second, hit = result_cache.cached_section_ghg(frame.copy(), params, 20, cache=cache)
+    assert hit
+    pd.testing.assert_frame_equal(second, agri_engine.compute_section_ghg(frame, params, 20))
+    second["total"] = 0.0 # callers get copies
+    third, _ = result_cache.cached_section_ghg(frame, params, 20, cache=cache)
+    pd.testing.assert_frame_equal(third, first)
+    assert cache.stats()["memory_hits"] == 2 and cache.stats()["misses"] == 1
+
+def test_key_follows_every_input(params, frame):
+    key = result_cache.cache_key(frame, params, 20)
+    assert result_cache.cache_key(frame.copy(), params, 20) == key
+    assert result_cache.cache_key(frame, params, 10) != key
+    assert result_cache.cache_key(frame, {**params, "residue_multiplier": 0.5}, 20) != key
+    changed = frame.copy()
+    changed.loc[5, "Area (ha)"] += 0.5
+    assert result_cache.cache_key(changed, params, 20) != key
+    assert result_cache.cache_key(frame.set_axis(frame.index + 1), params, 20) != key
+
+@pytest.mark.parametrize("a, b", [(None, np.nan), ("1", 1), (1, 1.5)], ids=["none-nan", "text-number", "numbers"])
+@pytest.mark.parametrize("column", ["Tillage", "Local AGB"])
+def test_cells_the_engine_may_tell_apart(params, column, a, b):
+    def table(value):
+        return pd.DataFrame([{"Crop System": "Oil palm", "Area (ha)": 10.0, column: value}],
+                            columns=SECTION_COLUMNS, dtype=object)
+    assert result_cache.cache_key(table(a), params, 20) != result_cache.cache_key(table(b), params, 20)
+
+def test_memory_tier_is_bounded(params):
+    frames = [synthetic.section_frame(200, COUNTRY, seed=seed) for seed in range(4)]
+    size = int(agri_engine.compute_section_ghg(frames[0], params, 20).memory_usage(deep=True).sum())
+    cache = ResultCache(memory_bytes=int(size * 2.5))
+    for df in frames:
+        result_cache.cached_section_ghg(df, params, 20, cache=cache)
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2 and stats["memory_bytes"] <= cache.memory_bytes
+    assert stats["memory_evictions"] == 2
+    assert result_cache.cached_section_ghg(frames[-1], params, 20, cache=cache)[1]      # most recent kept
+    assert not result_cache.cached_section_ghg(frames[0], params, 20, cache=cache)[1]   # oldest evicted
+
+def test_disk_tier_survives_a_restart(params, frame, tmp_path):
+    expected, _ = result_cache.cached_section_ghg(frame, params, 20, cache=ResultCache(disk_dir=str(tmp_path)))
+    restarted = ResultCache(disk_dir=str(tmp_path))
+    results, hit = result_cache.cached_section_ghg(frame, params, 20, cache=restarted)
+    assert hit and restarted.stats()["disk_hits"] == 1
+    pd.testing.assert_frame_equal(results, expected, check_categorical=False)
+    # Promoted to memory
+    assert result_cache.cached_section_ghg(frame, params, 20, cache=restarted)[1]
+    assert restarted.stats()["memory_hits"] == 1
+
+def test_disk_tier_is_bounded(params, tmp_path):
+    cache = ResultCache(memory_bytes=0, disk_dir=str(tmp_path), disk_bytes=1)
+    for seed in range(3):
+        result_cache.cached_section_ghg(synthetic.section_frame(50, COUNTRY, seed=seed), params, 20, cache=cache)
+    assert cache.stats()["disk_evictions"] >= 2
+    assert len([p for p in tmp_path.iterdir() if ".tmp" not in p.name]) <= 1
@@ -0,0 +1,122 @@
+# tests/test_sectors.py
+# The sector runner (flag gating, totals, errors) and the Energy tables against the workbook formulas.
+import pandas as pd
+import pytest
+
+import energy
+import sectors
+from energy import COOKSTOVE_GASES
+
+SETTINGS = {"country": "Cameroon", "soil_divisor": 20}
+
+@pytest.fixture(scope="module")
+def params():
+    return energy.energy_params(SETTINGS["country"])
+
+def _cookstove(params, fuel, stoves, reduction=None, adoption=None, local=None):
+    """1.1 for one row, cell by cell as in the workbook."""
+    local = local or {}
+    saved = (reduction or params["fuel_reduction"]) * (adoption or params["adoption_rate"])
+    return sum(params["stove_fuel_use"][fuel] * stoves * ((local.get(gas) or params["cookstove_ef"][fuel][gas]) / 1000)
+               * saved * params["gwp"][gas] for gas in COOKSTOVE_GASES)
+
+def _frame(rows, table):
+    return pd.DataFrame(rows, columns=[col.name for col in energy.SCHEMA[table]])
+
+# -----------------------------
+# Energy tables
+# -----------------------------
+
+def test_cookstoves(params):
+    df = _frame([
+        {"Cookstove": "Rocket type", "Fuel": "Wood", "Cookstoves per year": 100},
+        {"Cookstove": "Gasifier", "Fuel": "Charcoal", "Cookstoves per year": 40, "Local Fuel Reduction": 0.5,
+         "Local Adoption Rate": 0, "Local CH4 EF": 20.0},   # 0 keeps the default, as IF(local > 0, ...)
+        {"Cookstove": "Rocket type", "Fuel": None, "Cookstoves per year": 999},  # no fuel: not counted
+        {"Cookstove": "Rocket type", "Fuel": "Please select", "Cookstoves per year": 999},
+    ], "df_1_1")
+    rows = energy.EnergySector().calculate("df_1_1", df, params)
+    assert list(rows.index) == [0, 1]
+    assert rows["total"].iloc[0] == pytest.approx(_cookstove(params, "Wood", 100))
+    assert rows["total"].iloc[1] == pytest.approx(_cookstove(params, "Charcoal", 40, reduction=0.5, local={"CH4": 20.0}))
+
+def test_transformation(params):
+    system = "Kiln, ceramic or metal"
+    df = _frame([
+        {"Activity": "ICPS *", "System": system, "Charcoal (t/yr)": 50},
+        {"Activity": params["no_emission_activity"], "System": None, "Charcoal (t/yr)": 10},
+        {"Activity": "ICPS *", "System": None, "Charcoal (t/yr)": 10},  # no system: 0
+    ], "df_1_2")
+    rows = energy.EnergySector().calculate("df_1_2", df, params)
+    base, ef, gwp = params["baseline_charcoal_ef"], params["transformation_ef"][system], params["gwp"]["CH4"]
+    kiln = ((base["CO2"] - ef["CO2"]) * 50 * 1000 + (base["CH4"] - ef["CH4"]) * 50 * 1000 * gwp) / 1_000_000
+    clean = (base["CO2"] * 10 * 1000 + base["CH4"] * 10 * 1000 * gwp) / 1_000_000
+    assert list(rows["total"]) == pytest.approx([kiln, clean, 0.0])
+
+def test_cogeneration(params):
+    df = _frame([
+        {"CHP Facility": params["lists"]["chp_facility"][0], "Electricity (MWh)": 100, "Heat (MWh)": 40},
+        {"CHP Facility": params["lists"]["chp_facility"][0], "Electricity (MWh)": 10, "Heat (MWh)": 0, "Local Electricity EF": 50},
+    ], "df_1_4")
+    rows = energy.EnergySector().calculate("df_1_4", df, params)
+    wood = (params["wood_co2_ef"] / 1_000_000) / params["wood_energy"]
+    expected = [wood * 100 - (100 * params["chp_electricity_ef"] / 1000 + 40 * params["chp_heat_ef"] / 1000),
+                wood * 10 - 10 * 50 / 1000]
+    assert list(rows["total"]) == pytest.approx(expected)
+
+@pytest.mark.parametrize("dtype", [object, "str", "category"])
+def test_selected_skips_empty_cells(dtype):
+    s = pd.Series(["Wood", None, "Please select", ""], dtype=dtype)
+    assert list(sectors.selected(s)) == [True, False, False, False]
+
+# -----------------------------
+# Runner
+# -----------------------------
+
+def _tables():
+    return {"df_1_1": _frame([{"Cookstove": "Rocket type", "Fuel": "Wood", "Cookstoves per year": 100}], "df_1_1"),
+            "df_1_4": _frame([{"CHP Facility": "x", "Electricity (MWh)": 100}], "df_1_4")}
+
+def test_flags_gate_sectors():
+    energy_sector = sectors.get_sector("energy")
+    off = sectors.run_sectors({"check_energy": False}, _tables(), SETTINGS, sectors=[energy_sector])
+    assert off == {}
+    on = sectors.run_sectors({"check_energy": True}, _tables(), SETTINGS, sectors=[energy_sector])
+    result = on["energy"]
+    assert list(result.totals) == list(energy.TABLE_NAMES) # every table, in page order; missing ones count 0
+    assert result.totals["df_1_2"] == 0.0 and result.totals["df_1_3"] == 0.0
+    assert result.totals["df_1_1"] == pytest.approx(_cookstove(energy.energy_params("Cameroon"), "Wood", 100))
+    assert result.total == pytest.approx(result.totals["df_1_1"] + result.totals["df_1_4"])
+    assert not result.errors
+
+def test_agriculture_flags_default_to_ticked():
+    agri = sectors.get_sector("agriculture")
+    assert agri.enabled({}) == list(agri.tables)
+    assert agri.enabled({"check_agri_3_2": False}) == ["df_3_1", "df_3_3"]
+
+def test_grand_total_counts_ticked_sectors_only():
+    totals = {"energy": {"df_1_1": 10.0, "df_1_2": 5.0}, "agriculture": {"df_3_1": 100.0, "df_3_2": 1.0, "df_3_3": 0.5}}
+    assert sectors.grand_total(totals, {"check_energy": False}) == pytest.approx(101.5)
+    assert sectors.grand_total(totals, {"check_energy": True, "check_agri_3_1": False}) == pytest.approx(16.5)
+    frame = sectors.totals_frame(totals, {"check_energy": True})
+    assert list(frame.columns) == sectors.TOTAL_COLUMNS
+    assert list(frame["Sector"].unique()) == ["1. Energy", "3. Agriculture"]
+
+def test_failing_table_is_reported(monkeypatch):
+    energy_sector = sectors.get_sector("energy")
+    real = energy_sector.calculate
+    def calculate(table, df, params):
+        if table == "df_1_4":
+            raise ValueError("boom")
+        return real(table, df, params)
+    monkeypatch.setattr(energy_sector, "calculate", calculate)
+    result = sectors.run_sectors({"check_energy": True}, _tables(), SETTINGS, sectors=[energy_sector])["energy"]
+    assert result.errors == {"df_1_4": "ValueError: boom"}
+    assert result.totals["df_1_4"] == 0.0 and result.totals["df_1_1"] > 0
+
+def test_merge_totals_keeps_other_sectors():
+    energy_sector = sectors.get_sector("energy")
+    results = sectors.run_sectors({"check_energy": True}, _tables(), SETTINGS, sectors=[energy_sector])
+    merged = sectors.merge_totals({"agriculture": {"df_3_1": 3.0}}, results)
+    assert merged["agriculture"] == {"df_3_1": 3.0}
+    assert merged["energy"] == results["energy"].totals
@@ -0,0 +1,63 @@
+# tests/test_sync_excel.py
+# The streaming workbook pass against openpyxl's reading of the same cells.
+import openpyxl
+import pytest
+
+import sync_excel
+from benchmarks.excel_extract import scaled_workbook
+from param_loader import WORKBOOK_PATH
+
+# openpyxl drops the template's data validation and conditional formatting extensions on read
+pytestmark = pytest.mark.filterwarnings("ignore:.*extension is not supported:UserWarning")
+
+@pytest.fixture(scope="module")
+def extracted():
+    return sync_excel.extract_parameters(WORKBOOK_PATH)
+
+@pytest.fixture(scope="module")
+def book():
+    return openpyxl.load_workbook(WORKBOOK_PATH, data_only=True, read_only=True)
+
+def _cells(book, name):
+    """Values of a TABLES / LISTS range such as "Sheet6!$C$71:$F$81"."""
+    sheet, r1, c1, r2, c2 = sync_excel.parse_range(name)
+    return [list(row) for row in book[sheet].iter_rows(min_row=r1, max_row=r2, min_col=c1, max_col=c2, values_only=True)]
+
+def test_start_lists(extracted):
+    # Each from its own validation source (they were all one guessed column before)
+    lists = [extracted[key] for key in ("SOIL_TYPES", "CLIMATES", "MOISTURES", "COUNTRIES")]
+    assert all(lists) and len({tuple(values) for values in lists}) == 4
+    assert not any(sync_excel.PLACEHOLDER in values for values in lists)
+    assert extracted["LISTS"]["Countries"] == extracted["COUNTRIES"]
+    assert "Cameroon" in extracted["COUNTRIES"] and "Moist" in extracted["MOISTURES"]
+
+def test_crop_table_matches_the_cells(extracted, book):
+    crops = extracted["AGRI_CROP_DATA"]
+    assert "Genetic Crop (Fallback)" not in crops
+    name = next(name for name, table in extracted["TABLES"].items()
+                if [row[0] for row in table["rows"]] == list(crops))
+    rows = {row[0].strip(): row for row in _cells(book, name) if isinstance(row[0], str)}
+    for crop, (agb, bgb, soil) in crops.items():
+        assert [agb, bgb, soil] == pytest.approx([float(v) for v in rows[crop][1:4]]), crop
+
+def test_tables_match_the_cells(extracted, book):
+    for name, table in list(extracted["TABLES"].items())[:5]:
+        expected = [row for row in _cells(book, name) if row[0] is not None]
+        assert len(table["rows"]) == len(expected), name
+        for got, want in zip(table["rows"], expected):
+            assert [v if not isinstance(v, float) else pytest.approx(v) for v in want] == list(got), name
+
+def test_larger_copy_gives_the_same_lists(extracted, tmp_path):
+    # Sheets repeated below the original rows (benchmarks/excel_extract.py): sources are unchanged
+    path = scaled_workbook(WORKBOOK_PATH, str(tmp_path / "scaled.xlsm"), 3)
+    scaled = sync_excel.extract_parameters(path)
+    for key in ("SOIL_TYPES", "CLIMATES", "MOISTURES", "COUNTRIES", "AGRI_CROP_DATA", "LISTS"):
+        assert scaled[key] == extracted[key], key
+
+@pytest.mark.parametrize("text, sheet, expected", [
+    ("'3.Agriculture'!$A$1:$C$4", None, ("3.Agriculture", 1, 1, 4, 3)),
+    ("B2", "Start", ("Start", 2, 2, 2, 2)),
+    ("Sheet6!$AB$16", None, ("Sheet6", 16, 28, 16, 28)),
+])
+def test_parse_range(text, sheet, expected):
+    assert sync_excel.parse_range(text, sheet) == expected
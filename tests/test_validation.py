@@ -0,0 +1,106 @@
+# tests/test_validation.py
+# Issue report of validate_section, and a clean frame that calculates like the raw one.
+import numpy as np
+import pandas as pd
+import pytest
+
+import agri_engine
+import validation
+from agri_calc import SECTION_COLUMNS
+from benchmarks import synthetic
+
+COUNTRY = "Cameroon"
+
+@pytest.fixture(scope="module")
+def params():
+    return agri_engine.get_region_params(COUNTRY)
+
+@pytest.fixture(scope="module")
+def labels(params):
+    factors = params["removal_factors"]
+    return {"Crop System": next(iter(params["agb_bgb_soil"])), "Tillage": next(iter(factors["tillage"])),
+            "Inputs": next(iter(factors["input"])), "Residue": next(iter(factors["residue"]))}
+
+def _frame(labels, *rows):
+    return pd.DataFrame([{**labels, "Area (ha)": 10.0, **row} for row in rows], columns=SECTION_COLUMNS, dtype=object)
+
+@pytest.mark.parametrize("cells, column, issue", [
+    ({"Area (ha)": "abc"}, "Area (ha)", validation.NOT_A_NUMBER),
+    ({"Local AGB": "n/a"}, "Local AGB", validation.NOT_A_NUMBER),
+    ({"Area (ha)": None}, "Area (ha)", validation.NO_AREA),
+    ({"Area (ha)": -5.0}, "Area (ha)", validation.NEGATIVE_AREA),
+    ({"Crop System": "Moon wheat"}, "Crop System", validation.UNKNOWN_CROP),
+    ({"Tillage": "Laser tillage"}, "Tillage", validation.UNKNOWN_OPTION),
+    ({"Inputs": None}, "Inputs", validation.NO_OPTION),
+    ({"Area (ha)": [12.0]}, "Area (ha)", validation.LIST_CELL),
+    ({"Area (ha)": float("inf")}, "Area (ha)", validation.NOT_FINITE),
+    ({"Local Soil": "-inf"}, "Local Soil", validation.NOT_FINITE),
+    ({"Area (ha)": "nan"}, "Area (ha)", validation.NOT_A_NUMBER),
+], ids=["text-area", "text-local", "no-area", "negative-area", "unknown-crop", "unknown-option", "no-option", "list-cell",
+        "inf-area", "inf-local", "nan-text"])
+def test_issue_for_bad_cell(params, labels, cells, column, issue):
+    df = _frame(labels, {}, cells, {})
+    clean, issues = validation.validate_section(df, params)
+    assert list(issues.columns) == validation.ISSUE_COLUMNS
+    found = issues[(issues["row"] == 1) & (issues["column"] == column)]
+    assert list(found["issue"]) == [issue]
+    assert list(found["severity"]) == [validation.SEVERITY[issue]]
+    assert not len(issues[issues["row"] != 1]) # the clean rows around it report nothing
+
+def test_local_factor_silences_unknown_option(params, labels):
+    # The option's factor is not used when a positive local factor replaces it
+    df = _frame(labels, {"Tillage": "Laser tillage", "Local Tillage Factor": 1.1}, {"Inputs": None, "Local Input Factor": 0.9})
+    _, issues = validation.validate_section(df, params)
+    assert not len(issues)
+
+def test_rows_without_crop_are_dropped(params, labels):
+    df = _frame(labels, {"Crop System": None, "Area (ha)": "abc"}, {}, {"Crop System": ""})
+    df.index = [10, 20, 30]
+    clean, issues = validation.validate_section(df, params)
+    assert list(clean.index) == [20]
+    assert not len(issues)
+
+def test_clean_frame_is_typed(params, labels):
+    clean, _ = validation.validate_section(_frame(labels, {"Area (ha)": "7.5"}, {"Tillage": "Laser tillage"}), params)
+    assert list(clean.columns) == SECTION_COLUMNS
+    for col in validation.NUMBER_COLUMNS:
+        assert clean[col].dtype == np.float64
+    for col in ("Crop System", "Tillage", "Inputs", "Residue"):
+        assert isinstance(clean[col].dtype, pd.CategoricalDtype)
+    assert "Laser tillage" in clean["Tillage"].cat.categories # unknown labels are kept for the results
+
+def test_clean_frame_calculates_like_the_raw_one(params):
+    rng = np.random.default_rng(7)
+    df = synthetic.section_frame(1_000, COUNTRY, seed=7, typed=False)
+    df["Area (ha)"] = df["Area (ha)"].astype(object)
+    bad = rng.choice(len(df), 60, replace=False)
+    df.loc[bad[:20], "Area (ha)"] = "abc"
+    df.loc[bad[20:40], "Tillage"] = "Laser tillage"
+    for i, v in zip(bad[40:], rng.uniform(1, 50, 20)):
+        df.at[i, "Area (ha)"] = [v]
+    raw = agri_engine.compute_section_ghg(df, params, 20)
+    clean, issues = validation.validate_section(df, params)
+    checked = agri_engine.compute_section_ghg(clean, params, 20)
+    np.testing.assert_array_equal(checked["total"].to_numpy(), raw["total"].to_numpy())
+    assert list(checked.index) == list(raw.index)
+    assert set(issues["issue"]) >= {validation.NOT_A_NUMBER, validation.LIST_CELL}
+
+def test_validate_project(params, labels):
+    sections = {"df_3_1": _frame(labels, {"Area (ha)": "abc"}), "df_3_2": _frame(labels, {}), "df_3_3": None}
+    clean, issues = validation.validate_project(sections, params)
+    assert set(clean) == {"df_3_1", "df_3_2"}
+    assert list(issues.columns) == ["section"] + validation.ISSUE_COLUMNS
+    assert list(issues["section"]) == ["df_3_1"]
+    counts = validation.issue_counts(issues)
+    assert counts.to_dict("records") == [{"column": "Area (ha)", "issue": validation.NOT_A_NUMBER,
+                                          "severity": validation.ERROR, "count": 1}]
+
+@pytest.mark.parametrize("area", [float("nan"), float("inf"), "-inf", "nan"])
+def test_non_finite_numbers_count_as_0(params, labels, area):
+    clean, _ = validation.validate_section(_frame(labels, {}, {"Area (ha)": area}, {"Local AGB": float("inf")}), params)
+    assert clean["Area (ha)"].iloc[1] == 0.0 and clean["Local AGB"].iloc[2] == 0.0
+    results = agri_engine.compute_section_ghg(clean, params, 20)
+    assert np.isfinite(results["total"]).all()
+    # As an empty (None) area, which the engine counts as 0
+    empty = agri_engine.compute_section_ghg(_frame(labels, {}, {"Area (ha)": None}), params, 20)
+    assert results["total"].iloc[1] == empty["total"].iloc[1]
@@ -0,0 +1,165 @@
+# validation.py
+# Validation and normalization stage for 3.x section tables, run once before
+# calculation. Whole columns are coerced at once: numbers with pd.to_numeric,
+# option labels checked against the region's option lists through the factor
+# index. The result is a clean typed frame (float64 numbers, categorical
+# options) that agri_engine.compute_section_ghg takes without per-cell
+# fallbacks, and a per-row report of everything the calculation would
+# otherwise have absorbed silently (garbage counted as 0, unknown options
+# with a 0 factor, ...). The figures are unchanged: the clean frame gives the
+# same results as the raw one, except for non-finite numbers (an empty NaN
+# area, infinities), which would make the totals NaN or inf and count as 0.
+import numpy as np
+import pandas as pd
+
+import agri_engine
+import factor_index
+from agri_calc import SECTION_COLUMNS
+
+ISSUE_COLUMNS = ["row", "column", "value", "issue", "severity"]
+
+ERROR = "error"     # the calculation used a value other than the one entered
+WARNING = "warning" # suspicious, but calculated as entered
+
+NOT_A_NUMBER = "not a number, counted as 0"
+NOT_FINITE = "infinite number, counted as 0"
+NO_AREA = "no area"
+NEGATIVE_AREA = "negative area"
+UNKNOWN_CROP = "crop not in the region's table, default factors are 0"
+UNKNOWN_OPTION = "option not in the region's list, factor is 0"
+NO_OPTION = "no option selected, factor is 0"
+LIST_CELL = "list cell, first item used"
+
+SEVERITY = {
+    NOT_A_NUMBER: ERROR, NOT_FINITE: ERROR, NO_AREA: ERROR, UNKNOWN_CROP: ERROR, UNKNOWN_OPTION: ERROR,
+    NEGATIVE_AREA: WARNING, NO_OPTION: WARNING, LIST_CELL: WARNING,
+}
+
+NUMBER_COLUMNS = [col for col in SECTION_COLUMNS if col not in ("Crop System", "Tillage", "Inputs", "Residue")]
+
+# Option column -> (factor index kind, "Local ..." column that replaces its factor)
+OPTION_COLUMNS = {
+    "Tillage": ("tillage", "Local Tillage Factor"),
+    "Inputs": ("input", "Local Input Factor"),
+    "Residue": ("residue", "Local Residue Factor"),
+}
+
+_list_cells = np.frompyfunc(lambda v: isinstance(v, list), 1, 1)
+
+# -----------------------------
+# 1. COLUMN NORMALIZATION
+# -----------------------------
+
+def option_column(values, options):
+    """
+    (Categorical, unknown mask) of a label column. Categories are `options`
+    followed by any unknown labels, which are kept so results still show them;
+    empty cells are missing. Works per distinct label, not per row.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values, use_na_sentinel=True) # Arrow strings factorize natively
+    uniques = pd.Index(uniques, dtype=object)
+    position = pd.Index(options, dtype=object).get_indexer(uniques)
+    unknown = position < 0
+    position[unknown] = len(options) + np.arange(unknown.sum())
+    categories = pd.Index(list(options) + list(uniques[unknown]), dtype=object)
+    column = pd.Categorical.from_codes(np.append(position, -1)[codes], categories=categories)
+    return column, np.append(unknown, False)[codes]
+
+# -----------------------------
+# 2. SECTION VALIDATION
+# -----------------------------
+
+def validate_section(df, params=None, index=None):
+    """
+    Returns (clean, issues) for one section table.
+
+    `clean` holds the rows with a crop selected (the ones the calculation
+    visits, keeping the input index) in SECTION_COLUMNS: numbers as float64,
+    labels as categoricals over the region's options. `issues` has one line
+    per problem cell (ISSUE_COLUMNS, "row" is the input index label), in row
+    order. The options come from `index` (a single-region FactorIndex) or,
+    without one, from `params`.
+    """
+    index = index if index is not None else factor_index.index_for(params)
+    df = df.reindex(columns=SECTION_COLUMNS)
+    crop = agri_engine.unwrap_column(df["Crop System"])
+    keep = agri_engine.truthy_column(crop)
+    df, crop = df[keep], crop[keep]
+
+    found = [] # (row mask, column, issue)
+    for col in SECTION_COLUMNS:
+        if df[col].dtype == object:
+            found.append((_list_cells(df[col].to_numpy()).astype(bool), col, LIST_CELL))
+
+    clean = {}
+    for col in NUMBER_COLUMNS:
+        values, invalid = agri_engine.parse_float_column(df[col])
+        infinite = np.isinf(values)
+        clean[col] = np.where(infinite, 0.0, values)
+        # Text float() reads as NaN ("nan") is no number either
+        mask = np.isnan(values) & agri_engine.unwrap_column(df[col]).notna().to_numpy()
+        mask[invalid] = True
+        found.append((mask, col, NOT_A_NUMBER))
+        found.append((infinite, col, NOT_FINITE))
+    # An empty area is 0 whether it is None or NaN (the engine keeps NaN)
+    area = clean["Area (ha)"] = np.nan_to_num(clean["Area (ha)"], nan=0.0)
+    found.append((agri_engine.unwrap_column(df["Area (ha)"]).isna().to_numpy(), "Area (ha)", NO_AREA))
+    found.append((area < 0, "Area (ha)", NEGATIVE_AREA))
+
+    clean["Crop System"], unknown = option_column(crop, index.options["crop"])
+    found.append((unknown, "Crop System", UNKNOWN_CROP))
+    for col, (kind, local) in OPTION_COLUMNS.items():
+        clean[col], unknown = option_column(agri_engine.unwrap_column(df[col]), index.options[kind])
+        # Only matters when no local factor replaces the option's
+        used = ~(clean[local] > 0)
+        found.append((unknown & used, col, UNKNOWN_OPTION))
+        found.append((np.asarray(pd.isna(clean[col])) & used, col, NO_OPTION))
+
+    clean = pd.DataFrame(clean, index=df.index, columns=SECTION_COLUMNS)
+    return clean, _issue_frame(df, found)
+
+def _issue_frame(df, found):
+    positions, parts = [], []
+    for mask, col, issue in found:
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            continue
+        positions.append(rows)
+        parts.append(pd.DataFrame({
+            "row": df.index[rows],
+            "column": col,
+            "value": df[col].iloc[rows].to_numpy(dtype=object),
+            "issue": issue,
+            "severity": SEVERITY[issue],
+        }, columns=ISSUE_COLUMNS))
+    if not parts:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    order = np.argsort(np.concatenate(positions), kind="stable") # row order, then check order
+    return pd.concat(parts, ignore_index=True).take(order).reset_index(drop=True)
+
+def validate_project(sections, params):
+    """
+    validate_section for every section of a project: returns
+    ({key: clean frame}, issues with a leading "section" column).
+    """
+    index = factor_index.index_for(params)
+    clean, issues = {}, []
+    for key, df in sections.items():
+        if df is None:
+            continue
+        clean[key], section_issues = validate_section(df, index=index)
+        if len(section_issues):
+            section_issues.insert(0, "section", key)
+            issues.append(section_issues)
+    issues = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=["section"] + ISSUE_COLUMNS)
+    return clean, issues
+
+def issue_counts(issues):
+    """Number of cells per (column, issue, severity), most frequent first."""
+    if not len(issues):
+        return pd.DataFrame(columns=["column", "issue", "severity", "count"])
+    return (issues.groupby(["column", "issue", "severity"], sort=False).size()
+            .rename("count").reset_index().sort_values("count", ascending=False, kind="stable"))